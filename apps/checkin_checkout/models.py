@@ -1,7 +1,7 @@
 from django.core.exceptions import ValidationError
 from django.db import models
 
-from apps.reservations.models import Reservation
+from apps.reservations.models import Reservation, room_transitions
 
 
 class CheckIn(models.Model):
@@ -24,9 +24,10 @@ class CheckIn(models.Model):
     def save(self, *args, **kwargs):
         creating = self._state.adding
         self.clean()
-        super().save(*args, **kwargs)
-        if creating:
-            self.reservation.room.ocupar()
+        with room_transitions():
+            super().save(*args, **kwargs)
+            if creating:
+                self.reservation.room.ocupar()
 
 
 class CheckOut(models.Model):
@@ -47,13 +48,13 @@ class CheckOut(models.Model):
         if not self.reservation.ocupando:
             raise ValidationError('Esta reserva já foi encerrada.')
 
-        has_pending = self.reservation.hospedes.filter(pago=False).exists()
-        if has_pending and not self.has_pending_payments:
+        if self.reservation.tem_pendencias and not self.has_pending_payments:
             raise ValidationError('Existem hóspedes com valores pendentes.')
 
     def save(self, *args, **kwargs):
         if not self.check_in:
             self.check_in = CheckIn.objects.filter(reservation=self.reservation).first()
         self.clean()
-        super().save(*args, **kwargs)
-        self.reservation.encerrar(self.finished_at)
+        with room_transitions():
+            super().save(*args, **kwargs)
+            self.reservation.encerrar(self.finished_at)
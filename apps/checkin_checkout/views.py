@@ -70,8 +70,7 @@ def perform_checkout(request, reservation_id):
                     'message': 'Esta reserva já está encerrada.'
                 }, status=400)
 
-            has_pending = reservation.hospedes.filter(pago=False).exists()
-            if has_pending:
+            if reservation.tem_pendencias:
                 return JsonResponse({
                     'success': False,
                     'message': 'Existem hóspedes com valores pendentes.'
@@ -138,7 +137,7 @@ def list_expected_departures(request):
     Lista todas as reservas que têm check-out esperado para hoje ou datas anteriores (atrasadas)
     """
     today = timezone.localdate()
-    active_reservations = Reservation.objects.ativas().select_related('room')
+    active_reservations = Reservation.objects.ativas().select_related('room').prefetch_related('hospedes')
     departures = active_reservations.filter(data_entrada__date__lt=today)
 
     departures_data = [{
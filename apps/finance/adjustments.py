@@ -0,0 +1,132 @@
+"""
+Lançamento de ajustes financeiros em lote.
+
+``create_adjustments`` valida todas as linhas antes de gravar qualquer uma:
+as reservas citadas são conferidas em uma única consulta e os ajustes entram
+com um ``bulk_create`` em uma transação. Se alguma linha for inválida, nada
+é gravado e o resultado traz os erros de cada linha, para o auditor corrigir
+a planilha e reenviar o lote inteiro.
+
+Como ``bulk_create`` não dispara ``post_save``, o envio de
+``ledger_bulk_created`` atualiza o caixa do dia e os consolidados.
+"""
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.reservations.models import Reservation
+
+from .models import LedgerAdjustment
+from .signals import ledger_bulk_created
+
+ADJUSTMENT_BATCH_MAX_ROWS = 1000
+MAX_ADJUSTMENT_VALUE = Decimal('99999999.99')  # max_digits=10, decimal_places=2
+
+
+@dataclass
+class BatchResult:
+    created: bool = False
+    results: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def error_count(self) -> int:
+        return sum(1 for row in self.results if not row['success'])
+
+
+def _parse_value(raw) -> Optional[Decimal]:
+    if isinstance(raw, bool) or raw is None:
+        return None
+    try:
+        value = Decimal(str(raw).strip().replace(',', '.'))
+    except InvalidOperation:
+        return None
+    if not value.is_finite() or value != value.quantize(Decimal('0.01')):
+        return None
+    return value
+
+
+def _parse_reservation_id(raw) -> Optional[int]:
+    if isinstance(raw, bool):
+        raise ValueError
+    return int(raw) if raw not in (None, '') else None
+
+
+def _clean_row(row) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """Valida os campos de uma linha; devolve os valores normalizados e os erros por campo."""
+    if not isinstance(row, dict):
+        return {}, {'linha': 'Cada linha deve ser um objeto JSON.'}
+    errors = {}
+    cleaned = {
+        'tipo': row.get('tipo') or LedgerAdjustment.Tipo.CREDITO,
+        'descricao': str(row.get('descricao') or 'Ajuste manual').strip(),
+        'valor': _parse_value(row.get('valor')),
+        'metodo': str(row['metodo']) if row.get('metodo') else None,
+        'reservation_id': None,
+    }
+    if cleaned['tipo'] not in LedgerAdjustment.Tipo.values:
+        errors['tipo'] = 'Tipo inválido (use credito ou debito).'
+    if len(cleaned['descricao']) > 255:
+        errors['descricao'] = 'Descrição com mais de 255 caracteres.'
+    if cleaned['valor'] is None or cleaned['valor'] == 0 or abs(cleaned['valor']) > MAX_ADJUSTMENT_VALUE:
+        errors['valor'] = 'Informe um valor válido.'
+    if cleaned['metodo'] is not None and len(cleaned['metodo']) > 30:
+        errors['metodo'] = 'Método com mais de 30 caracteres.'
+    try:
+        cleaned['reservation_id'] = _parse_reservation_id(row.get('reservation_id'))
+    except (TypeError, ValueError):
+        errors['reservation_id'] = 'Reserva inválida.'
+    return cleaned, errors
+
+
+def create_adjustments(rows: List[Any]) -> BatchResult:
+    """
+    Valida e grava um lote de ajustes.
+
+    Args:
+        rows (List[Any]): Linhas com ``tipo``, ``descricao``, ``valor``, ``metodo``
+            e ``reservation_id`` (mesmos campos de ``create_adjustment``).
+
+    Returns:
+        BatchResult: ``created`` indica se o lote foi gravado; ``results`` traz,
+        para cada linha, o ``adjustment_id`` criado ou os erros encontrados.
+
+    Raises:
+        ValueError: Se o lote estiver vazio ou passar de ``ADJUSTMENT_BATCH_MAX_ROWS``.
+    """
+    if not rows:
+        raise ValueError('Envie ao menos um ajuste.')
+    if len(rows) > ADJUSTMENT_BATCH_MAX_ROWS:
+        raise ValueError(f'Envie no máximo {ADJUSTMENT_BATCH_MAX_ROWS} ajustes por lote.')
+
+    checked = [_clean_row(row) for row in rows]
+    reservation_ids = {cleaned.get('reservation_id') for cleaned, _ in checked} - {None}
+    existing = set(Reservation.objects.filter(id__in=reservation_ids).values_list('id', flat=True))
+    for cleaned, errors in checked:
+        if cleaned.get('reservation_id') is not None and cleaned['reservation_id'] not in existing:
+            errors['reservation_id'] = 'Reserva não encontrada.'
+
+    result = BatchResult()
+    if any(errors for _, errors in checked):
+        result.results = [
+            {'row': index, 'success': not errors, **({'errors': errors} if errors else {})}
+            for index, (_, errors) in enumerate(checked)
+        ]
+        return result
+
+    with transaction.atomic():
+        ajustes = LedgerAdjustment.objects.bulk_create(
+            [LedgerAdjustment(**cleaned) for cleaned, _ in checked]
+        )
+        ledger_bulk_created.send(
+            sender=create_adjustments,
+            models=(LedgerAdjustment,),
+            dates=sorted({timezone.localdate(ajuste.criado_em) for ajuste in ajustes}),
+        )
+    result.created = True
+    result.results = [
+        {'row': index, 'success': True, 'adjustment_id': ajuste.id} for index, ajuste in enumerate(ajustes)
+    ]
+    return result
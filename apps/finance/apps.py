@@ -5,3 +5,6 @@ class FinanceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.finance'
     app_label = 'finance'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,330 @@
+"""
+Importação de extratos bancários (CSV e OFX) para despesas e receitas avulsas.
+
+O arquivo é lido linha a linha: débitos viram ``Expense`` (categoria pelas
+regras de ``CATEGORY_RULES``) e créditos viram ``ExtraIncome``. Cada
+lançamento recebe um ``import_hash`` (SHA-256 da chave natural: conta, data,
+valor, histórico e identificador do banco ou ordem de ocorrência no arquivo),
+então reimportar o mesmo extrato, ou extratos com períodos sobrepostos, não
+duplica registros; lançamentos de meses fechados são recusados como erros.
+As inserções usam ``bulk_create`` em lotes dentro de uma única transação e,
+ao final, ``ledger_bulk_created`` avisa os consolidados.
+"""
+import csv
+import hashlib
+import re
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.db import transaction
+
+from .closing import closed_months, month_start
+from .models import Expense, ExtraIncome
+from .signals import ledger_bulk_created
+
+STATEMENT_FORMATS = ('csv', 'ofx')
+IMPORT_BATCH_SIZE = 1000
+PREVIEW_ROWS = 50
+IMPORT_METHOD = 'Extrato bancário'
+
+# Palavras-chave (sem acentos, minúsculas) procuradas no histórico do lançamento.
+CATEGORY_RULES: List[Tuple[str, Tuple[str, ...]]] = [
+    ('utilities', ('energia', 'luz', 'agua', 'saneamento', 'sabesp', 'cemig', 'enel', 'copel', 'internet',
+                   'telefone', 'vivo', 'claro', ' tim ', ' oi ', ' gas ')),
+    ('taxes', ('darf', ' das ', 'simples nacional', 'iptu', ' iss ', 'imposto', 'tributo', ' gps ')),
+    ('staff', ('salario', 'folha', 'fgts', 'inss', 'ferias', 'rescisao', 'vale transporte', 'pro labore')),
+    ('maintenance', ('manutencao', 'reparo', 'conserto', 'eletricista', 'encanador', 'pintura', 'material de construcao')),
+    ('marketing', ('marketing', 'google ads', 'facebook', 'meta ads', 'instagram', 'booking', 'expedia', 'publicidade')),
+    ('supplies', ('atacad', 'supermerc', 'mercado', 'assai', 'makro', 'lavanderia', 'limpeza', 'enxoval', 'amenities')),
+]
+
+_CSV_COLUMNS = {
+    'date': ('data', 'date', 'data lancamento', 'data do lancamento', 'dt lancamento'),
+    'description': ('historico', 'descricao', 'description', 'memo', 'lancamento', 'detalhes'),
+    'amount': ('valor', 'amount', 'valor (r$)', 'valor r$'),
+    'debit': ('debito', 'saida', 'debit'),
+    'credit': ('credito', 'entrada', 'credit'),
+    'reference': ('documento', 'doc', 'id', 'fitid', 'identificador', 'numero do documento'),
+}
+
+
+class StatementError(ValueError):
+    """Arquivo de extrato que não pode ser interpretado."""
+
+
+@dataclass
+class StatementLine:
+    line_number: int
+    date: date
+    amount: Decimal
+    description: str
+    reference: str = ''
+
+
+@dataclass
+class ImportResult:
+    dry_run: bool
+    expenses: int = 0
+    incomes: int = 0
+    duplicates: int = 0
+    errors: List[Tuple[int, str]] = field(default_factory=list)
+    preview: List[Dict] = field(default_factory=list)
+    dates: set = field(default_factory=set)
+
+    @property
+    def created(self) -> int:
+        return self.expenses + self.incomes
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'\s+', ' ', text).strip().lower()
+
+
+def categorize(description: str) -> str:
+    """Escolhe a categoria da despesa pela primeira regra cujo termo aparece no histórico."""
+    normalized = f' {_normalize(description)} '
+    for category, keywords in CATEGORY_RULES:
+        if any(keyword in normalized for keyword in keywords):
+            return category
+    return 'other'
+
+
+def _decode(raw: bytes) -> str:
+    try:
+        return raw.decode('utf-8')
+    except UnicodeDecodeError:
+        return raw.decode('cp1252', errors='replace')
+
+
+def _iter_text_lines(stream: BinaryIO) -> Iterator[str]:
+    for raw in stream:
+        yield _decode(raw).lstrip('\ufeff').rstrip('\r\n')
+
+
+def parse_amount(value: str) -> Decimal:
+    """Aceita ``1.234,56``, ``-1234.56``, ``R$ 10,00`` e ``(10,00)`` (negativo)."""
+    text = (value or '').strip().replace('R$', '').replace(' ', '')
+    negative = text.startswith('(') and text.endswith(')')
+    text = text.strip('()')
+    if ',' in text:
+        text = text.replace('.', '').replace(',', '.')
+    try:
+        amount = Decimal(text)
+    except InvalidOperation:
+        raise StatementError(f'Valor inválido: {value!r}')
+    return -amount if negative else amount
+
+
+def parse_date(value: str) -> date:
+    text = (value or '').strip()
+    for fmt in ('%d/%m/%Y', '%Y-%m-%d', '%d/%m/%y', '%d-%m-%Y'):
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    raise StatementError(f'Data inválida: {value!r}')
+
+
+def _csv_mapping(header: List[str]) -> Dict[str, int]:
+    names = [_normalize(name) for name in header]
+    mapping = {}
+    for key, aliases in _CSV_COLUMNS.items():
+        for index, name in enumerate(names):
+            if name in aliases:
+                mapping[key] = index
+                break
+    if 'date' not in mapping or 'description' not in mapping:
+        raise StatementError('Cabeçalho do CSV sem colunas de data e histórico.')
+    if 'amount' not in mapping and not ({'debit', 'credit'} & mapping.keys()):
+        raise StatementError('Cabeçalho do CSV sem coluna de valor (ou débito/crédito).')
+    return mapping
+
+
+def _cell(row: List[str], mapping: Dict[str, int], key: str) -> str:
+    index = mapping.get(key)
+    return row[index].strip() if index is not None and index < len(row) else ''
+
+
+def iter_csv_lines(stream: BinaryIO, errors: List[Tuple[int, str]]) -> Iterator[StatementLine]:
+    """
+    Lê um extrato CSV (``;`` ou ``,``) com cabeçalho, uma linha por vez.
+
+    Linhas inválidas são registradas em ``errors`` e ignoradas.
+    """
+    lines = _iter_text_lines(stream)
+    header_line = next((line for line in lines if line.strip()), None)
+    if header_line is None:
+        return
+    delimiter = ';' if header_line.count(';') >= header_line.count(',') else ','
+    mapping = _csv_mapping(next(csv.reader([header_line], delimiter=delimiter)))
+
+    for line_number, row in enumerate(csv.reader(lines, delimiter=delimiter), start=2):
+        if not any(cell.strip() for cell in row):
+            continue
+        try:
+            if 'amount' in mapping:
+                amount = parse_amount(_cell(row, mapping, 'amount'))
+            else:
+                debit, credit = _cell(row, mapping, 'debit'), _cell(row, mapping, 'credit')
+                amount = parse_amount(credit) if credit else -abs(parse_amount(debit or '0'))
+            yield StatementLine(
+                line_number=line_number,
+                date=parse_date(_cell(row, mapping, 'date')),
+                amount=amount,
+                description=_cell(row, mapping, 'description'),
+                reference=_cell(row, mapping, 'reference'),
+            )
+        except StatementError as exc:
+            errors.append((line_number, str(exc)))
+
+
+_OFX_TAG = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+
+
+def iter_ofx_lines(stream: BinaryIO, errors: List[Tuple[int, str]]) -> Iterator[StatementLine]:
+    """
+    Lê os ``<STMTTRN>`` de um OFX (SGML 1.x, sem tags de fechamento, ou XML 2.x).
+
+    Apenas o lançamento corrente fica em memória.
+    """
+    current: Optional[Dict[str, str]] = None
+    start_line = 0
+    for line_number, line in enumerate(_iter_text_lines(stream), start=1):
+        for closing, tag, value in _OFX_TAG.findall(line):
+            tag = tag.upper()
+            if tag == 'STMTTRN' and not closing:
+                current, start_line = {}, line_number
+            elif tag == 'STMTTRN' and closing and current is not None:
+                try:
+                    posted = current.get('DTPOSTED', '')[:8]
+                    yield StatementLine(
+                        line_number=start_line,
+                        date=datetime.strptime(posted, '%Y%m%d').date(),
+                        amount=parse_amount(current.get('TRNAMT', '')),
+                        description=current.get('MEMO') or current.get('NAME', ''),
+                        reference=current.get('FITID', ''),
+                    )
+                except (StatementError, ValueError) as exc:
+                    errors.append((start_line, str(exc) or 'Lançamento OFX inválido.'))
+                current = None
+            elif current is not None and not closing and value.strip():
+                current[tag] = value.strip()
+
+
+def import_hash(line: StatementLine, account: str, occurrence: int) -> str:
+    """Chave natural do lançamento: o ``FITID`` do banco ou, sem ele, a ordem de ocorrência no arquivo."""
+    discriminator = f'ref:{line.reference}' if line.reference else f'n:{occurrence}'
+    key = '|'.join([account, line.date.isoformat(), f'{line.amount:.2f}', _normalize(line.description), discriminator])
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def _build(line: StatementLine, digest: str, source: str):
+    description = (line.description or 'Lançamento do extrato')[:255]
+    notes = f'Importado de {source}' + (f' (doc. {line.reference})' if line.reference else '')
+    if line.amount < 0:
+        return Expense(
+            description=description,
+            amount=-line.amount,
+            category=categorize(line.description),
+            payment_date=line.date,
+            payment_method=IMPORT_METHOD,
+            notes=notes,
+            import_hash=digest,
+        )
+    return ExtraIncome(
+        description=description,
+        amount=line.amount,
+        received_date=line.date,
+        method=IMPORT_METHOD,
+        notes=notes,
+        import_hash=digest,
+    )
+
+
+def _existing_hashes(digests: Iterable[str]) -> set:
+    digests = list(digests)
+    return (
+        set(Expense.objects.filter(import_hash__in=digests).values_list('import_hash', flat=True))
+        | set(ExtraIncome.objects.filter(import_hash__in=digests).values_list('import_hash', flat=True))
+    )
+
+
+def import_statement(stream: BinaryIO, statement_format: str, *, account: str = '', source: str = 'extrato',
+                     dry_run: bool = False, batch_size: int = IMPORT_BATCH_SIZE) -> ImportResult:
+    """
+    Importa um extrato bancário.
+
+    Args:
+        stream (BinaryIO): Arquivo aberto em modo binário (upload ou arquivo local).
+        statement_format (str): ``'csv'`` ou ``'ofx'``.
+        account (str): Identificação da conta, parte da chave natural.
+        source (str): Nome do arquivo, gravado nas observações.
+        dry_run (bool): Apenas simula: conta novos e duplicados e monta a prévia, sem gravar.
+        batch_size (int): Lançamentos por ``bulk_create``.
+
+    Returns:
+        ImportResult: Quantidades criadas (ou que seriam criadas), duplicados,
+        erros por linha e prévia das primeiras linhas novas.
+
+    Raises:
+        StatementError: Se o formato ou o cabeçalho do arquivo forem inválidos.
+    """
+    if statement_format not in STATEMENT_FORMATS:
+        raise StatementError('Formato de extrato não suportado.')
+    result = ImportResult(dry_run=dry_run)
+    reader = iter_ofx_lines if statement_format == 'ofx' else iter_csv_lines
+    occurrences: Counter = Counter()
+
+    def flush(batch: List[Tuple[StatementLine, str]]):
+        existing = _existing_hashes(digest for _, digest in batch)
+        closed = closed_months(line.date for line, _ in batch)
+        expenses, incomes = [], []
+        for line, digest in batch:
+            if digest in existing:
+                result.duplicates += 1
+                continue
+            if month_start(line.date) in closed:
+                result.errors.append((line.line_number, f'Mês {line.date:%m/%Y} fechado.'))
+                continue
+            existing.add(digest)
+            record = _build(line, digest, source)
+            (expenses if isinstance(record, Expense) else incomes).append(record)
+            result.dates.add(line.date)
+            if len(result.preview) < PREVIEW_ROWS:
+                result.preview.append({
+                    'line': line.line_number,
+                    'date': line.date,
+                    'description': record.description,
+                    'amount': line.amount,
+                    'kind': 'despesa' if isinstance(record, Expense) else 'receita',
+                    'category': record.get_category_display() if isinstance(record, Expense) else '',
+                })
+        result.expenses += len(expenses)
+        result.incomes += len(incomes)
+        if not dry_run:
+            Expense.objects.bulk_create(expenses)
+            ExtraIncome.objects.bulk_create(incomes)
+
+    with transaction.atomic():
+        batch: List[Tuple[StatementLine, str]] = []
+        for line in reader(stream, result.errors):
+            if line.amount == 0:
+                continue
+            natural = (line.date, line.amount, _normalize(line.description), line.reference)
+            occurrences[natural] += 1
+            batch.append((line, import_hash(line, account, occurrences[natural])))
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+        if not dry_run and result.dates:
+            ledger_bulk_created.send(
+                sender=import_statement, models=(Expense, ExtraIncome), dates=sorted(result.dates),
+            )
+    return result
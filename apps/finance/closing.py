@@ -0,0 +1,193 @@
+"""
+Fechamento mensal do financeiro.
+
+``close_month`` congela em ``MonthlyClosing`` os totais de PIX, dinheiro,
+despesas (também por categoria) e o saldo de um mês já encerrado. A partir
+daí despesas e pagamentos datados no mês são recusados com
+``ClosedMonthError`` (ver ``signals``): correções entram como ajustes no mês
+aberto, e o fechamento continua valendo.
+
+``period_totals`` atende qualquer período somando os fechamentos dos meses
+inteiros já fechados e calculando do banco apenas os trechos abertos.
+"""
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, Optional, Set
+
+from django.db import IntegrityError, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from apps.reports.ledger import local_day_bounds
+from apps.reservations.models import PaymentEvent, ReservationGuest
+
+from .models import Expense, MonthlyClosing
+
+
+class ClosedMonthError(ValueError):
+    """Lançamento em um mês já fechado."""
+
+
+@dataclass
+class PeriodTotals:
+    pix: Decimal = Decimal('0')
+    dinheiro: Decimal = Decimal('0')
+    despesas: Decimal = Decimal('0')
+    despesas_por_categoria: Dict[str, Decimal] = field(default_factory=dict)
+
+    @property
+    def total_recebido(self) -> Decimal:
+        return self.pix + self.dinheiro
+
+    @property
+    def saldo(self) -> Decimal:
+        return self.total_recebido - self.despesas
+
+    @classmethod
+    def from_closing(cls, closing: MonthlyClosing) -> 'PeriodTotals':
+        return cls(
+            pix=closing.pix,
+            dinheiro=closing.dinheiro,
+            despesas=closing.despesas,
+            despesas_por_categoria={
+                category: Decimal(total) for category, total in closing.despesas_por_categoria.items()
+            },
+        )
+
+    def add(self, other: 'PeriodTotals') -> None:
+        self.pix += other.pix
+        self.dinheiro += other.dinheiro
+        self.despesas += other.despesas
+        for category, total in other.despesas_por_categoria.items():
+            self.despesas_por_categoria[category] = self.despesas_por_categoria.get(category, Decimal('0')) + total
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def next_month(month: date) -> date:
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def month_end(month: date) -> date:
+    return next_month(month) - timedelta(days=1)
+
+
+def live_totals(start_date: date, end_date: date) -> PeriodTotals:
+    """Calcula os totais do período direto dos lançamentos (duas consultas agrupadas)."""
+    por_metodo = PaymentEvent.objects.no_intervalo(*local_day_bounds(start_date, end_date)).totais_por_metodo()
+    por_categoria = {
+        category: total or Decimal('0')
+        for category, total in Expense.objects.filter(payment_date__gte=start_date, payment_date__lte=end_date)
+        .order_by().values_list('category').annotate(total=Sum('amount'))
+    }
+    return PeriodTotals(
+        pix=por_metodo.get(ReservationGuest.MetodoPagamento.PIX, Decimal('0')),
+        dinheiro=por_metodo.get(ReservationGuest.MetodoPagamento.DINHEIRO, Decimal('0')),
+        despesas=sum(por_categoria.values(), Decimal('0')),
+        despesas_por_categoria=por_categoria,
+    )
+
+
+def period_totals(start_date: date, end_date: date) -> PeriodTotals:
+    """
+    Totais do período, usando os fechamentos dos meses inteiros já fechados.
+
+    Trechos abertos consecutivos (inícios e fins parciais de mês, meses sem
+    fechamento) são calculados juntos, em uma única passada pelo banco.
+
+    Args:
+        start_date (date): Data inicial (inclusiva).
+        end_date (date): Data final (inclusiva).
+
+    Returns:
+        PeriodTotals: PIX, dinheiro, despesas (total e por categoria) e saldo.
+    """
+    totals = PeriodTotals()
+    if start_date > end_date:
+        return totals
+    closings = {
+        closing.mes: closing
+        for closing in MonthlyClosing.objects.filter(mes__gte=month_start(start_date), mes__lte=end_date)
+    }
+    live_start: Optional[date] = None
+    month = month_start(start_date)
+    while month <= end_date:
+        closing = closings.get(month)
+        if closing is not None and start_date <= month and month_end(month) <= end_date:
+            if live_start is not None:
+                totals.add(live_totals(live_start, month - timedelta(days=1)))
+                live_start = None
+            totals.add(PeriodTotals.from_closing(closing))
+        elif live_start is None:
+            live_start = max(month, start_date)
+        month = next_month(month)
+    if live_start is not None:
+        totals.add(live_totals(live_start, end_date))
+    return totals
+
+
+def closed_months(days: Iterable[date]) -> Set[date]:
+    """Meses (dia 1) fechados entre os de ``days``."""
+    months = {month_start(day) for day in days if day is not None}
+    if not months:
+        return set()
+    return set(MonthlyClosing.objects.filter(mes__in=months).values_list('mes', flat=True))
+
+
+def ensure_open(*days: Optional[date]) -> None:
+    """
+    Garante que nenhuma das datas caia em mês fechado.
+
+    Raises:
+        ClosedMonthError: Se alguma cair.
+    """
+    closed = closed_months(days)
+    if closed:
+        month = min(closed)
+        raise ClosedMonthError(
+            f'O mês {month:%m/%Y} está fechado; registre a correção como ajuste no mês atual.'
+        )
+
+
+def close_month(month: date, user=None) -> MonthlyClosing:
+    """
+    Fecha um mês já encerrado, congelando os seus totais.
+
+    Args:
+        month (date): Qualquer data do mês.
+        user: Usuário responsável (opcional).
+
+    Returns:
+        MonthlyClosing: Fechamento criado.
+
+    Raises:
+        ValueError: Se o mês ainda não terminou ou já está fechado.
+    """
+    month = month_start(month)
+    if month >= month_start(timezone.localdate()):
+        raise ValueError('Só é possível fechar meses já encerrados.')
+    try:
+        with transaction.atomic():
+            totals = live_totals(month, month_end(month))
+            return MonthlyClosing.objects.create(
+                mes=month,
+                pix=totals.pix,
+                dinheiro=totals.dinheiro,
+                despesas=totals.despesas,
+                saldo=totals.saldo,
+                despesas_por_categoria={
+                    category: f'{total:.2f}' for category, total in totals.despesas_por_categoria.items()
+                },
+                fechado_por=user if user is not None and user.is_authenticated else None,
+            )
+    except IntegrityError:
+        raise ValueError(f'O mês {month:%m/%Y} já está fechado.')
+
+
+def reopen_month(month: date) -> bool:
+    """Desfaz o fechamento do mês, liberando novos lançamentos. Retorna ``True`` se havia fechamento."""
+    deleted, _ = MonthlyClosing.objects.filter(mes=month_start(month)).delete()
+    return bool(deleted)
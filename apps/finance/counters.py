@@ -0,0 +1,156 @@
+"""
+Contadores ao vivo do caixa do dia.
+
+Os totais de hoje (PIX, dinheiro, ajustes de crédito/débito, receitas avulsas
+e despesas) ficam no cache, em centavos, uma chave por contador e por data
+local. Cada lançamento novo soma o seu valor com ``incr`` depois do commit
+(ver ``signals``), então ler o caixa custa um ``get_many``, por mais tablets
+que estejam abertos. À meia-noite as chaves do novo dia ainda não existem e
+são calculadas do banco na primeira leitura; edições de lançamentos apenas
+descartam os contadores do dia, recalculados da mesma forma.
+
+Um ``incr`` que não acha a chave pode ter caído no meio de uma semeadura
+(depois da leitura do banco, antes do ``add``). Por isso ele marca o dia como
+desatualizado (``STALE_FIELD``); a leitura seguinte vê a marca no mesmo
+``get_many``, descarta os contadores do dia e semeia de novo.
+
+Depois de cada alteração os totais de hoje são publicados no canal ``caixa``
+(``hotel_hms.events``, evento ``caixa``), lido pelos fluxos do caixa e do
+quadro de quartos.
+
+Com ``REDIS_URL`` os contadores são compartilhados entre os workers; sem ele
+cada processo tem a sua cópia, que expira em ``CASH_COUNTERS_TIMEOUT``.
+"""
+from datetime import date
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from apps.reports.ledger import local_day_bounds
+from apps.reservations.models import PaymentEvent, ReservationGuest
+from hotel_hms import events
+
+from .models import Expense, ExtraIncome, LedgerAdjustment
+
+CACHE_ALIAS = 'default'
+CASH_CHANNEL = 'caixa'
+COUNTER_FIELDS = ('pix', 'dinheiro', 'ajustes_credito', 'ajustes_debito', 'extras', 'despesas')
+STALE_FIELD = 'desatualizado'
+PAYMENT_METHOD_FIELDS = {
+    ReservationGuest.MetodoPagamento.PIX: 'pix',
+    ReservationGuest.MetodoPagamento.DINHEIRO: 'dinheiro',
+}
+ADJUSTMENT_FIELDS = {
+    LedgerAdjustment.Tipo.CREDITO: 'ajustes_credito',
+    LedgerAdjustment.Tipo.DEBITO: 'ajustes_debito',
+}
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def counter_key(day: date, field: str) -> str:
+    return f'caixa:{day.isoformat()}:{field}'
+
+
+def _cents(value) -> int:
+    return int((Decimal(value) * 100).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def compute_day_totals(day: date) -> Dict[str, Decimal]:
+    """Calcula os totais do caixa de ``day`` direto do banco (usado para semear os contadores)."""
+    inicio, fim = local_day_bounds(day, day)
+    por_metodo = PaymentEvent.objects.no_intervalo(inicio, fim).totais_por_metodo()
+    ajustes = dict(
+        LedgerAdjustment.objects.filter(criado_em__gte=inicio, criado_em__lt=fim)
+        .order_by().values_list('tipo').annotate(total=Sum('valor'))
+    )
+    totals = {
+        'extras': ExtraIncome.objects.filter(received_date=day).aggregate(total=Sum('amount'))['total'],
+        'despesas': Expense.objects.filter(payment_date=day).aggregate(total=Sum('amount'))['total'],
+    }
+    for metodo, field in PAYMENT_METHOD_FIELDS.items():
+        totals[field] = por_metodo.get(metodo)
+    for tipo, field in ADJUSTMENT_FIELDS.items():
+        totals[field] = ajustes.get(tipo)
+    return {field: totals[field] or Decimal('0') for field in COUNTER_FIELDS}
+
+
+def read_counters(day: Optional[date] = None) -> Dict[str, Decimal]:
+    """
+    Lê os contadores do dia (padrão: hoje), semeando os que faltarem.
+
+    Returns:
+        Dict[str, Decimal]: Valor de cada contador de ``COUNTER_FIELDS``.
+    """
+    day = day or timezone.localdate()
+    keys = {counter_key(day, field): field for field in COUNTER_FIELDS}
+    stale_key = counter_key(day, STALE_FIELD)
+    cache = _cache()
+    cached = cache.get_many([*keys, stale_key])
+    if stale_key in cached:
+        # Apaga antes de ler o banco: um ``incr`` durante a nova semeadura também erra e marca de novo.
+        cache.delete_many([*keys, stale_key])
+        cached = {}
+    if len(cached) < len(keys):
+        totals = compute_day_totals(day)
+        for key, field in keys.items():
+            if key not in cached:
+                # ``add`` não sobrescreve um contador semeado por outro processo nesse meio tempo.
+                cache.add(key, _cents(totals[field]), timeout=settings.CASH_COUNTERS_TIMEOUT)
+        cached = cache.get_many(list(keys))
+    return {field: Decimal(cached.get(key, 0)) / 100 for key, field in keys.items()}
+
+
+def cash_payload() -> Dict[str, float]:
+    """Contadores de hoje no formato enviado aos clientes (JSON)."""
+    return {field: float(value) for field, value in read_counters().items()}
+
+
+def publish_totals() -> None:
+    """Publica os totais de hoje no canal ``caixa`` (sem assinantes, não lê nada)."""
+    if events.has_subscribers(CASH_CHANNEL):
+        events.publish(CASH_CHANNEL, 'caixa', cash_payload())
+
+
+def bump(day: Optional[date], field: str, amount) -> None:
+    """
+    Soma ``amount`` ao contador de ``day`` depois do commit da transação atual.
+
+    Só os contadores de hoje são mantidos; lançamentos de outras datas são
+    ignorados. Se o contador ainda não foi semeado, o dia é marcado como
+    desatualizado e a próxima leitura semeia de novo, já com este lançamento.
+    """
+    if day is None or not amount:
+        return
+    delta = _cents(amount)
+
+    def apply():
+        if day != timezone.localdate():
+            return
+        try:
+            _cache().incr(counter_key(day, field), delta)
+        except ValueError:
+            _cache().set(counter_key(day, STALE_FIELD), 1, timeout=settings.CASH_COUNTERS_TIMEOUT)
+        publish_totals()
+
+    transaction.on_commit(apply)
+
+
+def invalidate(day: Optional[date] = None) -> None:
+    """Descarta os contadores de ``day`` (padrão: hoje) após o commit; a próxima leitura recalcula."""
+    day = day or timezone.localdate()
+
+    def apply():
+        _cache().delete_many([counter_key(day, field) for field in COUNTER_FIELDS])
+        if day == timezone.localdate():
+            publish_totals()
+
+    transaction.on_commit(apply)
+
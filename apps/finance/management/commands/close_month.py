@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.finance.closing import close_month, month_start, reopen_month
+
+
+class Command(BaseCommand):
+    help = 'Fecha um mês do financeiro (padrão: o mês anterior), congelando os seus totais.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help='Mês a fechar, no formato AAAA-MM.')
+        parser.add_argument('--reopen', action='store_true', help='Desfaz o fechamento do mês em vez de fechar.')
+
+    def handle(self, *args, **options):
+        if options['month']:
+            try:
+                month = datetime.strptime(options['month'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError(f"Mês inválido: {options['month']} (use AAAA-MM).")
+        else:
+            month = month_start(month_start(timezone.localdate()) - timedelta(days=1))
+
+        if options['reopen']:
+            if reopen_month(month):
+                self.stdout.write(self.style.WARNING(f'Fechamento de {month:%m/%Y} desfeito.'))
+            else:
+                self.stdout.write(f'{month:%m/%Y} não estava fechado.')
+            return
+
+        try:
+            closing = close_month(month)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(
+            f'{closing.mes:%m/%Y} fechado: PIX R$ {closing.pix}, dinheiro R$ {closing.dinheiro}, '
+            f'despesas R$ {closing.despesas}, saldo R$ {closing.saldo}.'
+        ))
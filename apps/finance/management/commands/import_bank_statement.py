@@ -0,0 +1,41 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.finance.bank_import import STATEMENT_FORMATS, StatementError, import_statement
+
+
+class Command(BaseCommand):
+    help = 'Importa um extrato bancário (CSV ou OFX) para despesas e receitas avulsas, sem duplicar lançamentos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Arquivo do extrato.')
+        parser.add_argument('--format', choices=STATEMENT_FORMATS,
+                            help='Formato do arquivo (padrão: pela extensão).')
+        parser.add_argument('--account', default='', help='Identificação da conta bancária.')
+        parser.add_argument('--dry-run', action='store_true', help='Apenas simula, sem gravar.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        statement_format = options['format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        try:
+            with open(path, 'rb') as handle:
+                result = import_statement(
+                    handle,
+                    statement_format,
+                    account=options['account'],
+                    source=os.path.basename(path),
+                    dry_run=options['dry_run'],
+                )
+        except OSError as exc:
+            raise CommandError(f'Não foi possível ler {path}: {exc}')
+        except StatementError as exc:
+            raise CommandError(str(exc))
+
+        for line_number, error in result.errors:
+            self.stdout.write(self.style.WARNING(f'Linha {line_number}: {error}'))
+        verb = 'seriam importadas' if result.dry_run else 'importadas'
+        self.stdout.write(self.style.SUCCESS(
+            f'{result.expenses} despesa(s) e {result.incomes} receita(s) {verb}; '
+            f'{result.duplicates} já existente(s).'
+        ))
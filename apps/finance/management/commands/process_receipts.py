@@ -0,0 +1,37 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from apps.finance.receipts import claim_next_receipt, process_receipt, requeue_stale_receipts
+
+
+class Command(BaseCommand):
+    help = 'Gera miniaturas e versões comprimidas dos comprovantes enviados (fila ReceiptAsset).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Segundos entre consultas à fila vazia.')
+        parser.add_argument('--stale-minutes', type=int, default=10,
+                            help='Devolve à fila comprovantes em processamento há mais tempo que isso.')
+        parser.add_argument('--once', action='store_true', help='Processa os comprovantes pendentes e encerra.')
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_receipts(timedelta(minutes=options['stale_minutes']))
+        if requeued:
+            self.stdout.write(self.style.WARNING(f'{requeued} comprovante(s) interrompido(s) devolvido(s) à fila.'))
+
+        self.stdout.write('Worker de comprovantes iniciado.')
+        try:
+            while True:
+                asset_id = claim_next_receipt()
+                if asset_id is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+                if process_receipt(asset_id):
+                    self.stdout.write(self.style.SUCCESS(f'Comprovante #{asset_id} processado.'))
+                else:
+                    self.stdout.write(self.style.ERROR(f'Comprovante #{asset_id} falhou.'))
+        except KeyboardInterrupt:
+            self.stdout.write('Worker de comprovantes encerrado.')
@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-18 19:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='expense',
+            name='payment_date',
+            field=models.DateField(db_index=True, verbose_name='Data de Pagamento'),
+        ),
+        migrations.AlterField(
+            model_name='extraincome',
+            name='received_date',
+            field=models.DateField(db_index=True, verbose_name='Data de Recebimento'),
+        ),
+        migrations.AlterField(
+            model_name='ledgeradjustment',
+            name='criado_em',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
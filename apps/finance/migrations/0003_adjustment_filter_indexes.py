@@ -0,0 +1,30 @@
+# Generated by Django 5.2 on 2026-10-18 19:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0002_index_ledger_dates'),
+        ('reservations', '0005_payment_event'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ledgeradjustment',
+            index=models.Index(fields=['criado_em', 'id'], name='ajuste_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ledgeradjustment',
+            index=models.Index(fields=['tipo', 'criado_em', 'id'], name='ajuste_tipo_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ledgeradjustment',
+            index=models.Index(fields=['reservation', 'criado_em', 'id'], name='ajuste_reserva_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ledgeradjustment',
+            index=models.Index(fields=['metodo', 'criado_em', 'id'], name='ajuste_metodo_data_idx'),
+        ),
+    ]
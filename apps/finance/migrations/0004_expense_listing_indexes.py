@@ -0,0 +1,21 @@
+# Generated by Django 5.2 on 2026-10-18 20:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0003_adjustment_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['payment_date', 'id'], name='despesa_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['category', 'payment_date', 'id'], name='despesa_categoria_data_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-18 20:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0004_expense_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expense',
+            name='import_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True, verbose_name='Chave de importação'),
+        ),
+        migrations.AddField(
+            model_name='extraincome',
+            name='import_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True, verbose_name='Chave de importação'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2 on 2026-10-18 20:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0005_statement_import_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReceiptAsset',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(editable=False, max_length=64, unique=True)),
+                ('file', models.FileField(max_length=255, upload_to='expenses/receipts/')),
+                ('preview', models.FileField(blank=True, max_length=255, upload_to='expenses/receipts/')),
+                ('thumbnail', models.FileField(blank=True, max_length=255, upload_to='expenses/receipts/')),
+                ('content_type', models.CharField(max_length=100)),
+                ('size', models.PositiveBigIntegerField()),
+                ('original_name', models.CharField(blank=True, max_length=255)),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('processando', 'Processando'), ('concluido', 'Concluído'), ('erro', 'Erro')], default='pendente', max_length=20)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+            ],
+            options={
+                'verbose_name': 'Comprovante',
+                'verbose_name_plural': 'Comprovantes',
+                'indexes': [models.Index(fields=['status', 'created_at'], name='comprovante_fila_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='expense',
+            name='receipt_asset',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='despesas', to='finance.receiptasset', verbose_name='Comprovante'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-18 20:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0006_receipt_assets'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyClosing',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(unique=True, verbose_name='Mês')),
+                ('pix', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('dinheiro', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('despesas', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('saldo', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('despesas_por_categoria', models.JSONField(blank=True, default=dict)),
+                ('fechado_em', models.DateTimeField(auto_now_add=True)),
+                ('fechado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='fechamentos', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Fechamento Mensal',
+                'verbose_name_plural': 'Fechamentos Mensais',
+                'ordering': ['-mes'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 20:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0007_monthly_closing'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ledgeradjustment',
+            name='criado_em',
+            field=models.DateTimeField(auto_now_add=True),
+        ),
+    ]
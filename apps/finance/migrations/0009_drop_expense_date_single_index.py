@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 20:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0008_drop_adjustment_date_single_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='expense',
+            name='payment_date',
+            field=models.DateField(verbose_name='Data de Pagamento'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2 on 2026-10-18 21:05
+
+from django.db import migrations, models
+
+
+def copiar_data_de_criacao(apps, schema_editor):
+    """Ajustes existentes passam a ter ``atualizado_em`` igual a ``criado_em``."""
+    LedgerAdjustment = apps.get_model('finance', 'LedgerAdjustment')
+    LedgerAdjustment.objects.update(atualizado_em=models.F('criado_em'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0009_drop_expense_date_single_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ledgeradjustment',
+            name='atualizado_em',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(copiar_data_de_criacao, migrations.RunPython.noop),
+    ]
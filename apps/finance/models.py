@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.db import models
 
 
@@ -18,14 +19,61 @@ class LedgerAdjustment(models.Model):
     valor = models.DecimalField(max_digits=10, decimal_places=2)
     metodo = models.CharField(max_length=30, blank=True, null=True)
     criado_em = models.DateTimeField(auto_now_add=True)
+    atualizado_em = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-criado_em']
+        indexes = [
+            models.Index(fields=['criado_em', 'id'], name='ajuste_data_idx'),
+            models.Index(fields=['tipo', 'criado_em', 'id'], name='ajuste_tipo_data_idx'),
+            models.Index(fields=['reservation', 'criado_em', 'id'], name='ajuste_reserva_data_idx'),
+            models.Index(fields=['metodo', 'criado_em', 'id'], name='ajuste_metodo_data_idx'),
+        ]
 
     def __str__(self):
         destino = f"Reserva {self.reservation_id}" if self.reservation_id else 'Operação Geral'
         return f"{self.get_tipo_display()} - {destino} - R$ {self.valor}"
 
+class ReceiptAsset(models.Model):
+    """
+    Arquivo de comprovante endereçado pelo conteúdo.
+
+    O arquivo é gravado uma única vez por SHA-256 (envios repetidos do mesmo
+    comprovante reaproveitam o registro) e a miniatura e a versão comprimida
+    são geradas depois, pelo comando ``process_receipts`` (ver
+    ``apps.finance.receipts``).
+    """
+    class Status(models.TextChoices):
+        PENDENTE = 'pendente', 'Pendente'
+        PROCESSANDO = 'processando', 'Processando'
+        CONCLUIDO = 'concluido', 'Concluído'
+        ERRO = 'erro', 'Erro'
+
+    sha256 = models.CharField(max_length=64, unique=True, editable=False)
+    file = models.FileField(upload_to='expenses/receipts/', max_length=255)
+    preview = models.FileField(upload_to='expenses/receipts/', max_length=255, blank=True)
+    thumbnail = models.FileField(upload_to='expenses/receipts/', max_length=255, blank=True)
+    content_type = models.CharField(max_length=100)
+    size = models.PositiveBigIntegerField()
+    original_name = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDENTE)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='comprovante_fila_idx'),
+        ]
+        verbose_name = "Comprovante"
+        verbose_name_plural = "Comprovantes"
+
+    def __str__(self):
+        return f"{self.original_name or self.sha256[:12]} ({self.get_status_display()})"
+
+
 class Expense(models.Model):
     CATEGORY_CHOICES = [
         ('utilities', 'Contas de Serviços (Água/Luz/Internet)'),
@@ -44,10 +92,24 @@ class Expense(models.Model):
     payment_date = models.DateField(verbose_name="Data de Pagamento")
     payment_method = models.CharField(max_length=50, verbose_name="Método de Pagamento")
     receipt = models.FileField(upload_to='expenses/receipts/', blank=True, null=True, verbose_name="Comprovante")
+    receipt_asset = models.ForeignKey(
+        ReceiptAsset,
+        on_delete=models.PROTECT,
+        related_name='despesas',
+        blank=True,
+        null=True,
+        verbose_name="Comprovante",
+    )
     notes = models.TextField(blank=True, null=True, verbose_name="Observações")
+    import_hash = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False,
+                                   verbose_name="Chave de importação")
     
     class Meta:
         ordering = ['-payment_date']
+        indexes = [
+            models.Index(fields=['payment_date', 'id'], name='despesa_data_idx'),
+            models.Index(fields=['category', 'payment_date', 'id'], name='despesa_categoria_data_idx'),
+        ]
         verbose_name = "Despesa"
         verbose_name_plural = "Despesas"
     
@@ -58,9 +120,11 @@ class ExtraIncome(models.Model):
     description = models.CharField(max_length=255, verbose_name="Descrição")
     amount = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Valor")
     date_created = models.DateField(auto_now_add=True, verbose_name="Data de Registro")
-    received_date = models.DateField(verbose_name="Data de Recebimento")
+    received_date = models.DateField(db_index=True, verbose_name="Data de Recebimento")
     method = models.CharField(max_length=50, verbose_name="Método de Recebimento")
     notes = models.TextField(blank=True, null=True, verbose_name="Observações")
+    import_hash = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False,
+                                   verbose_name="Chave de importação")
 
     class Meta:
         verbose_name = "Receita Avulsa"
@@ -68,3 +132,35 @@ class ExtraIncome(models.Model):
 
     def __str__(self):
         return f"{self.description} - R$ {self.amount}"
+
+
+class MonthlyClosing(models.Model):
+    """
+    Fechamento mensal: totais congelados de um mês encerrado.
+
+    Depois do fechamento, despesas e pagamentos do mês não podem mais ser
+    gravados nem excluídos (correções entram como ``LedgerAdjustment`` no mês
+    aberto), e o financeiro soma estes totais em vez de recalcular o mês.
+    """
+    mes = models.DateField(unique=True, verbose_name="Mês")  # sempre o dia 1
+    pix = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    dinheiro = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    despesas = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    saldo = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    despesas_por_categoria = models.JSONField(default=dict, blank=True)
+    fechado_em = models.DateTimeField(auto_now_add=True)
+    fechado_por = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        related_name='fechamentos',
+        blank=True,
+        null=True,
+    )
+
+    class Meta:
+        ordering = ['-mes']
+        verbose_name = "Fechamento Mensal"
+        verbose_name_plural = "Fechamentos Mensais"
+
+    def __str__(self):
+        return f"Fechamento {self.mes:%m/%Y} - saldo R$ {self.saldo}"
@@ -0,0 +1,205 @@
+"""
+Armazenamento dos comprovantes de despesas.
+
+``store_receipt`` copia o upload para um arquivo temporário em blocos,
+calculando o SHA-256 no caminho, e grava o conteúdo no ``storage`` em um nome
+derivado do próprio hash (``expenses/receipts/ab/abcd....jpg``). O mesmo
+comprovante enviado de novo reaproveita o ``ReceiptAsset`` existente, sem
+ocupar mais disco.
+
+Miniatura e versão comprimida (fotos de celular costumam ter vários MB) ficam
+para o comando ``process_receipts``, que usa a tabela ``ReceiptAsset`` como
+fila da mesma forma que ``apps.reports.jobs``; as imagens são geradas com o
+Pillow.
+"""
+import hashlib
+import io
+import tempfile
+import traceback
+from datetime import timedelta
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .models import ReceiptAsset
+
+RECEIPT_DIR = 'expenses/receipts'
+RECEIPT_CHUNK_SIZE = 64 * 1024
+THUMBNAIL_MAX_SIDE = 320
+PREVIEW_MAX_SIDE = 1600
+PREVIEW_QUALITY = 80
+THUMBNAIL_QUALITY = 70
+RASTER_TYPES = ('image/jpeg', 'image/png', 'image/gif', 'image/webp')
+
+# Assinaturas (bytes iniciais) dos formatos aceitos.
+_SIGNATURES = (
+    (b'\xff\xd8\xff', 'image/jpeg', '.jpg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png', '.png'),
+    (b'GIF87a', 'image/gif', '.gif'),
+    (b'GIF89a', 'image/gif', '.gif'),
+    (b'%PDF-', 'application/pdf', '.pdf'),
+)
+_HEIF_BRANDS = (b'heic', b'heix', b'mif1', b'msf1')
+
+
+class ReceiptError(ValueError):
+    """Arquivo de comprovante recusado (formato ou tamanho)."""
+
+
+def sniff_content_type(head: bytes) -> Tuple[str, str]:
+    """
+    Identifica o formato pelos primeiros bytes do arquivo.
+
+    Returns:
+        Tuple[str, str]: ``content_type`` e extensão usada no nome gravado.
+
+    Raises:
+        ReceiptError: Se o arquivo não for imagem (JPEG, PNG, GIF, WebP, HEIC) ou PDF.
+    """
+    for signature, content_type, extension in _SIGNATURES:
+        if head.startswith(signature):
+            return content_type, extension
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp', '.webp'
+    if head[4:8] == b'ftyp' and head[8:12] in _HEIF_BRANDS:
+        return 'image/heic', '.heic'
+    raise ReceiptError('Formato de comprovante não suportado (envie imagem ou PDF).')
+
+
+def receipt_name(digest: str, suffix: str) -> str:
+    return f'{RECEIPT_DIR}/{digest[:2]}/{digest}{suffix}'
+
+
+def store_receipt(upload) -> ReceiptAsset:
+    """
+    Grava um comprovante enviado, deduplicando pelo conteúdo.
+
+    Args:
+        upload: ``UploadedFile`` (ou qualquer ``File``) com o comprovante.
+
+    Returns:
+        ReceiptAsset: Registro novo (``pendente``) ou o já existente com o mesmo SHA-256.
+
+    Raises:
+        ReceiptError: Se o arquivo estiver vazio, for grande demais ou de formato não aceito.
+    """
+    limit = settings.RECEIPT_MAX_UPLOAD_SIZE
+    if upload.size and upload.size > limit:
+        raise ReceiptError(f'Comprovante maior que {limit // (1024 * 1024)} MB.')
+
+    digest = hashlib.sha256()
+    head = b''
+    size = 0
+    with tempfile.NamedTemporaryFile(dir=settings.FILE_UPLOAD_TEMP_DIR) as handle:
+        for chunk in upload.chunks(RECEIPT_CHUNK_SIZE):
+            size += len(chunk)
+            if size > limit:
+                raise ReceiptError(f'Comprovante maior que {limit // (1024 * 1024)} MB.')
+            if len(head) < 16:
+                head += chunk[:16 - len(head)]
+            digest.update(chunk)
+            handle.write(chunk)
+        if not size:
+            raise ReceiptError('Comprovante vazio.')
+        content_type, extension = sniff_content_type(head)
+        sha256 = digest.hexdigest()
+
+        existing = ReceiptAsset.objects.filter(sha256=sha256).first()
+        if existing is not None:
+            return existing
+
+        name = receipt_name(sha256, extension)
+        if not default_storage.exists(name):
+            handle.seek(0)
+            name = default_storage.save(name, File(handle))
+
+    try:
+        with transaction.atomic():
+            return ReceiptAsset.objects.create(
+                sha256=sha256,
+                file=name,
+                content_type=content_type,
+                size=size,
+                original_name=(getattr(upload, 'name', '') or '')[:255],
+            )
+    except IntegrityError:
+        # Outro envio do mesmo arquivo venceu a corrida; o conteúdo gravado é idêntico.
+        return ReceiptAsset.objects.get(sha256=sha256)
+
+
+def claim_next_receipt() -> Optional[int]:
+    """Reivindica o comprovante pendente mais antigo (mesmo protocolo de ``claim_next_report``)."""
+    pending = ReceiptAsset.objects.filter(status=ReceiptAsset.Status.PENDENTE).order_by('created_at', 'id')
+    for asset_id in pending.values_list('id', flat=True)[:10]:
+        claimed = ReceiptAsset.objects.filter(id=asset_id, status=ReceiptAsset.Status.PENDENTE).update(
+            status=ReceiptAsset.Status.PROCESSANDO,
+            started_at=timezone.now(),
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return asset_id
+    return None
+
+
+def requeue_stale_receipts(older_than: timedelta) -> int:
+    """Devolve à fila comprovantes ``processando`` há mais de ``older_than`` (worker interrompido)."""
+    return ReceiptAsset.objects.filter(
+        status=ReceiptAsset.Status.PROCESSANDO,
+        started_at__lt=timezone.now() - older_than,
+    ).update(status=ReceiptAsset.Status.PENDENTE)
+
+
+def _save_variant(image, name: str, max_side: int, quality: int, max_bytes: Optional[int] = None) -> str:
+    """Grava uma cópia JPEG reduzida de ``image``; devolve ``''`` se não ficar menor que ``max_bytes``."""
+    copy = image.copy()
+    copy.thumbnail((max_side, max_side))
+    buffer = io.BytesIO()
+    copy.save(buffer, 'JPEG', quality=quality, optimize=True)
+    if max_bytes is not None and buffer.tell() >= max_bytes:
+        return ''
+    if default_storage.exists(name):
+        return name
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def process_receipt(asset_id: int) -> bool:
+    """
+    Gera a miniatura e a versão comprimida de um comprovante já reivindicado.
+
+    PDFs e formatos que o Pillow não abre são servidos apenas no original.
+
+    Returns:
+        bool: ``True`` se o comprovante foi processado.
+    """
+    asset = ReceiptAsset.objects.get(id=asset_id)
+    try:
+        if asset.content_type in RASTER_TYPES:
+            with asset.file.open('rb') as handle, Image.open(handle) as source:
+                image = ImageOps.exif_transpose(source).convert('RGB')
+                asset.thumbnail.name = _save_variant(
+                    image, receipt_name(asset.sha256, '.thumb.jpg'), THUMBNAIL_MAX_SIDE, THUMBNAIL_QUALITY,
+                )
+                asset.preview.name = _save_variant(
+                    image, receipt_name(asset.sha256, '.preview.jpg'), PREVIEW_MAX_SIDE, PREVIEW_QUALITY,
+                    max_bytes=asset.size,
+                )
+    except Exception:
+        ReceiptAsset.objects.filter(id=asset_id).update(
+            status=ReceiptAsset.Status.ERRO,
+            error=traceback.format_exc(limit=5),
+            processed_at=timezone.now(),
+        )
+        return False
+
+    asset.status = ReceiptAsset.Status.CONCLUIDO
+    asset.error = ''
+    asset.processed_at = timezone.now()
+    asset.save(update_fields=['thumbnail', 'preview', 'status', 'error', 'processed_at'])
+    return True
@@ -0,0 +1,105 @@
+"""
+Sinais que mantêm os contadores do caixa do dia (``counters``).
+
+Lançamentos novos somam o seu valor ao contador; exclusões subtraem. Edições
+podem mudar valor, tipo ou data, então apenas descartam os contadores de hoje,
+que são recalculados do banco na próxima leitura.
+
+Despesas e pagamentos datados em um mês fechado (``closing``) são recusados
+antes de gravar ou excluir, com ``ClosedMonthError``.
+
+``ledger_bulk_created`` é enviado por quem grava lançamentos com
+``bulk_create`` (sem ``post_save``), como a importação de extratos e o lote de
+ajustes, com as datas dos lançamentos criados.
+"""
+from datetime import date
+
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from apps.reservations.models import PaymentEvent
+
+from . import counters
+from .closing import ensure_open
+from .models import Expense, ExtraIncome, LedgerAdjustment
+
+ledger_bulk_created = Signal()  # argumentos: models (modelos gravados), dates (datas com lançamentos novos)
+
+
+def _counter_entry(instance):
+    """Retorna ``(data local, contador, valor)`` do lançamento, ou ``None`` se não entra no caixa."""
+    if isinstance(instance, PaymentEvent):
+        field = counters.PAYMENT_METHOD_FIELDS.get(instance.metodo)
+        return (timezone.localdate(instance.pago_em), field, instance.valor) if field else None
+    if isinstance(instance, LedgerAdjustment):
+        field = counters.ADJUSTMENT_FIELDS.get(instance.tipo)
+        if field is None or instance.criado_em is None:
+            return None
+        return timezone.localdate(instance.criado_em), field, instance.valor
+    if isinstance(instance, ExtraIncome):
+        return _as_date(instance.received_date), 'extras', instance.amount
+    return _as_date(instance.payment_date), 'despesas', instance.amount
+
+
+def _as_date(day):
+    """Datas vindas de formulários chegam como texto ('AAAA-MM-DD') até o registro ser relido."""
+    return date.fromisoformat(day) if isinstance(day, str) else day
+
+
+def _ledger_day(instance):
+    """Data que coloca o lançamento em um mês (``None`` se ainda não há)."""
+    if isinstance(instance, PaymentEvent):
+        return timezone.localdate(instance.pago_em) if instance.pago_em else None
+    return _as_date(instance.payment_date)
+
+
+@receiver(pre_save, sender=PaymentEvent)
+@receiver(pre_save, sender=Expense)
+def block_closed_month_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    days = [_ledger_day(instance)]
+    if instance.pk is not None:
+        previous = sender.objects.filter(pk=instance.pk).first()
+        if previous is not None:
+            days.append(_ledger_day(previous))
+    ensure_open(*days)
+
+
+@receiver(pre_delete, sender=PaymentEvent)
+@receiver(pre_delete, sender=Expense)
+def block_closed_month_on_delete(sender, instance, **kwargs):
+    ensure_open(_ledger_day(instance))
+
+
+@receiver(post_save, sender=PaymentEvent)
+@receiver(post_save, sender=LedgerAdjustment)
+@receiver(post_save, sender=ExtraIncome)
+@receiver(post_save, sender=Expense)
+def bump_cash_counters_on_save(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    if not created:
+        counters.invalidate()
+        return
+    entry = _counter_entry(instance)
+    if entry is not None:
+        counters.bump(*entry)
+
+
+@receiver(post_delete, sender=PaymentEvent)
+@receiver(post_delete, sender=LedgerAdjustment)
+@receiver(post_delete, sender=ExtraIncome)
+@receiver(post_delete, sender=Expense)
+def bump_cash_counters_on_delete(sender, instance, **kwargs):
+    entry = _counter_entry(instance)
+    if entry is not None:
+        day, field, amount = entry
+        counters.bump(day, field, -amount)
+
+
+@receiver(ledger_bulk_created)
+def invalidate_cash_counters_on_bulk_create(sender, models, dates, **kwargs):
+    if timezone.localdate() in dates:
+        counters.invalidate()
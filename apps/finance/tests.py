@@ -1,5 +1,9 @@
+import json
+
 import pytest
+from asgiref.sync import async_to_sync
 from decimal import Decimal
+from django.test import AsyncRequestFactory
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.utils import timezone
@@ -81,6 +85,152 @@ def test_cash_overview_returns_daily_totals(client, user, reservation):
     assert payload['despesas'] == 90.0
 
 
+
+@pytest.mark.django_db
+def test_cash_overview_uses_payment_events(client, user, reservation):
+    from datetime import timedelta
+
+    from apps.reservations.models import PaymentEvent
+
+    client.force_login(user)
+    ontem = reservation.hospedes.create(nome='Clara', valor_devido=Decimal('70.00'))
+    ontem.registrar_pagamento(ReservationGuest.MetodoPagamento.PIX)
+    PaymentEvent.objects.filter(hospede=ontem).update(pago_em=timezone.now() - timedelta(days=1))
+    ontem.nome = 'Clara Souza'
+    ontem.save()
+
+    hoje = reservation.hospedes.create(nome='Davi', valor_devido=Decimal('40.00'))
+    hoje.registrar_pagamento(ReservationGuest.MetodoPagamento.PIX)
+    hoje.registrar_pagamento(ReservationGuest.MetodoPagamento.PENDENTE)
+    hoje.registrar_pagamento(ReservationGuest.MetodoPagamento.DINHEIRO)
+
+    payload = client.get(reverse('finance:cash_overview')).json()
+    assert payload['pix'] == 0.0
+    assert payload['dinheiro'] == 40.0
+    assert list(hoje.pagamentos.order_by('id').values_list('tipo', 'valor')) == [
+        (PaymentEvent.Tipo.PAGAMENTO, Decimal('40.00')),
+        (PaymentEvent.Tipo.ESTORNO, Decimal('-40.00')),
+        (PaymentEvent.Tipo.PAGAMENTO, Decimal('40.00')),
+    ]
+
+
+@pytest.mark.django_db
+def test_deleting_a_paid_guest_reverses_the_payment(client, user, reservation, django_capture_on_commit_callbacks):
+    from apps.reservations.models import PaymentEvent
+
+    client.force_login(user)
+    with django_capture_on_commit_callbacks(execute=True):
+        hospede = reservation.hospedes.create(nome='Elisa', valor_devido=Decimal('55.00'))
+        hospede.registrar_pagamento(ReservationGuest.MetodoPagamento.DINHEIRO)
+    assert client.get(reverse('finance:cash_overview')).json()['dinheiro'] == 55.0
+
+    with django_capture_on_commit_callbacks(execute=True):
+        hospede.delete()
+
+    assert list(PaymentEvent.objects.order_by('id').values_list('hospede', 'tipo', 'metodo', 'valor')) == [
+        (None, PaymentEvent.Tipo.PAGAMENTO, ReservationGuest.MetodoPagamento.DINHEIRO, Decimal('55.00')),
+        (None, PaymentEvent.Tipo.ESTORNO, ReservationGuest.MetodoPagamento.DINHEIRO, Decimal('-55.00')),
+    ]
+    assert client.get(reverse('finance:cash_overview')).json()['dinheiro'] == 0.0
+
+
+@pytest.mark.django_db
+def test_cash_counters_are_bumped_on_commit_and_streamed(client, user, django_capture_on_commit_callbacks,
+                                                         django_assert_num_queries):
+    from apps.finance.counters import read_counters
+
+    client.force_login(user)
+    today = timezone.localdate()
+    assert read_counters()['despesas'] == Decimal('0')
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Expense.objects.create(description='Gás', amount=Decimal('35.50'), category='supplies',
+                               payment_date=today, payment_method='PIX')
+        LedgerAdjustment.objects.create(descricao='Troco', tipo=LedgerAdjustment.Tipo.DEBITO,
+                                        valor=Decimal('5.00'), metodo='Dinheiro')
+
+    with django_assert_num_queries(0):
+        totals = read_counters()
+    assert totals['despesas'] == Decimal('35.50')
+    assert totals['ajustes_debito'] == Decimal('5.00')
+
+    assert client.get(reverse('finance:cash_overview')).json()['despesas'] == 35.5
+    # Sob WSGI o fluxo não prende o worker: 204 e o navegador não reconecta.
+    assert client.get(reverse('finance:cash_overview_stream')).status_code == 204
+
+    totals_payload = {field: float(value) for field, value in totals.items()}
+    request = AsyncRequestFactory().get(reverse('finance:cash_overview_stream'))
+
+    async def auser():
+        return user
+
+    request.auser = auser
+
+    async def read_stream():
+        from apps.finance.counters import CASH_CHANNEL
+        from apps.finance.views import cash_overview_stream
+        from hotel_hms import events
+
+        response = await cash_overview_stream(request)
+        assert response['Content-Type'] == 'text/event-stream'
+        stream = aiter(response.streaming_content)
+        chunks = [await anext(stream), await anext(stream)]
+        events.publish(CASH_CHANNEL, 'caixa', {**totals_payload, 'pix': 12.0})
+        chunks.append(await anext(stream))
+        await stream.aclose()
+        return [chunk.decode() if isinstance(chunk, bytes) else chunk for chunk in chunks]
+
+    retry, snapshot, pushed = async_to_sync(read_stream)()
+    assert retry.startswith('retry:')
+    assert snapshot.startswith('event: caixa\n')
+    assert json.loads(snapshot.split('data: ', 1)[1])['despesas'] == 35.5
+    assert json.loads(pushed.split('data: ', 1)[1])['pix'] == 12.0
+
+@pytest.mark.django_db
+def test_cash_counters_recover_a_payment_committed_while_seeding(reservation, monkeypatch,
+                                                                 django_capture_on_commit_callbacks):
+    """Um pagamento gravado entre a leitura do banco e o ``add`` da semeadura não se perde."""
+    from apps.finance import counters
+
+    guest = ReservationGuest.objects.create(reserva=reservation, nome='Ana', valor_devido=Decimal('70.00'))
+    original = counters.compute_day_totals
+
+    def compute_then_pay(day):
+        totals = original(day)
+        with django_capture_on_commit_callbacks(execute=True):
+            guest.registrar_pagamento(ReservationGuest.MetodoPagamento.PIX)  # ``incr`` antes do ``add``
+        return totals
+
+    monkeypatch.setattr(counters, 'compute_day_totals', compute_then_pay)
+    assert counters.read_counters()['pix'] == Decimal('0')  # semeado com a leitura anterior ao pagamento
+
+    monkeypatch.setattr(counters, 'compute_day_totals', original)
+    assert counters.read_counters()['pix'] == Decimal('70.00')
+    assert counters.read_counters()['pix'] == Decimal('70.00')
+
+
+@pytest.mark.django_db
+def test_cash_counters_count_entries_created_from_form_dates(client, user, django_capture_on_commit_callbacks):
+    """Despesas e receitas criadas pelas views (data em texto, como no POST) somam nos contadores de hoje."""
+    from apps.finance.counters import read_counters
+
+    client.force_login(user)
+    today = timezone.localdate().isoformat()
+    assert read_counters()['despesas'] == Decimal('0')
+
+    with django_capture_on_commit_callbacks(execute=True):
+        client.post(reverse('finance:create_expense'), {
+            'description': 'Gás', 'amount': '10.00', 'category': 'supplies',
+            'payment_date': today, 'payment_method': 'PIX',
+        })
+        client.post(reverse('finance:create_extra_income'), {
+            'description': 'Lavanderia', 'amount': '25.00', 'received_date': today, 'method': 'PIX',
+        })
+
+    totals = read_counters()
+    assert (totals['despesas'], totals['extras']) == (Decimal('10.00'), Decimal('25.00'))
+
+
 @pytest.mark.django_db
 def test_reservation_balances_endpoint_groups_pending_amounts(client, user, reservation):
     client.force_login(user)
@@ -101,7 +251,7 @@ def test_reservation_balances_endpoint_groups_pending_amounts(client, user, rese
 
     response = client.get(reverse('finance:reservation_balances'))
     assert response.status_code == 200
-    reservations = response.json()['reservations']
+    reservations = json.loads(b''.join(response.streaming_content))['reservations']
     assert len(reservations) == 1
     entry = reservations[0]
     assert entry['total'] == 210.0
@@ -110,6 +260,66 @@ def test_reservation_balances_endpoint_groups_pending_amounts(client, user, rese
     assert entry['active'] is True
 
 
+
+@pytest.mark.django_db
+def test_reservation_balances_filters_and_paginates_by_cursor(client, user, django_assert_max_num_queries):
+    client.force_login(user)
+    for numero in ('401', '402', '403'):
+        reserva = Reservation.objects.create(room=Room.objects.create(numero=numero))
+        reserva.hospedes.create(nome=f'Hóspede {numero}', valor_devido=Decimal('100.00'), pago=numero == '402')
+    url = reverse('finance:reservation_balances')
+
+    with django_assert_max_num_queries(5):
+        first = json.loads(b''.join(client.get(url, {'pending': '1', 'page_size': 1}).streaming_content))
+    assert [entry['room'] for entry in first['reservations']] == ['403']
+    second = json.loads(b''.join(
+        client.get(url, {'pending': '1', 'page_size': 1, 'cursor': first['next_cursor']}).streaming_content
+    ))
+    assert [entry['room'] for entry in second['reservations']] == ['401']
+    assert second['next_cursor'] is None
+    assert client.get(url, {'cursor': 'invalido'}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_list_adjustments_filters_paginates_and_supports_conditional_get(client, user, reservation,
+                                                                         django_capture_on_commit_callbacks):
+    client.force_login(user)
+    for valor in ('10.00', '20.00', '30.00'):
+        LedgerAdjustment.objects.create(reservation=reservation, descricao='Frigobar',
+                                        tipo=LedgerAdjustment.Tipo.CREDITO, valor=Decimal(valor), metodo='PIX')
+    LedgerAdjustment.objects.create(descricao='Sangria', tipo=LedgerAdjustment.Tipo.DEBITO,
+                                    valor=Decimal('5.00'), metodo='Dinheiro')
+    url = reverse('finance:list_adjustments')
+    query = {'tipo': 'credito', 'reservation': reservation.id, 'page_size': 2}
+
+    first = client.get(url, query)
+    assert [item['valor'] for item in first.json()['adjustments']] == [30.0, 20.0]
+    second = client.get(url, {**query, 'cursor': first.json()['next_cursor']}).json()
+    assert [item['valor'] for item in second['adjustments']] == [10.0]
+    assert second['next_cursor'] is None
+
+    assert client.get(url, query, HTTP_IF_NONE_MATCH=first['ETag']).status_code == 304
+    assert 'Last-Modified' not in first
+
+    # Edições e exclusões também mudam o ``ETag``.
+    newest = LedgerAdjustment.objects.filter(tipo='credito', reservation=reservation).latest('criado_em')
+    newest.descricao = 'Frigobar (corrigido)'
+    newest.save()
+    edited = client.get(url, query, HTTP_IF_NONE_MATCH=first['ETag'])
+    assert edited.status_code == 200
+    assert edited.json()['adjustments'][0]['descricao'] == 'Frigobar (corrigido)'
+    oldest = LedgerAdjustment.objects.filter(tipo='credito', reservation=reservation).earliest('criado_em')
+    oldest.delete()
+    trimmed = client.get(url, query, HTTP_IF_NONE_MATCH=edited['ETag'])
+    assert trimmed.status_code == 200
+    assert trimmed.json()['next_cursor'] is None
+    with django_capture_on_commit_callbacks(execute=True):
+        LedgerAdjustment.objects.create(reservation=reservation, descricao='Lavanderia',
+                                        tipo=LedgerAdjustment.Tipo.CREDITO, valor=Decimal('40.00'))
+    refreshed = client.get(url, query, HTTP_IF_NONE_MATCH=first['ETag'])
+    assert refreshed.status_code == 200
+    assert refreshed.json()['adjustments'][0]['valor'] == 40.0
+
 @pytest.mark.django_db
 def test_create_adjustment_endpoint_creates_record(client, user, reservation):
     client.force_login(user)
@@ -124,3 +334,252 @@ def test_create_adjustment_endpoint_creates_record(client, user, reservation):
     response = client.post(reverse('finance:create_adjustment'), data=payload)
     assert response.status_code == 200
     assert LedgerAdjustment.objects.filter(descricao='Reajuste manual').exists()
+
+
+@pytest.mark.django_db
+def test_expense_list_xlsx_export_builds_workbook(client, user):
+    import io
+    import zipfile
+
+    client.force_login(user)
+    for index in range(3):
+        Expense.objects.create(
+            description=f'Conta {index} & cia',
+            amount=Decimal('10.00') * (index + 1),
+            category='utilities',
+            payment_date=timezone.localdate(),
+            payment_method='PIX',
+        )
+
+    response = client.get(reverse('finance:expense_list'), {'category': 'utilities', 'export': 'xlsx'})
+
+    assert response.status_code == 200
+    assert response.streaming
+    archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+    assert archive.testzip() is None
+    sheet = archive.read('xl/worksheets/sheet1.xml').decode('utf-8')
+    assert sheet.count('<row>') == 4
+    assert 'Conta 2 &amp; cia' in sheet
+
+
+@pytest.mark.django_db
+def test_expense_list_facets_respect_date_filter_and_paginate(client, user):
+    from datetime import timedelta
+
+    client.force_login(user)
+    today = timezone.localdate()
+    for offset, category, amount in [(0, 'supplies', '10.00'), (1, 'supplies', '15.00'),
+                                     (2, 'staff', '100.00'), (40, 'staff', '999.00')]:
+        Expense.objects.create(description=f'{category} {offset}', amount=Decimal(amount), category=category,
+                               payment_date=today - timedelta(days=offset), payment_method='PIX')
+    params = {'category': 'supplies', 'start_date': (today - timedelta(days=7)).isoformat(), 'page_size': 1}
+
+    response = client.get(reverse('finance:expense_list'), params)
+    facets = response.context['category_totals']
+    assert (facets['staff']['count'], facets['staff']['total']) == (1, Decimal('100.00'))
+    assert (facets['supplies']['count'], facets['supplies']['total']) == (2, Decimal('25.00'))
+    assert response.context['total_expenses'] == Decimal('25.00')
+    assert [expense.description for expense in response.context['expenses']] == ['supplies 0']
+
+    more = client.get(response.context['next_url'], HTTP_HX_REQUEST='true')
+    assert [expense.description for expense in more.context['expenses']] == ['supplies 1']
+    assert more.context['next_url'] is None
+
+
+@pytest.mark.django_db
+def test_import_statement_dry_run_dedup_and_ofx(client, user):
+    from django.core.files.uploadedfile import SimpleUploadedFile
+
+    client.force_login(user)
+    csv_content = (
+        'Data;Histórico;Documento;Valor\n'
+        '01/03/2024;CEMIG ENERGIA;111;-250,40\n'
+        '02/03/2024;PIX RECEBIDO EVENTO;;1.200,00\n'
+        '02/03/2024;TARIFA;;-12,00\n'
+        '02/03/2024;TARIFA;;-12,00\n'
+        'data ruim;X;;1,00\n'
+    ).encode('cp1252')
+
+    def upload(dry_run):
+        data = {'statement': SimpleUploadedFile('extrato.csv', csv_content), 'account': 'BB 1234'}
+        if dry_run:
+            data['dry_run'] = '1'
+        return client.post(reverse('finance:import_statement'), data)
+
+    preview = upload(dry_run=True).context['result']
+    assert (preview.expenses, preview.incomes, len(preview.errors)) == (3, 1, 1)
+    assert not Expense.objects.exists()
+
+    result = upload(dry_run=False).context['result']
+    assert (result.expenses, result.incomes, result.duplicates) == (3, 1, 0)
+    assert Expense.objects.get(amount=Decimal('250.40')).category == 'utilities'
+    assert Expense.objects.filter(description='TARIFA').count() == 2
+    assert ExtraIncome.objects.get().amount == Decimal('1200.00')
+
+    again = upload(dry_run=False).context['result']
+    assert (again.created, again.duplicates) == (0, 4)
+
+    ofx = (
+        b'OFXHEADER:100\n<OFX><BANKTRANSLIST>\n'
+        b'<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240305120000[-3:BRT]<TRNAMT>-89.90'
+        b'<FITID>abc1<MEMO>ATACADAO COMPRAS\n</STMTTRN>\n'
+        b'</BANKTRANSLIST></OFX>\n'
+    )
+    response = client.post(reverse('finance:import_statement'), {
+        'statement': SimpleUploadedFile('marco.ofx', ofx), 'account': 'BB 1234',
+    })
+    assert response.context['result'].expenses == 1
+    assert Expense.objects.get(amount=Decimal('89.90')).category == 'supplies'
+
+
+@pytest.mark.django_db
+def test_receipts_are_deduplicated_processed_off_request_and_cached(client, user, settings, tmp_path):
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from django.core.management import call_command
+
+    from apps.finance.models import ReceiptAsset
+
+    settings.MEDIA_ROOT = tmp_path
+    client.force_login(user)
+    content = b'%PDF-1.4\n' + b'0' * 200_000
+
+    for description in ('Nota 1', 'Nota 2'):
+        client.post(reverse('finance:create_expense'), {
+            'description': description, 'amount': '10.00', 'category': 'supplies',
+            'payment_method': 'PIX', 'receipt': SimpleUploadedFile('nota.pdf', content),
+        })
+    asset = ReceiptAsset.objects.get()
+    assert Expense.objects.filter(receipt_asset=asset).count() == 2
+    assert asset.status == ReceiptAsset.Status.PENDENTE
+    assert asset.file.name == f'expenses/receipts/{asset.sha256[:2]}/{asset.sha256}.pdf'
+    assert len(list(tmp_path.rglob('*.pdf'))) == 1
+
+    call_command('process_receipts', '--once')
+    asset.refresh_from_db()
+    assert asset.status == ReceiptAsset.Status.CONCLUIDO
+
+    url = reverse('finance:receipt_file', args=[asset.sha256])
+    response = client.get(url)
+    assert b''.join(response.streaming_content) == content
+    assert response['Content-Type'] == 'application/pdf'
+    assert 'immutable' in response['Cache-Control']
+    assert client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code == 304
+    assert client.get(url, {'variant': 'thumb'}).status_code == 404
+    assert url in client.get(reverse('finance:expense_list')).content.decode()
+
+    client.post(reverse('finance:create_expense'), {
+        'description': 'Executável', 'amount': '1.00', 'category': 'other',
+        'payment_method': 'PIX', 'receipt': SimpleUploadedFile('x.exe', b'MZ\x90\x00'),
+    })
+    assert not Expense.objects.filter(description='Executável').exists()
+
+
+@pytest.mark.django_db
+def test_photo_receipts_get_thumbnail_and_preview(settings, tmp_path):
+    import io
+
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from PIL import Image
+
+    from apps.finance import receipts
+    from apps.finance.models import ReceiptAsset
+
+    settings.MEDIA_ROOT = tmp_path
+    buffer = io.BytesIO()
+    Image.new('RGB', (2000, 1000), 'white').save(buffer, format='PNG')
+    asset = receipts.store_receipt(SimpleUploadedFile('foto.png', buffer.getvalue()))
+
+    assert receipts.process_receipt(asset.id)
+    asset.refresh_from_db()
+    assert asset.status == ReceiptAsset.Status.CONCLUIDO
+    with asset.thumbnail.open('rb') as handle, Image.open(handle) as thumbnail:
+        assert max(thumbnail.size) == receipts.THUMBNAIL_MAX_SIDE
+    assert asset.preview
+
+
+@pytest.mark.django_db
+def test_monthly_closing_freezes_totals_and_blocks_edits(client, user, reservation, django_assert_num_queries):
+    from datetime import datetime, time, timedelta
+
+    from django.db import transaction
+
+    from apps.finance.closing import ClosedMonthError, close_month, month_start, period_totals
+    from apps.finance.models import MonthlyClosing
+    from apps.reservations.models import PaymentEvent
+
+    client.force_login(user)
+    current = month_start(timezone.localdate())
+    previous = month_start(current - timedelta(days=1))
+    older = month_start(previous - timedelta(days=1))
+    for month, amount in ((older, '100.00'), (previous, '200.00'), (current, '50.00')):
+        PaymentEvent.objects.create(
+            reserva=reservation, metodo=ReservationGuest.MetodoPagamento.PIX, valor=Decimal(amount),
+            pago_em=timezone.make_aware(datetime.combine(month + timedelta(days=2), time(12))),
+        )
+        Expense.objects.create(description=f'Luz {month}', amount=Decimal('30.00'), category='utilities',
+                               payment_date=month + timedelta(days=3), payment_method='PIX')
+    stale = Expense.objects.create(description='Compra', amount=Decimal('20.00'), category='supplies',
+                                   payment_date=previous + timedelta(days=4), payment_method='PIX')
+
+    response = client.post(reverse('finance:close_month'), {'mes': previous.strftime('%Y-%m')})
+    assert response.status_code == 302
+    closing = MonthlyClosing.objects.get(mes=previous)
+    assert (closing.pix, closing.despesas, closing.saldo) == (Decimal('200.00'), Decimal('50.00'), Decimal('150.00'))
+    assert closing.despesas_por_categoria == {'utilities': '30.00', 'supplies': '20.00'}
+    client.post(reverse('finance:close_month'), {'mes': current.strftime('%Y-%m')})
+    assert not MonthlyClosing.objects.filter(mes=current).exists()
+
+    with pytest.raises(ClosedMonthError):
+        Expense.objects.create(description='Atrasada', amount=Decimal('5.00'), category='other',
+                               payment_date=previous, payment_method='PIX')
+    with pytest.raises(ClosedMonthError), transaction.atomic():
+        stale.delete()
+    stale.payment_date = current
+    with pytest.raises(ClosedMonthError):
+        stale.save()
+
+    # Meses fechados vêm dos fechamentos; só o mês atual é calculado do banco.
+    close_month(older)
+    with django_assert_num_queries(3):
+        totals = period_totals(older, timezone.localdate())
+    assert totals.pix == Decimal('350.00')
+    assert totals.despesas == Decimal('110.00')
+    assert totals.despesas_por_categoria['supplies'] == Decimal('20.00')
+
+    response = client.get(reverse('finance:financeiro'), {
+        'data_inicio': older.isoformat(), 'data_fim': timezone.localdate().isoformat(),
+    })
+    assert response.context['saldo_periodo'] == Decimal('240.00')
+    assert response.context['mes_para_fechar'] is None
+
+
+@pytest.mark.django_db
+def test_create_adjustments_batch_is_all_or_nothing(client, user, reservation, django_assert_max_num_queries,
+                                                     django_capture_on_commit_callbacks):
+    from apps.finance.counters import read_counters
+
+    client.force_login(user)
+    url = reverse('finance:create_adjustments_batch')
+    rows = [
+        {'tipo': 'debito', 'descricao': f'Frigobar {i}', 'valor': '7.50', 'reservation_id': reservation.id}
+        for i in range(50)
+    ]
+
+    invalid = rows + [{'valor': 'abc'}, {'valor': '1.00', 'reservation_id': 999999}, 'linha']
+    response = client.post(url, json.dumps({'adjustments': invalid}), content_type='application/json')
+    assert response.status_code == 400
+    results = response.json()['results']
+    assert all(row['success'] for row in results[:50])
+    assert [sorted(row['errors']) for row in results[50:]] == [['valor'], ['reservation_id'], ['linha']]
+    assert not LedgerAdjustment.objects.exists()
+
+    read_counters()
+    with django_capture_on_commit_callbacks(execute=True), django_assert_max_num_queries(15):
+        response = client.post(url, json.dumps(rows), content_type='application/json')
+    assert response.status_code == 200
+    body = response.json()
+    assert body['created'] == 50
+    assert {row['adjustment_id'] for row in body['results']} == set(
+        LedgerAdjustment.objects.values_list('id', flat=True)
+    )
+    assert read_counters()['ajustes_debito'] == Decimal('375.00')
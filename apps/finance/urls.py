@@ -5,16 +5,21 @@ from . import views
 urlpatterns = [
     path('', views.financeiro, name='financeiro'),
     path('adicionar-despesa/', views.adicionar_despesa, name='adicionar_despesa'),
+    path('fechamento/', views.close_month, name='close_month'),
     
     path('cash-overview/', views.cash_overview, name='cash_overview'),
+    path('cash-overview/stream/', views.cash_overview_stream, name='cash_overview_stream'),
     path('reservation-balances/', views.reservation_balances, name='reservation_balances'),
     path('adjustments/', views.list_adjustments, name='list_adjustments'),
     path('adjustments/create/', views.create_adjustment, name='create_adjustment'),
+    path('adjustments/batch/', views.create_adjustments_batch, name='create_adjustments_batch'),
     path('adjustments/<int:adjustment_id>/delete/', views.delete_adjustment, name='delete_adjustment'),
 
     path('expenses/', views.expense_list, name='expense_list'),
+    path('expenses/import/', views.import_statement, name='import_statement'),
     path('expenses/create/', views.create_expense, name='create_expense'),
     path('expenses/<int:expense_id>/delete/', views.delete_expense, name='delete_expense'),
+    path('receipts/<str:digest>/', views.receipt_file, name='receipt_file'),
 
     path('extra-income/', views.extra_income_list, name='extra_income_list'),
     path('extra-income/create/', views.create_extra_income, name='create_extra_income'),
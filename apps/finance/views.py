@@ -1,76 +1,63 @@
-from datetime import datetime
+import hashlib
+import json
+from datetime import datetime, timedelta
 from decimal import Decimal, InvalidOperation
 
+from asgiref.sync import sync_to_async
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum
-from django.http import JsonResponse
+from django.db.models import Count, Prefetch, Sum
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
 from django.views.decorators.http import require_POST
 
-from apps.reservations.models import Reservation, ReservationGuest
+from apps.reports.exports import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, export_response
+from apps.reports.ledger import local_day_bounds
+from apps.reservations.models import PaymentEvent, Reservation, ReservationGuest
+from hotel_hms import events
+from hotel_hms.pagination import InvalidCursor, keyset_paginate, parse_page_size
+from hotel_hms.streaming import streaming_json_response
 
-from .models import Expense, ExtraIncome, LedgerAdjustment
+from .adjustments import create_adjustments
+from .bank_import import STATEMENT_FORMATS, StatementError, import_statement as import_bank_statement
+from .closing import ClosedMonthError, month_end, month_start, period_totals
+from .closing import close_month as close_month_totals
+from .counters import CASH_CHANNEL, cash_payload
+from .models import Expense, ExtraIncome, LedgerAdjustment, MonthlyClosing, ReceiptAsset
+from .receipts import ReceiptError, store_receipt
 
+RECEIPT_CACHE_SECONDS = 365 * 24 * 3600
 
-def _get_totals_by_period(start_date, end_date):
-    """Calcula totais de PIX, Dinheiro e Despesas em um período."""
-    pix = (
-        ReservationGuest.objects.filter(
-            pago=True,
-            metodo_pagamento=ReservationGuest.MetodoPagamento.PIX,
-            atualizado_em__date__gte=start_date,
-            atualizado_em__date__lte=end_date,
-        ).aggregate(total=Sum('valor_devido'))['total']
-        or Decimal('0')
-    )
-    
-    dinheiro = (
-        ReservationGuest.objects.filter(
-            pago=True,
-            metodo_pagamento=ReservationGuest.MetodoPagamento.DINHEIRO,
-            atualizado_em__date__gte=start_date,
-            atualizado_em__date__lte=end_date,
-        ).aggregate(total=Sum('valor_devido'))['total']
-        or Decimal('0')
-    )
-    
-    despesas = (
-        Expense.objects.filter(
-            payment_date__gte=start_date,
-            payment_date__lte=end_date,
-        ).aggregate(total=Sum('amount'))['total']
-        or Decimal('0')
-    )
-    
-    return pix, dinheiro, despesas
+CASH_STREAM_PING_SECONDS = 15
+CASH_STREAM_MAX_SECONDS = 300
+CASH_STREAM_RETRY_MS = 3000
 
 
 @login_required
 def financeiro(request):
-    """Página principal do financeiro com totais do mês e filtro por período."""
+    """
+    Página principal do financeiro com totais do mês e filtro por período.
+
+    Os totais vêm de ``period_totals``: meses fechados são lidos do
+    fechamento mensal e apenas os trechos abertos são calculados.
+    """
     today = timezone.localdate()
     
     # Primeiro e último dia do mês atual
-    primeiro_dia_mes = today.replace(day=1)
-    if today.month == 12:
-        ultimo_dia_mes = today.replace(year=today.year + 1, month=1, day=1)
-    else:
-        ultimo_dia_mes = today.replace(month=today.month + 1, day=1)
-    from datetime import timedelta
-    ultimo_dia_mes = ultimo_dia_mes - timedelta(days=1)
+    primeiro_dia_mes = month_start(today)
+    ultimo_dia_mes = month_end(primeiro_dia_mes)
     
     # Totais do mês
-    pix_mes, dinheiro_mes, despesas_mes = _get_totals_by_period(primeiro_dia_mes, ultimo_dia_mes)
-    total_mes = pix_mes + dinheiro_mes
-    saldo_mes = total_mes - despesas_mes
+    totais_mes = period_totals(primeiro_dia_mes, ultimo_dia_mes)
     
     # Filtro por período (se aplicado)
     data_inicio = request.GET.get('data_inicio')
     data_fim = request.GET.get('data_fim')
     filtro_aplicado = False
-    pix_periodo = dinheiro_periodo = despesas_periodo = saldo_periodo = Decimal('0')
+    totais_periodo = None
     recebimentos_periodo = []
     despesas_periodo_lista = []
     
@@ -78,20 +65,15 @@ def financeiro(request):
         try:
             data_inicio_parsed = datetime.strptime(data_inicio, '%Y-%m-%d').date()
             data_fim_parsed = datetime.strptime(data_fim, '%Y-%m-%d').date()
-            pix_periodo, dinheiro_periodo, despesas_periodo = _get_totals_by_period(
-                data_inicio_parsed, data_fim_parsed
-            )
-            saldo_periodo = pix_periodo + dinheiro_periodo - despesas_periodo
+            totais_periodo = period_totals(data_inicio_parsed, data_fim_parsed)
             filtro_aplicado = True
             data_inicio = data_inicio_parsed
             data_fim = data_fim_parsed
             
             # Lista de recebimentos do período
-            recebimentos_periodo = ReservationGuest.objects.filter(
-                pago=True,
-                atualizado_em__date__gte=data_inicio_parsed,
-                atualizado_em__date__lte=data_fim_parsed,
-            ).select_related('reserva', 'reserva__room').order_by('-atualizado_em')
+            recebimentos_periodo = PaymentEvent.objects.no_intervalo(
+                *local_day_bounds(data_inicio_parsed, data_fim_parsed)
+            ).select_related('hospede', 'reserva__room')
             
             # Lista de despesas do período
             despesas_periodo_lista = Expense.objects.filter(
@@ -103,35 +85,68 @@ def financeiro(request):
     
     # Lista de despesas recentes (apenas 5)
     despesas_lista = Expense.objects.all().order_by('-payment_date', '-id')[:5]
+
+    # Fechamentos recentes e o mês anterior, se ainda estiver aberto
+    fechamentos = list(MonthlyClosing.objects.order_by('-mes')[:12])
+    mes_anterior = month_start(primeiro_dia_mes - timedelta(days=1))
+    mes_para_fechar = None if any(f.mes == mes_anterior for f in fechamentos) else mes_anterior
     
     # Nome do mês
     meses = ['Janeiro', 'Fevereiro', 'Março', 'Abril', 'Maio', 'Junho',
              'Julho', 'Agosto', 'Setembro', 'Outubro', 'Novembro', 'Dezembro']
     mes_atual = f"{meses[today.month - 1]} {today.year}"
+    categorias = dict(Expense.CATEGORY_CHOICES)
     
     context = {
         'mes_atual': mes_atual,
-        'pix_mes': pix_mes,
-        'dinheiro_mes': dinheiro_mes,
-        'total_mes': total_mes,
-        'despesas_mes': despesas_mes,
-        'saldo_mes': saldo_mes,
+        'pix_mes': totais_mes.pix,
+        'dinheiro_mes': totais_mes.dinheiro,
+        'total_mes': totais_mes.total_recebido,
+        'despesas_mes': totais_mes.despesas,
+        'saldo_mes': totais_mes.saldo,
         'filtro_aplicado': filtro_aplicado,
         'data_inicio': data_inicio,
         'data_fim': data_fim,
-        'pix_periodo': pix_periodo,
-        'dinheiro_periodo': dinheiro_periodo,
-        'despesas_periodo': despesas_periodo,
-        'saldo_periodo': saldo_periodo,
+        'pix_periodo': totais_periodo.pix if totais_periodo else Decimal('0'),
+        'dinheiro_periodo': totais_periodo.dinheiro if totais_periodo else Decimal('0'),
+        'despesas_periodo': totais_periodo.despesas if totais_periodo else Decimal('0'),
+        'saldo_periodo': totais_periodo.saldo if totais_periodo else Decimal('0'),
+        'categorias_periodo': sorted(
+            ((categorias.get(code, code), total) for code, total in totais_periodo.despesas_por_categoria.items()),
+            key=lambda item: item[1],
+            reverse=True,
+        ) if totais_periodo else [],
         'recebimentos_periodo': recebimentos_periodo,
         'despesas_periodo_lista': despesas_periodo_lista,
         'despesas_lista': despesas_lista,
+        'fechamentos': fechamentos,
+        'mes_para_fechar': mes_para_fechar,
         'hoje': today.strftime('%Y-%m-%d'),
     }
     
     return render(request, 'finance/financeiro.html', context)
 
 
+@login_required
+@require_POST
+def close_month(request):
+    """Fecha o mês informado em ``mes`` (AAAA-MM), congelando os seus totais."""
+    try:
+        mes = datetime.strptime(request.POST.get('mes', ''), '%Y-%m').date()
+    except ValueError:
+        messages.error(request, 'Informe um mês válido.')
+        return redirect('finance:financeiro')
+    try:
+        fechamento = close_month_totals(mes, user=request.user)
+    except ValueError as exc:
+        messages.error(request, str(exc))
+    else:
+        messages.success(
+            request, f'Mês {fechamento.mes:%m/%Y} fechado com saldo de R$ {fechamento.saldo:.2f}.'
+        )
+    return redirect('finance:financeiro')
+
+
 @login_required
 @require_POST
 def adicionar_despesa(request):
@@ -158,97 +173,140 @@ def adicionar_despesa(request):
         except ValueError:
             data_despesa = timezone.localdate()
     
-    Expense.objects.create(
-        description=descricao,
-        amount=valor_decimal,
-        category='other',
-        payment_date=data_despesa,
-        payment_method='Geral',
-    )
+    try:
+        Expense.objects.create(
+            description=descricao,
+            amount=valor_decimal,
+            category='other',
+            payment_date=data_despesa,
+            payment_method='Geral',
+        )
+    except ClosedMonthError as exc:
+        messages.error(request, str(exc))
+        return redirect('finance:financeiro')
     
     messages.success(request, f'Despesa "{descricao}" de R$ {valor_decimal:.2f} registrada!')
     return redirect('finance:financeiro')
 
 
-def _reservation_totals(reservation: Reservation) -> dict:
-    hospedes = reservation.hospedes.all()
-    total = hospedes.aggregate(total=Sum('valor_devido'))['total'] or Decimal('0')
-    pago = hospedes.filter(pago=True).aggregate(total=Sum('valor_devido'))['total'] or Decimal('0')
+def _parse_optional_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _flag(value) -> bool:
+    return (value or '').lower() in ('1', 'true', 'sim', 'on')
+
+
+def _balance_payload(reserva: Reservation) -> dict:
     return {
-        'total': total,
-        'pago': pago,
-        'pendente': total - pago,
+        'id': reserva.id,
+        'room': reserva.room.numero,
+        'data_entrada': reserva.data_entrada.isoformat(),
+        'guests': [hospede.nome for hospede in reserva.hospedes.all()],
+        'total': float(reserva.total_devido),
+        'paid': float(reserva.total_pago),
+        'pending': float(reserva.total_pendente),
+        'active': reserva.ocupando,
     }
 
 
 @login_required
 def reservation_balances(request):
+    """
+    Saldos por reserva, paginados por cursor e transmitidos em JSON.
+
+    Os totais são lidos das colunas mantidas na própria reserva; os nomes dos
+    hóspedes vêm de um único ``prefetch`` por página.
+
+    Filtros (query string): ``active=1`` (somente estadias em aberto),
+    ``start_date``/``end_date`` (AAAA-MM-DD, pela data de entrada),
+    ``pending=1`` (somente reservas com saldo pendente), ``cursor`` e
+    ``page_size``.
+    """
     reservas = (
-        Reservation.objects.all()
-        .select_related('room')
-        .prefetch_related('hospedes')
-        .order_by('-data_entrada')
+        Reservation.objects.select_related('room')
+        .only('id', 'data_entrada', 'data_saida', 'ativa', 'total_devido', 'total_pago', 'total_pendente', 'room__numero')
+        .prefetch_related(
+            Prefetch('hospedes', queryset=ReservationGuest.objects.only('id', 'reserva', 'nome').order_by('criado_em', 'id'))
+        )
     )
+    if _flag(request.GET.get('active')):
+        reservas = reservas.ativas()
+    start_date = _parse_optional_date(request.GET.get('start_date'))
+    end_date = _parse_optional_date(request.GET.get('end_date'))
+    if start_date:
+        reservas = reservas.filter(data_entrada__gte=local_day_bounds(start_date, start_date)[0])
+    if end_date:
+        reservas = reservas.filter(data_entrada__lt=local_day_bounds(end_date, end_date)[1])
+    if _flag(request.GET.get('pending')):
+        reservas = reservas.filter(total_pendente__gt=0)
 
-    payload = []
-    for reserva in reservas:
-        totais = _reservation_totals(reserva)
-        payload.append({
-            'id': reserva.id,
-            'room': reserva.room.numero,
-            'guests': [hospede.nome for hospede in reserva.hospedes.all()],
-            'total': float(totais['total']),
-            'paid': float(totais['pago']),
-            'pending': float(totais['pendente']),
-            'active': reserva.ocupando,
-        })
+    try:
+        page = keyset_paginate(
+            reservas,
+            'data_entrada',
+            cursor=request.GET.get('cursor'),
+            page_size=parse_page_size(request.GET.get('page_size')),
+        )
+    except InvalidCursor as exc:
+        return JsonResponse({'success': False, 'message': str(exc)}, status=400)
 
-    return JsonResponse({'reservations': payload})
+    return streaming_json_response(
+        'reservations',
+        (_balance_payload(reserva) for reserva in page.items),
+        {'next_cursor': page.next_cursor},
+    )
 
 
 @login_required
 def cash_overview(request):
-    today = timezone.localdate()
-
-    pix = (
-        ReservationGuest.objects.filter(
-            pago=True,
-            metodo_pagamento=ReservationGuest.MetodoPagamento.PIX,
-            atualizado_em__date=today,
-        ).aggregate(total=Sum('valor_devido'))['total']
-        or Decimal('0')
-    )
+    """Totais do caixa de hoje, lidos dos contadores ao vivo (``apps.finance.counters``)."""
+    return JsonResponse(cash_payload())
 
-    dinheiro = (
-        ReservationGuest.objects.filter(
-            pago=True,
-            metodo_pagamento=ReservationGuest.MetodoPagamento.DINHEIRO,
-            atualizado_em__date=today,
-        ).aggregate(total=Sum('valor_devido'))['total']
-        or Decimal('0')
-    )
-
-    ajustes = LedgerAdjustment.objects.filter(criado_em__date=today)
-    creditos = ajustes.filter(tipo=LedgerAdjustment.Tipo.CREDITO).aggregate(total=Sum('valor'))['total'] or Decimal('0')
-    debitos = ajustes.filter(tipo=LedgerAdjustment.Tipo.DEBITO).aggregate(total=Sum('valor'))['total'] or Decimal('0')
 
-    extras = ExtraIncome.objects.filter(received_date=today).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-    despesas = Expense.objects.filter(payment_date=today).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-
-    return JsonResponse({
-        'pix': float(pix),
-        'dinheiro': float(dinheiro),
-        'ajustes_credito': float(creditos),
-        'ajustes_debito': float(debitos),
-        'extras': float(extras),
-        'despesas': float(despesas),
-    })
+@login_required
+async def cash_overview_stream(request):
+    """
+    Transmite os totais do caixa de hoje por Server-Sent Events (requer servidor ASGI).
 
+    A conexão assina o canal ``caixa`` (``hotel_hms.events``), envia os totais
+    atuais e depois cada atualização publicada pelos contadores (evento
+    ``caixa``); sem mensagens, um comentário a cada ``CASH_STREAM_PING_SECONDS``
+    mantém a conexão viva. Após ``CASH_STREAM_MAX_SECONDS`` o fluxo termina e o
+    ``EventSource`` reconecta.
 
-@login_required
-def list_adjustments(request):
-    ajustes = LedgerAdjustment.objects.select_related('reservation').order_by('-criado_em')[:100]
-    data = [{
+    Fora do ASGI responde 204, que faz o ``EventSource`` desistir; os tablets
+    usam então ``cash_overview``, que só lê o cache.
+    """
+    if not events.push_enabled(request):
+        return HttpResponse(status=204)
+
+    async def stream():
+        yield f'retry: {CASH_STREAM_RETRY_MS}\n\n'
+        async with events.subscribe(CASH_CHANNEL) as subscription:
+            # Assinado antes de ler os totais: nenhuma atualização se perde entre os dois.
+            last = await sync_to_async(cash_payload)()
+            yield f'event: caixa\ndata: {json.dumps(last)}\n\n'
+            async for message in events.listen(subscription, CASH_STREAM_MAX_SECONDS, CASH_STREAM_PING_SECONDS):
+                if message is None:
+                    yield ': ping\n\n'
+                    continue
+                event, payload = message
+                if payload != last:
+                    yield f'event: {event}\ndata: {json.dumps(payload)}\n\n'
+                    last = payload
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _adjustment_payload(ajuste: LedgerAdjustment) -> dict:
+    return {
         'id': ajuste.id,
         'descricao': ajuste.descricao,
         'tipo': ajuste.get_tipo_display(),
@@ -256,8 +314,66 @@ def list_adjustments(request):
         'metodo': ajuste.metodo,
         'reservation': ajuste.reservation_id,
         'created_at': ajuste.criado_em.isoformat(),
-    } for ajuste in ajustes]
-    return JsonResponse({'adjustments': data})
+    }
+
+
+@login_required
+def list_adjustments(request):
+    """
+    Lista os ajustes financeiros, paginados por cursor em ``(criado_em, id)``.
+
+    Filtros (query string): ``tipo`` (credito/debito), ``reservation`` (id),
+    ``metodo``, ``start_date``/``end_date`` (AAAA-MM-DD), ``cursor`` e
+    ``page_size``. Cada combinação é atendida por um índice que termina em
+    ``(criado_em, id)``.
+
+    Responde com ``ETag`` calculado dos ``id``/``atualizado_em`` da página e do
+    próximo cursor, que muda com inclusões, edições e exclusões; páginas
+    inalteradas devolvem 304 sem montar o corpo. Não há ``Last-Modified``: a
+    data mais recente do filtro não muda quando um ajuste é excluído.
+    """
+    ajustes = LedgerAdjustment.objects.only(
+        'id', 'descricao', 'tipo', 'valor', 'metodo', 'reservation_id', 'criado_em', 'atualizado_em',
+    )
+    tipo = request.GET.get('tipo')
+    if tipo in LedgerAdjustment.Tipo.values:
+        ajustes = ajustes.filter(tipo=tipo)
+    reservation_id = request.GET.get('reservation', '')
+    if reservation_id.isdigit():
+        ajustes = ajustes.filter(reservation_id=int(reservation_id))
+    if request.GET.get('metodo'):
+        ajustes = ajustes.filter(metodo=request.GET['metodo'])
+    start_date = _parse_optional_date(request.GET.get('start_date'))
+    end_date = _parse_optional_date(request.GET.get('end_date'))
+    if start_date:
+        ajustes = ajustes.filter(criado_em__gte=local_day_bounds(start_date, start_date)[0])
+    if end_date:
+        ajustes = ajustes.filter(criado_em__lt=local_day_bounds(end_date, end_date)[1])
+
+    try:
+        page = keyset_paginate(
+            ajustes,
+            'criado_em',
+            cursor=request.GET.get('cursor'),
+            page_size=parse_page_size(request.GET.get('page_size'), default=100),
+        )
+    except InvalidCursor as exc:
+        return JsonResponse({'success': False, 'message': str(exc)}, status=400)
+
+    versao = hashlib.md5(usedforsecurity=False)
+    for ajuste in page.items:
+        versao.update(f'{ajuste.id}:{ajuste.atualizado_em.isoformat()};'.encode())
+    versao.update(str(page.next_cursor).encode())
+    etag = quote_etag(versao.hexdigest())
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = JsonResponse({
+            'adjustments': [_adjustment_payload(ajuste) for ajuste in page.items],
+            'next_cursor': page.next_cursor,
+        })
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 
 @login_required
@@ -293,6 +409,39 @@ def create_adjustment(request):
         return JsonResponse({'success': False, 'message': str(exc)}, status=400)
 
 
+@login_required
+@require_POST
+def create_adjustments_batch(request):
+    """
+    Lança vários ajustes de uma vez a partir de um corpo JSON.
+
+    Corpo: ``{"adjustments": [{"tipo", "descricao", "valor", "metodo",
+    "reservation_id"}, ...]}`` (ou a lista diretamente). O lote é gravado
+    inteiro ou não é gravado: com alguma linha inválida a resposta é 400 e
+    ``results`` indica os erros de cada linha.
+    """
+    try:
+        payload = json.loads(request.body or b'null')
+    except (ValueError, UnicodeDecodeError):
+        return JsonResponse({'success': False, 'message': 'Corpo JSON inválido.'}, status=400)
+    rows = payload.get('adjustments') if isinstance(payload, dict) else payload
+    if not isinstance(rows, list):
+        return JsonResponse({'success': False, 'message': 'Envie a lista "adjustments".'}, status=400)
+
+    try:
+        result = create_adjustments(rows)
+    except ValueError as exc:
+        return JsonResponse({'success': False, 'message': str(exc)}, status=400)
+
+    if not result.created:
+        return JsonResponse({
+            'success': False,
+            'message': f'{result.error_count} linha(s) inválida(s); nenhum ajuste foi gravado.',
+            'results': result.results,
+        }, status=400)
+    return JsonResponse({'success': True, 'created': len(result.results), 'results': result.results})
+
+
 @login_required
 @require_POST
 def delete_adjustment(request, adjustment_id):
@@ -301,50 +450,150 @@ def delete_adjustment(request, adjustment_id):
     return JsonResponse({'success': True})
 
 
+EXPENSE_EXPORT_HEADER = ['Data', 'Descrição', 'Categoria', 'Método', 'Valor', 'Observações']
+
+
+def _expense_export_rows(expenses):
+    """Lê as despesas em blocos, por data de pagamento, e gera as linhas da exportação."""
+    category_names = dict(Expense.CATEGORY_CHOICES)
+    rows = expenses.order_by('payment_date', 'id').values_list(
+        'payment_date', 'description', 'category', 'payment_method', 'amount', 'notes',
+    )
+    for payment_date, description, category, method, amount, notes in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [payment_date, description, category_names.get(category, category), method, amount, notes]
+
+
+def _expense_facets(expenses, selected_category):
+    """
+    Soma e conta as despesas por categoria em uma única consulta agrupada.
+
+    As facetas respeitam os filtros de data, mas não o de categoria, para que
+    a lista mostre quanto cada categoria representa no período; o total geral
+    segue a categoria selecionada.
+    """
+    rows = {
+        row['category']: row
+        for row in expenses.order_by().values('category').annotate(total=Sum('amount'), count=Count('id'))
+    }
+    facets = {}
+    for code, name in Expense.CATEGORY_CHOICES:
+        row = rows.get(code, {})
+        facets[code] = {'name': name, 'total': row.get('total') or Decimal('0'), 'count': row.get('count', 0)}
+    selected = [facets[selected_category]] if selected_category in facets else facets.values()
+    total = sum((facet['total'] for facet in selected), Decimal('0'))
+    count = sum(facet['count'] for facet in selected)
+    return facets, total, count
+
+
 @login_required
 def expense_list(request):
     """
-    Exibe todas as despesas registradas
+    Exibe as despesas registradas, paginadas por cursor em ``(payment_date, id)``.
+
+    Filtros: ``category``, ``start_date`` e ``end_date`` (AAAA-MM-DD). Totais e
+    quantidades por categoria vêm de um ``GROUP BY``; requisições HTMX recebem
+    apenas as linhas da próxima página.
     """
-    expenses = Expense.objects.all()
-    
-    # Filtros
     category = request.GET.get('category')
-    start_date = request.GET.get('start_date')
-    end_date = request.GET.get('end_date')
-    
-    if category and category != 'all':
-        expenses = expenses.filter(category=category)
-    
+    start_date = _parse_optional_date(request.GET.get('start_date'))
+    end_date = _parse_optional_date(request.GET.get('end_date'))
+
+    in_period = Expense.objects.all()
     if start_date:
-        expenses = expenses.filter(payment_date__gte=start_date)
-    
+        in_period = in_period.filter(payment_date__gte=start_date)
     if end_date:
-        expenses = expenses.filter(payment_date__lte=end_date)
-    
-    # Totais por categoria
-    category_totals = {}
-    for category_code, category_name in Expense.CATEGORY_CHOICES:
-        category_sum = sum(expense.amount for expense in expenses.filter(category=category_code))
-        category_totals[category_code] = {
-            'name': category_name,
-            'total': category_sum
-        }
-    
-    total_expenses = sum(expense.amount for expense in expenses)
-    
+        in_period = in_period.filter(payment_date__lte=end_date)
+
+    expenses = in_period
+    if category and category != 'all':
+        expenses = expenses.filter(category=category)
+
+    export_format = request.GET.get('export')
+    if export_format in EXPORT_FORMATS:
+        return export_response(
+            export_format,
+            'despesas',
+            EXPENSE_EXPORT_HEADER,
+            _expense_export_rows(expenses),
+        )
+
+    try:
+        page = keyset_paginate(
+            expenses.select_related('receipt_asset').only(
+                'id', 'description', 'category', 'amount', 'payment_date', 'payment_method', 'receipt',
+                'receipt_asset__sha256', 'receipt_asset__preview', 'receipt_asset__thumbnail',
+            ),
+            'payment_date',
+            cursor=request.GET.get('cursor'),
+            page_size=parse_page_size(request.GET.get('page_size')),
+        )
+    except InvalidCursor as exc:
+        return HttpResponseBadRequest(str(exc))
+
+    next_url = None
+    if page.has_next:
+        query = request.GET.copy()
+        query['cursor'] = page.next_cursor
+        next_url = f'{request.path}?{query.urlencode()}'
+
+    if request.headers.get('HX-Request'):
+        return render(request, 'finance/partials/expense_rows.html', {'expenses': page.items, 'next_url': next_url})
+
+    category_totals, total_expenses, expense_count = _expense_facets(in_period, category)
     context = {
-        'expenses': expenses,
+        'expenses': page.items,
+        'next_url': next_url,
         'category_totals': category_totals,
         'total_expenses': total_expenses,
+        'expense_count': expense_count,
         'categories': Expense.CATEGORY_CHOICES,
         'selected_category': category or 'all',
-        'start_date': start_date,
-        'end_date': end_date
+        'start_date': start_date.isoformat() if start_date else '',
+        'end_date': end_date.isoformat() if end_date else '',
     }
     
     return render(request, 'finance/expense_list.html', context)
 
+@login_required
+def import_statement(request):
+    """
+    Importa um extrato bancário (CSV ou OFX) para despesas e receitas avulsas.
+
+    O formato vem do campo ``format`` ou da extensão do arquivo. Com
+    ``dry_run`` marcado apenas exibe a prévia e as quantidades, sem gravar;
+    lançamentos já importados são reconhecidos e contados como duplicados.
+    """
+    context = {'formats': STATEMENT_FORMATS, 'result': None}
+    if request.method == 'POST':
+        upload = request.FILES.get('statement')
+        statement_format = request.POST.get('format') or ''
+        if upload and not statement_format:
+            statement_format = upload.name.rsplit('.', 1)[-1].lower()
+        dry_run = _flag(request.POST.get('dry_run'))
+        if not upload:
+            messages.error(request, 'Selecione o arquivo do extrato.')
+        else:
+            try:
+                result = import_bank_statement(
+                    upload,
+                    statement_format,
+                    account=request.POST.get('account', '').strip(),
+                    source=upload.name,
+                    dry_run=dry_run,
+                )
+            except StatementError as exc:
+                messages.error(request, f'Erro ao importar o extrato: {exc}')
+            else:
+                context['result'] = result
+                if not dry_run:
+                    messages.success(
+                        request,
+                        f'{result.expenses} despesa(s) e {result.incomes} receita(s) importada(s); '
+                        f'{result.duplicates} lançamento(s) já existente(s) ignorado(s).',
+                    )
+    return render(request, 'finance/import_statement.html', context)
+
+
 @login_required
 def create_expense(request):
     """
@@ -364,10 +613,14 @@ def create_expense(request):
                 messages.error(request, 'Preencha todos os campos obrigatórios')
                 return redirect('finance:expense_list')
             
-            # Processar o upload do comprovante, se fornecido
-            receipt = None
+            # Grava o comprovante pelo conteúdo; miniaturas ficam para o process_receipts
+            receipt_asset = None
             if 'receipt' in request.FILES:
-                receipt = request.FILES['receipt']
+                try:
+                    receipt_asset = store_receipt(request.FILES['receipt'])
+                except ReceiptError as exc:
+                    messages.error(request, str(exc))
+                    return redirect('finance:expense_list')
             
             # Criar a despesa
             expense = Expense.objects.create(
@@ -376,7 +629,7 @@ def create_expense(request):
                 category=category,
                 payment_date=payment_date,
                 payment_method=payment_method,
-                receipt=receipt,
+                receipt_asset=receipt_asset,
                 notes=notes
             )
             
@@ -390,6 +643,32 @@ def create_expense(request):
     # Se for GET, renderiza o formulário na própria página de listagem
     return redirect('finance:expense_list')
 
+@login_required
+def receipt_file(request, digest):
+    """
+    Serve um comprovante pelo seu SHA-256.
+
+    ``variant`` escolhe ``thumb`` (miniatura) ou ``preview`` (versão
+    comprimida); sem ele vai o arquivo original. Como o conteúdo de cada URL
+    nunca muda, a resposta pode ficar no cache do navegador por um ano.
+    """
+    asset = get_object_or_404(ReceiptAsset, sha256=digest)
+    variant = request.GET.get('variant') or 'original'
+    fields = {'original': asset.file, 'preview': asset.preview, 'thumb': asset.thumbnail}
+    stored = fields.get(variant)
+    if not stored:
+        raise Http404('Versão do comprovante indisponível.')
+
+    etag = quote_etag(f'{digest}-{variant}')
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        content_type = asset.content_type if variant == 'original' else 'image/jpeg'
+        response = FileResponse(stored.open('rb'), content_type=content_type,
+                                filename=asset.original_name if variant == 'original' else None)
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, max_age=RECEIPT_CACHE_SECONDS, immutable=True)
+    return response
+
 @login_required
 def delete_expense(request, expense_id):
     """
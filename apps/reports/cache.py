@@ -0,0 +1,100 @@
+"""
+Cache dos consolidados diários usados pelos relatórios.
+
+Dias anteriores a hoje ficam no cache ``reports`` por
+``REPORTS_CACHE_TIMEOUT`` (sem expiração com Redis); o dia corrente (e datas
+futuras) é sempre lido do banco. Quando um lançamento
+retroativo altera um dia já fechado, ``invalidate_days`` remove a entrada
+correspondente, chamado a partir de ``rollup.rebuild_range``.
+"""
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import DailyFinancialRollup
+
+CACHE_ALIAS = 'reports'
+EMPTY_DAY = 'vazio'
+
+ROLLUP_VALUE_FIELDS = (
+    'date',
+    'revenue_total',
+    'revenue_paid',
+    'revenue_pending',
+    'extra_income_total',
+    'expense_total',
+    'guest_charge_count',
+    'revenue_entry_count',
+    'expense_entry_count',
+    'revenue_by_method',
+    'expense_by_category',
+)
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def day_key(day: date) -> str:
+    return f'rollup:{day.isoformat()}'
+
+
+def cached_rollups(start_date: date, end_date: date) -> List[Dict[str, Any]]:
+    """
+    Retorna os consolidados do período em ordem de data.
+
+    Dias fechados são servidos pelo cache; apenas os ausentes e o dia
+    corrente são lidos do banco, em uma única consulta.
+    """
+    today = timezone.localdate()
+    closed_days = [
+        start_date + timedelta(days=offset)
+        for offset in range((min(end_date, today - timedelta(days=1)) - start_date).days + 1)
+    ]
+
+    cache = _cache()
+    cached = cache.get_many([day_key(day) for day in closed_days]) if closed_days else {}
+    missing = [day for day in closed_days if day_key(day) not in cached]
+
+    by_date: Dict[date, Dict[str, Any]] = {
+        value['date']: value
+        for value in cached.values()
+        if value != EMPTY_DAY
+    }
+
+    conditions = Q()
+    if missing:
+        conditions |= Q(date__gte=missing[0], date__lte=missing[-1])
+    if end_date >= today:
+        conditions |= Q(date__gte=max(start_date, today), date__lte=end_date)
+
+    if conditions:
+        fresh = list(DailyFinancialRollup.objects.filter(conditions).values(*ROLLUP_VALUE_FIELDS))
+        for value in fresh:
+            by_date[value['date']] = value
+
+        fresh_dates = {value['date'] for value in fresh}
+        cache.set_many({
+            day_key(day): by_date[day] if day in fresh_dates else EMPTY_DAY
+            for day in missing
+        }, timeout=settings.REPORTS_CACHE_TIMEOUT)
+
+    return [by_date[day] for day in sorted(by_date)]
+
+
+def invalidate_days(days: Iterable[date]) -> None:
+    """Remove os dias do cache agora e novamente após o commit da transação."""
+    keys = [day_key(day) for day in days]
+    if not keys:
+        return
+    _cache().delete_many(keys)
+    transaction.on_commit(lambda: _cache().delete_many(keys))
+
+
+def invalidate_range(start_date: date, end_date: date) -> None:
+    invalidate_days(start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1))
@@ -0,0 +1,165 @@
+"""
+Geração de relatórios em segundo plano.
+
+A tabela ``Report`` funciona como fila: ``enqueue_report`` grava um pedido
+``pendente`` e o comando ``run_report_worker`` reivindica os pedidos com um
+``UPDATE`` condicional no status (apenas um worker vence a troca), gerando os
+arquivos em um pool de threads fora dos workers do Gunicorn.
+"""
+import tempfile
+import traceback
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterable, Optional, Union
+
+from django.core.files import File
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .exports import EXPORT_CHUNK_SIZE, iter_csv, iter_xlsx
+from .ledger import iter_ledger_entries
+from .models import Report
+
+Chunks = Iterable[Union[str, bytes]]
+
+
+def _render_financial_report(start_date: date, end_date: date, export_format: str) -> Chunks:
+    from . import views  # importação tardia: as views enfileiram pedidos por este módulo
+
+    if export_format == 'html':
+        context = views.financial_report_context(start_date, end_date)
+        return [render_to_string('reports/financial_report.html', context)]
+    rows = views._financial_export_rows(
+        iter_ledger_entries(start_date, end_date, chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    writer = iter_xlsx if export_format == 'xlsx' else iter_csv
+    return writer(views.FINANCIAL_EXPORT_HEADER, rows)
+
+
+def _render_financial_consolidated(start_date: date, end_date: date, export_format: str) -> Chunks:
+    from . import views
+
+    context = views.financial_consolidated_context(start_date, end_date)
+    return [render_to_string('reports/financial_consolidated.html', context)]
+
+
+REPORT_KINDS: Dict[str, Dict] = {
+    'financial_report': {
+        'label': 'Relatório Financeiro Detalhado',
+        'formats': ('html', 'csv', 'xlsx'),
+        'render': _render_financial_report,
+    },
+    'financial_consolidated': {
+        'label': 'Relatório Financeiro Consolidado',
+        'formats': ('html',),
+        'render': _render_financial_consolidated,
+    },
+}
+
+
+def enqueue_report(kind: str, start_date: date, end_date: date, export_format: str = 'html',
+                   user=None) -> Report:
+    """
+    Registra um pedido de relatório para o worker.
+
+    Args:
+        kind (str): Tipo do relatório (chave de ``REPORT_KINDS``).
+        start_date (date): Data inicial do período.
+        end_date (date): Data final do período.
+        export_format (str): Formato do arquivo (``html``, ``csv`` ou ``xlsx``).
+        user: Usuário que pediu o relatório (opcional).
+
+    Returns:
+        Report: Pedido criado com status ``pendente``.
+
+    Raises:
+        ValueError: Se o tipo, o formato ou o período forem inválidos.
+    """
+    spec = REPORT_KINDS.get(kind)
+    if spec is None:
+        raise ValueError('Tipo de relatório inválido.')
+    if export_format not in spec['formats']:
+        raise ValueError('Formato não disponível para este relatório.')
+    if start_date > end_date:
+        raise ValueError('A data inicial deve ser anterior ou igual à data final.')
+
+    return Report.objects.create(
+        name=f"{spec['label']} {start_date:%d/%m/%Y} a {end_date:%d/%m/%Y}",
+        kind=kind,
+        params={
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+            'format': export_format,
+        },
+        status=Report.Status.PENDENTE,
+        requested_by=user if user is not None and user.is_authenticated else None,
+    )
+
+
+def claim_next_report() -> Optional[int]:
+    """
+    Reivindica o pedido pendente mais antigo.
+
+    O ``UPDATE ... WHERE status = 'pendente'`` é atômico no banco: se outro
+    worker levou o mesmo pedido, nenhuma linha é alterada e o próximo
+    candidato é tentado.
+
+    Returns:
+        Optional[int]: ``id`` do pedido reivindicado, ou ``None`` se a fila estiver vazia.
+    """
+    pending = Report.objects.filter(status=Report.Status.PENDENTE).order_by('generated_at', 'id')
+    for report_id in pending.values_list('id', flat=True)[:10]:
+        claimed = Report.objects.filter(id=report_id, status=Report.Status.PENDENTE).update(
+            status=Report.Status.PROCESSANDO,
+            started_at=timezone.now(),
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return report_id
+    return None
+
+
+def requeue_stale_reports(older_than: timedelta) -> int:
+    """Devolve à fila pedidos ``processando`` há mais de ``older_than`` (worker interrompido)."""
+    return Report.objects.filter(
+        status=Report.Status.PROCESSANDO,
+        started_at__lt=timezone.now() - older_than,
+    ).update(status=Report.Status.PENDENTE)
+
+
+def process_report(report_id: int) -> bool:
+    """
+    Gera o arquivo de um pedido já reivindicado.
+
+    O conteúdo é escrito em um arquivo temporário à medida que é produzido e
+    só então copiado para o ``storage``; falhas ficam registradas no pedido.
+
+    Returns:
+        bool: ``True`` se o relatório foi gerado.
+    """
+    report = Report.objects.get(id=report_id)
+    try:
+        render: Callable[[date, date, str], Chunks] = REPORT_KINDS[report.kind]['render']
+        start_date = date.fromisoformat(report.params['start_date'])
+        end_date = date.fromisoformat(report.params['end_date'])
+        export_format = report.params.get('format', 'html')
+
+        with tempfile.TemporaryFile() as handle:
+            for chunk in render(start_date, end_date, export_format):
+                handle.write(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+            handle.seek(0)
+            filename = f'{report.kind}_{start_date:%Y%m%d}_{end_date:%Y%m%d}.{export_format}'
+            report.file_path.save(filename, File(handle), save=False)
+    except Exception:
+        Report.objects.filter(id=report_id).update(
+            status=Report.Status.ERRO,
+            error=traceback.format_exc(limit=5),
+            finished_at=timezone.now(),
+        )
+        return False
+
+    report.status = Report.Status.CONCLUIDO
+    report.error = ''
+    report.finished_at = timezone.now()
+    report.save(update_fields=['file_path', 'status', 'error', 'finished_at'])
+    return True
@@ -0,0 +1,350 @@
+"""
+Motor de agregação do livro-caixa.
+
+Todas as fontes de lançamentos (cobranças de hóspedes, receitas avulsas,
+ajustes financeiros e despesas) são normalizadas para as mesmas colunas e
+combinadas em uma única instrução ``UNION ALL``. Sobre ela são feitos o
+``GROUP BY`` dos totais e as listagens detalhadas usadas pelos relatórios,
+de modo que cada relatório custe um número fixo de consultas.
+"""
+import heapq
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from django.db import connection
+from django.db.models import BooleanField, CharField, F, Func, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from apps.finance.models import Expense, ExtraIncome, LedgerAdjustment
+from apps.reservations.models import ReservationGuest
+
+KIND_GUEST = 'reserva'
+KIND_EXTRA_INCOME = 'receita_avulsa'
+KIND_CREDIT = LedgerAdjustment.Tipo.CREDITO.value
+KIND_DEBIT = LedgerAdjustment.Tipo.DEBITO.value
+KIND_EXPENSE = 'despesa'
+
+REVENUE_KINDS = (KIND_GUEST, KIND_EXTRA_INCOME, KIND_CREDIT)
+EXPENSE_KINDS = (KIND_DEBIT, KIND_EXPENSE)
+
+UNSPECIFIED_METHOD = 'Não informado'
+CENTS = Decimal('0.01')
+
+AGGREGATE_COLUMNS = ('l_day', 'l_kind', 'l_paid', 'l_category', 'l_method', 'l_amount')
+DETAIL_COLUMNS = AGGREGATE_COLUMNS + ('l_id', 'l_description', 'l_room')
+
+
+def _text(value: str) -> Value:
+    return Value(value, output_field=CharField())
+
+
+class UTCHourBucket(Func):
+    """
+    Hora UTC de um ``DateTimeField`` no SQLite (``AAAA-MM-DD HH``).
+
+    No SQLite, ``TruncDate`` converte o fuso chamando uma função Python para
+    cada linha. Agrupar por hora UTC usa apenas o ``strftime`` nativo e gera
+    no máximo 24 grupos por dia, convertidos para a data local em Python.
+    Válido para fusos com deslocamento em horas inteiras, como os do Brasil.
+    """
+    function = 'strftime'
+    template = "%(function)s('%%%%Y-%%%%m-%%%%d %%%%H', %(expressions)s)"
+    output_field = CharField()
+
+
+def local_day_bounds(start_date: date, end_date: date) -> Tuple[datetime, datetime]:
+    """
+    Converte um intervalo de datas locais em limites ``[início, fim)`` com fuso.
+
+    Filtrar ``DateTimeField`` por esses limites usa os índices das colunas,
+    ao contrário de ``campo__date``, que aplica a conversão de fuso linha a linha.
+    """
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(start_date, time.min), tz)
+    end = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min), tz)
+    return start, end
+
+
+def _local_day(field: str, detail: bool):
+    if connection.vendor == 'sqlite' and not detail:
+        return UTCHourBucket(field)
+    return TruncDate(field)
+
+
+def _source_querysets(start_date: date, end_date: date, detail: bool = False,
+                      kinds: Optional[Sequence[str]] = None, ordered: bool = False) -> List:
+    """
+    Monta um ``values()`` por fonte, todos com as mesmas colunas e na mesma ordem.
+
+    Com ``ordered=True`` cada fonte vem ordenada pela própria coluna de data
+    (indexada) e pelo ``id``, pronta para ser intercalada por data.
+    """
+    kinds = set(kinds or REVENUE_KINDS + EXPENSE_KINDS)
+    columns = DETAIL_COLUMNS if detail else AGGREGATE_COLUMNS
+    start, end = local_day_bounds(start_date, end_date)
+    sources = []
+
+    def add(queryset, date_field, **expressions):
+        selected = {name: expressions[name] for name in columns}
+        ordering = (date_field, 'id') if ordered else ()
+        sources.append(queryset.annotate(**selected).values(*columns).order_by(*ordering))
+
+    if KIND_GUEST in kinds:
+        add(
+            ReservationGuest.objects.filter(
+                criado_em__gte=start,
+                criado_em__lt=end,
+            ),
+            'criado_em',
+            l_day=_local_day('criado_em', detail),
+            l_kind=_text(KIND_GUEST),
+            l_paid=F('pago'),
+            l_category=_text(''),
+            l_method=F('metodo_pagamento'),
+            l_amount=F('valor_devido'),
+            l_id=F('id'),
+            l_description=F('nome'),
+            l_room=F('reserva__room__numero'),
+        )
+
+    if KIND_EXTRA_INCOME in kinds:
+        add(
+            ExtraIncome.objects.filter(
+                received_date__gte=start_date,
+                received_date__lte=end_date,
+            ),
+            'received_date',
+            l_day=F('received_date'),
+            l_kind=_text(KIND_EXTRA_INCOME),
+            l_paid=Value(True, output_field=BooleanField()),
+            l_category=_text(''),
+            l_method=Coalesce(F('method'), _text(UNSPECIFIED_METHOD)),
+            l_amount=F('amount'),
+            l_id=F('id'),
+            l_description=F('description'),
+            l_room=_text(''),
+        )
+
+    adjustment_kinds = [kind for kind in (KIND_CREDIT, KIND_DEBIT) if kind in kinds]
+    if adjustment_kinds:
+        add(
+            LedgerAdjustment.objects.filter(
+                tipo__in=adjustment_kinds,
+                criado_em__gte=start,
+                criado_em__lt=end,
+            ),
+            'criado_em',
+            l_day=_local_day('criado_em', detail),
+            l_kind=F('tipo'),
+            l_paid=Value(True, output_field=BooleanField()),
+            l_category=_text(''),
+            l_method=Coalesce(F('metodo'), _text(UNSPECIFIED_METHOD)),
+            l_amount=F('valor'),
+            l_id=F('id'),
+            l_description=F('descricao'),
+            l_room=_text(''),
+        )
+
+    if KIND_EXPENSE in kinds:
+        add(
+            Expense.objects.filter(
+                payment_date__gte=start_date,
+                payment_date__lte=end_date,
+            ),
+            'payment_date',
+            l_day=F('payment_date'),
+            l_kind=_text(KIND_EXPENSE),
+            l_paid=Value(True, output_field=BooleanField()),
+            l_category=F('category'),
+            l_method=F('payment_method'),
+            l_amount=F('amount'),
+            l_id=F('id'),
+            l_description=F('description'),
+            l_room=_text(''),
+        )
+
+    return sources
+
+
+def _union_sql(querysets) -> tuple:
+    parts, params = [], []
+    for queryset in querysets:
+        sql, query_params = queryset.query.sql_with_params()
+        parts.append(sql)
+        params.extend(query_params)
+    return ' UNION ALL '.join(parts), params
+
+
+def _to_date(value) -> date:
+    if isinstance(value, str):
+        if len(value) == 13:
+            hour = datetime.strptime(value, '%Y-%m-%d %H').replace(tzinfo=dt_timezone.utc)
+            return timezone.localdate(hour)
+        return date.fromisoformat(value[:10])
+    return value
+
+
+def _to_decimal(value) -> Decimal:
+    if value is None:
+        return Decimal('0')
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    return value.quantize(CENTS)
+
+
+def _empty_day() -> Dict[str, Any]:
+    return {
+        'revenue_total': Decimal('0'),
+        'revenue_paid': Decimal('0'),
+        'revenue_pending': Decimal('0'),
+        'extra_income_total': Decimal('0'),
+        'expense_total': Decimal('0'),
+        'guest_charge_count': 0,
+        'revenue_entry_count': 0,
+        'expense_entry_count': 0,
+        'revenue_by_method': defaultdict(Decimal),
+        'expense_by_category': defaultdict(Decimal),
+    }
+
+
+def aggregate_ledger(start_date: date, end_date: date) -> Dict[str, Any]:
+    """
+    Agrega todas as fontes do livro-caixa em uma única consulta.
+
+    Args:
+        start_date (date): Data inicial do período.
+        end_date (date): Data final do período.
+
+    Returns:
+        Dict[str, Any]:
+            - ``daily``: totais por dia (apenas dias com lançamentos).
+            - ``by_category``: despesas por categoria no período.
+            - ``by_method``: receita recebida por método no período.
+    """
+    union_sql, params = _union_sql(_source_querysets(start_date, end_date))
+    # No SQLite o tipo declarado da coluna combinada faria o driver tentar
+    # converter o balde de hora para ``date``; o CAST entrega o texto cru.
+    day = 'CAST(l_day AS TEXT)' if connection.vendor == 'sqlite' else 'l_day'
+    sql = (
+        f'SELECT {day}, l_kind, l_paid, l_category, l_method, SUM(l_amount), COUNT(*) '
+        f'FROM ({union_sql}) ledger '
+        f'GROUP BY {day}, l_kind, l_paid, l_category, l_method'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    daily: Dict[date, Dict[str, Any]] = defaultdict(_empty_day)
+    by_category: Dict[str, Decimal] = defaultdict(Decimal)
+    by_method: Dict[str, Decimal] = defaultdict(Decimal)
+
+    for raw_day, kind, paid, category, method, raw_amount, count in rows:
+        day = daily[_to_date(raw_day)]
+        amount = _to_decimal(raw_amount)
+        if kind in REVENUE_KINDS:
+            day['revenue_total'] += amount
+            day['revenue_entry_count'] += count
+            if kind == KIND_GUEST:
+                day['guest_charge_count'] += count
+            if kind == KIND_EXTRA_INCOME:
+                day['extra_income_total'] += amount
+            if paid:
+                day['revenue_paid'] += amount
+                day['revenue_by_method'][method] += amount
+                by_method[method] += amount
+            else:
+                day['revenue_pending'] += amount
+        else:
+            day['expense_total'] += amount
+            day['expense_entry_count'] += count
+            if kind == KIND_EXPENSE:
+                day['expense_by_category'][category] += amount
+                by_category[category] += amount
+
+    return {
+        'daily': dict(daily),
+        'by_category': dict(by_category),
+        'by_method': dict(by_method),
+    }
+
+
+def _detail_row(row: Sequence) -> Dict[str, Any]:
+    return _detail_entry(dict(zip(DETAIL_COLUMNS, row)))
+
+
+def _detail_entry(entry: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'id': entry['l_id'],
+        'date': _to_date(entry['l_day']),
+        'kind': entry['l_kind'],
+        'amount': _to_decimal(entry['l_amount']),
+        'paid': bool(entry['l_paid']),
+        'category': entry['l_category'],
+        'method': entry['l_method'],
+        'description': entry['l_description'],
+        'room_number': entry['l_room'],
+    }
+
+
+def ledger_entries(start_date: date, end_date: date, kinds: Optional[Sequence[str]] = None,
+                   per_kind_limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Lista os lançamentos do período em uma única consulta, do mais recente ao mais antigo.
+
+    Args:
+        start_date (date): Data inicial do período.
+        end_date (date): Data final do período.
+        kinds (Sequence[str], optional): Tipos de lançamento desejados (padrão: todos).
+        per_kind_limit (int, optional): Limita a quantidade de lançamentos por tipo.
+
+    Returns:
+        List[Dict[str, Any]]: Lançamentos normalizados.
+    """
+    union_sql, params = _union_sql(_source_querysets(start_date, end_date, detail=True, kinds=kinds))
+    columns = ', '.join(DETAIL_COLUMNS)
+    if per_kind_limit:
+        sql = (
+            f'SELECT {columns} FROM ('
+            f'SELECT {columns}, ROW_NUMBER() OVER ('
+            'PARTITION BY l_kind ORDER BY l_day DESC, l_id DESC'
+            f') AS l_rank FROM ({union_sql}) ledger'
+            ') ranked WHERE l_rank <= %s '
+            'ORDER BY l_day DESC, l_kind, l_id DESC'
+        )
+        params = [*params, per_kind_limit]
+    else:
+        sql = f'SELECT {columns} FROM ({union_sql}) ledger ORDER BY l_day DESC, l_kind, l_id DESC'
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [_detail_row(row) for row in cursor.fetchall()]
+
+
+def iter_ledger_entries(start_date: date, end_date: date, kinds: Optional[Sequence[str]] = None,
+                        chunk_size: int = 2000) -> Iterator[Dict[str, Any]]:
+    """
+    Percorre os lançamentos do período em ordem cronológica sem materializá-los.
+
+    Cada fonte é lida em blocos de ``chunk_size`` linhas (cursor no servidor no
+    PostgreSQL) e as fontes são intercaladas por data com ``heapq.merge``; a
+    memória usada depende apenas de ``chunk_size`` e do número de fontes.
+
+    Args:
+        start_date (date): Data inicial do período.
+        end_date (date): Data final do período.
+        kinds (Sequence[str], optional): Tipos de lançamento desejados (padrão: todos).
+        chunk_size (int): Quantidade de linhas buscadas por vez em cada fonte.
+
+    Yields:
+        Dict[str, Any]: Lançamentos normalizados, do mais antigo ao mais recente.
+    """
+    sources = _source_querysets(start_date, end_date, detail=True, kinds=kinds, ordered=True)
+    streams = [
+        ((entry['date'], rank, entry) for entry in map(_detail_entry, queryset.iterator(chunk_size=chunk_size)))
+        for rank, queryset in enumerate(sources)
+    ]
+    for _, _, entry in heapq.merge(*streams, key=lambda item: item[:2]):
+        yield entry
@@ -0,0 +1,68 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+
+from apps.finance.models import Expense, ExtraIncome, LedgerAdjustment
+from apps.reports.models import DailyFinancialRollup
+from apps.reports.rollup import iter_ranges, rebuild_range
+from apps.reservations.models import ReservationGuest
+
+
+def _parse_date(value, option):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'Data inválida para {option}: {value} (use AAAA-MM-DD).')
+
+
+def _earliest_ledger_date():
+    candidates = [
+        ReservationGuest.objects.aggregate(first=Min('criado_em'))['first'],
+        LedgerAdjustment.objects.aggregate(first=Min('criado_em'))['first'],
+        ExtraIncome.objects.aggregate(first=Min('received_date'))['first'],
+        Expense.objects.aggregate(first=Min('payment_date'))['first'],
+    ]
+    dates = [
+        timezone.localdate(value) if isinstance(value, datetime) else value
+        for value in candidates
+        if value is not None
+    ]
+    return min(dates) if dates else None
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói os consolidados financeiros diários a partir dos lançamentos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='Data inicial (AAAA-MM-DD). Padrão: primeiro lançamento.')
+        parser.add_argument('--end', help='Data final (AAAA-MM-DD). Padrão: hoje.')
+        parser.add_argument('--chunk-days', type=int, default=31, help='Dias processados por transação.')
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        full_rebuild = not options['start'] and not options['end']
+        start_date = _parse_date(options['start'], '--start') if options['start'] else _earliest_ledger_date()
+        end_date = _parse_date(options['end'], '--end') if options['end'] else today
+
+        if options['chunk_days'] < 1:
+            raise CommandError('--chunk-days deve ser maior que zero.')
+
+        if start_date is None:
+            removed, _ = DailyFinancialRollup.objects.all().delete()
+            self.stdout.write(self.style.WARNING(f'Nenhum lançamento encontrado. {removed} consolidado(s) removido(s).'))
+            return
+
+        if start_date > end_date:
+            raise CommandError('--start deve ser anterior ou igual a --end.')
+
+        if full_rebuild:
+            DailyFinancialRollup.objects.exclude(date__gte=start_date, date__lte=end_date).delete()
+
+        written = 0
+        for block_start, block_end in iter_ranges(start_date, end_date, options['chunk_days']):
+            written += rebuild_range(block_start, block_end)
+            self.stdout.write(f'{block_start:%d/%m/%Y} a {block_end:%d/%m/%Y} processado.')
+
+        self.stdout.write(self.style.SUCCESS(f'{written} dia(s) consolidado(s) entre {start_date:%d/%m/%Y} e {end_date:%d/%m/%Y}.'))
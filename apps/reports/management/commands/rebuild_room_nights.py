@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from apps.reports.occupancy import rebuild_room_nights, top_up_open_stays
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói o histórico de noites ocupadas (RoomNight) a partir das reservas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--open-stays',
+            action='store_true',
+            help='Apenas grava as noites que faltam às estadias em aberto até hoje (agendar diariamente).',
+        )
+
+    def handle(self, *args, **options):
+        if options['open_stays']:
+            updated = top_up_open_stays()
+            self.stdout.write(self.style.SUCCESS(f'{updated} estadia(s) em aberto completada(s).'))
+            return
+        written = rebuild_room_nights()
+        self.stdout.write(self.style.SUCCESS(f'{written} noite(s) ocupada(s) gravada(s).'))
@@ -0,0 +1,64 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from apps.reports.jobs import claim_next_report, process_report, requeue_stale_reports
+
+
+def _run(report_id):
+    try:
+        return report_id, process_report(report_id)
+    finally:
+        # Cada thread abre a própria conexão; fecha ao terminar o pedido.
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Processa a fila de relatórios pedidos pela interface (tabela Report).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Relatórios gerados em paralelo.')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Segundos entre consultas à fila vazia.')
+        parser.add_argument('--stale-minutes', type=int, default=30,
+                            help='Devolve à fila pedidos em processamento há mais tempo que isso.')
+        parser.add_argument('--once', action='store_true', help='Processa os pedidos pendentes e encerra.')
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        if workers < 1:
+            raise CommandError('--workers deve ser maior que zero.')
+
+        requeued = requeue_stale_reports(timedelta(minutes=options['stale_minutes']))
+        if requeued:
+            self.stdout.write(self.style.WARNING(f'{requeued} pedido(s) interrompido(s) devolvido(s) à fila.'))
+
+        self.stdout.write(f'Worker de relatórios iniciado com {workers} thread(s).')
+        in_flight = set()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            try:
+                while True:
+                    while len(in_flight) < workers:
+                        report_id = claim_next_report()
+                        if report_id is None:
+                            break
+                        in_flight.add(pool.submit(_run, report_id))
+
+                    if not in_flight:
+                        if options['once']:
+                            break
+                        time.sleep(options['poll_interval'])
+                        continue
+
+                    done, in_flight = wait(in_flight, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                    for future in done:
+                        report_id, generated = future.result()
+                        if generated:
+                            self.stdout.write(self.style.SUCCESS(f'Relatório #{report_id} gerado.'))
+                        else:
+                            self.stdout.write(self.style.ERROR(f'Relatório #{report_id} falhou.'))
+            except KeyboardInterrupt:
+                self.stdout.write('Encerrando após concluir os relatórios em andamento...')
+                wait(in_flight)
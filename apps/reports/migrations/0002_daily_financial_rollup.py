@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-18 19:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyFinancialRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('revenue_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('revenue_paid', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('revenue_pending', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('extra_income_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('expense_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('guest_charge_count', models.PositiveIntegerField(default=0)),
+                ('revenue_entry_count', models.PositiveIntegerField(default=0)),
+                ('expense_entry_count', models.PositiveIntegerField(default=0)),
+                ('revenue_by_method', models.JSONField(blank=True, default=dict)),
+                ('expense_by_category', models.JSONField(blank=True, default=dict)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['date'],
+            },
+        ),
+    ]
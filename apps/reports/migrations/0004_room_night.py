@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-18 19:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0003_report_jobs'),
+        ('reservations', '0003_index_reservation_data_entrada'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomNight',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('reservation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='noites', to='reservations.reservation')),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='noites', to='reservations.room')),
+            ],
+            options={
+                'ordering': ['date'],
+                'indexes': [models.Index(fields=['date', 'room'], name='room_night_data_quarto_idx')],
+                'constraints': [models.UniqueConstraint(fields=('reservation', 'date'), name='room_night_reserva_data_unica')],
+            },
+        ),
+    ]
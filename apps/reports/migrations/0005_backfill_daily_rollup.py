@@ -0,0 +1,107 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations
+from django.utils import timezone
+
+SEM_METODO = 'Não informado'
+CENTAVOS = Decimal('0.01')
+
+
+def _dia_vazio():
+    return {
+        'revenue_total': Decimal('0'),
+        'revenue_paid': Decimal('0'),
+        'revenue_pending': Decimal('0'),
+        'extra_income_total': Decimal('0'),
+        'expense_total': Decimal('0'),
+        'guest_charge_count': 0,
+        'revenue_entry_count': 0,
+        'expense_entry_count': 0,
+        'revenue_by_method': defaultdict(Decimal),
+        'expense_by_category': defaultdict(Decimal),
+    }
+
+
+def _receita(dia, valor, pago, metodo):
+    dia['revenue_total'] += valor
+    dia['revenue_entry_count'] += 1
+    if pago:
+        dia['revenue_paid'] += valor
+        dia['revenue_by_method'][metodo] += valor
+    else:
+        dia['revenue_pending'] += valor
+
+
+def _despesa(dia, valor):
+    dia['expense_total'] += valor
+    dia['expense_entry_count'] += 1
+
+
+def _detalhamento(valores):
+    return {chave: str(valor.quantize(CENTAVOS)) for chave, valor in sorted(valores.items())}
+
+
+def reconstruir_consolidados(apps, schema_editor):
+    """
+    Preenche ``DailyFinancialRollup`` com o histórico já gravado antes da tabela existir.
+
+    Repete, sobre os modelos históricos, as regras de ``apps.reports.ledger``:
+    hóspedes e ajustes contam na data local de ``criado_em``, receitas avulsas e
+    despesas na própria data. Depois do deploy, ``rebuild_financial_rollup``
+    continua sendo o caminho para refazer os consolidados.
+    """
+    ReservationGuest = apps.get_model('reservations', 'ReservationGuest')
+    ExtraIncome = apps.get_model('finance', 'ExtraIncome')
+    LedgerAdjustment = apps.get_model('finance', 'LedgerAdjustment')
+    Expense = apps.get_model('finance', 'Expense')
+    DailyFinancialRollup = apps.get_model('reports', 'DailyFinancialRollup')
+
+    dias = defaultdict(_dia_vazio)
+
+    hospedes = ReservationGuest.objects.values_list('criado_em', 'valor_devido', 'pago', 'metodo_pagamento')
+    for criado_em, valor, pago, metodo in hospedes.iterator(chunk_size=5000):
+        dia = dias[timezone.localdate(criado_em)]
+        _receita(dia, valor, pago, metodo)
+        dia['guest_charge_count'] += 1
+
+    receitas = ExtraIncome.objects.values_list('received_date', 'amount', 'method')
+    for data, valor, metodo in receitas.iterator(chunk_size=5000):
+        dia = dias[data]
+        _receita(dia, valor, True, SEM_METODO if metodo is None else metodo)
+        dia['extra_income_total'] += valor
+
+    ajustes = LedgerAdjustment.objects.values_list('criado_em', 'tipo', 'valor', 'metodo')
+    for criado_em, tipo, valor, metodo in ajustes.iterator(chunk_size=5000):
+        dia = dias[timezone.localdate(criado_em)]
+        if tipo == 'credito':
+            _receita(dia, valor, True, SEM_METODO if metodo is None else metodo)
+        else:
+            _despesa(dia, valor)
+
+    despesas = Expense.objects.values_list('payment_date', 'amount', 'category')
+    for data, valor, categoria in despesas.iterator(chunk_size=5000):
+        dia = dias[data]
+        _despesa(dia, valor)
+        dia['expense_by_category'][categoria] += valor
+
+    lote = []
+    for data, valores in dias.items():
+        valores['revenue_by_method'] = _detalhamento(valores['revenue_by_method'])
+        valores['expense_by_category'] = _detalhamento(valores['expense_by_category'])
+        lote.append(DailyFinancialRollup(date=data, **valores))
+    DailyFinancialRollup.objects.all().delete()
+    DailyFinancialRollup.objects.bulk_create(lote, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0004_room_night'),
+        ('finance', '0009_drop_expense_date_single_index'),
+        ('reservations', '0006_one_active_stay_per_room'),
+    ]
+
+    operations = [
+        migrations.RunPython(reconstruir_consolidados, migrations.RunPython.noop, elidable=True),
+    ]
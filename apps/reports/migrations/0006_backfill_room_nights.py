@@ -0,0 +1,52 @@
+from datetime import timedelta
+
+from django.db import migrations
+from django.utils import timezone
+
+
+def reconstruir_noites(apps, schema_editor):
+    """
+    Preenche ``RoomNight`` com as reservas gravadas antes da tabela existir.
+
+    Repete, sobre os modelos históricos, a regra de ``occupancy.stay_nights``:
+    uma noite por data local da entrada até a véspera da saída, até hoje para
+    estadias em aberto e ao menos uma noite por reserva.
+    """
+    Reservation = apps.get_model('reservations', 'Reservation')
+    RoomNight = apps.get_model('reports', 'RoomNight')
+    hoje = timezone.localdate()
+
+    reservas = Reservation.objects.filter(data_entrada__isnull=False).values_list(
+        'id', 'room_id', 'data_entrada', 'data_saida', 'ativa',
+    )
+    RoomNight.objects.all().delete()
+    lote = []
+    for reserva_id, room_id, data_entrada, data_saida, ativa in reservas.iterator(chunk_size=5000):
+        primeira = timezone.localdate(data_entrada)
+        if data_saida is not None:
+            ultima = timezone.localdate(data_saida) - timedelta(days=1)
+        elif ativa:
+            ultima = hoje
+        else:
+            ultima = primeira
+        for deslocamento in range((max(ultima, primeira) - primeira).days + 1):
+            lote.append(RoomNight(
+                date=primeira + timedelta(days=deslocamento), room_id=room_id, reservation_id=reserva_id,
+            ))
+        if len(lote) >= 5000:
+            RoomNight.objects.bulk_create(lote)
+            lote = []
+    if lote:
+        RoomNight.objects.bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0005_backfill_daily_rollup'),
+        ('reservations', '0006_one_active_stay_per_room'),
+    ]
+
+    operations = [
+        migrations.RunPython(reconstruir_noites, migrations.RunPython.noop, elidable=True),
+    ]
@@ -1,10 +1,100 @@
+from django.conf import settings
 from django.db import models
 
 
 class Report(models.Model):
+    """
+    Relatório gravado em arquivo.
+
+    Pedidos feitos pela interface entram como ``pendente`` e são gerados pelo
+    comando ``run_report_worker``, que usa a própria tabela como fila
+    (ver ``apps.reports.jobs``).
+    """
+    class Status(models.TextChoices):
+        PENDENTE = 'pendente', 'Pendente'
+        PROCESSANDO = 'processando', 'Processando'
+        CONCLUIDO = 'concluido', 'Concluído'
+        ERRO = 'erro', 'Erro'
+
     name = models.CharField(max_length=255)
     generated_at = models.DateTimeField(auto_now_add=True)
-    file_path = models.FileField(upload_to='reports/')
+    file_path = models.FileField(upload_to='reports/', blank=True)
+    kind = models.CharField(max_length=40, blank=True)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.CONCLUIDO,
+    )
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        related_name='relatorios',
+        blank=True,
+        null=True,
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'generated_at'], name='report_fila_idx'),
+        ]
 
     def __str__(self):
         return f"Report {self.name} generated on {self.generated_at}"
+
+
+class DailyFinancialRollup(models.Model):
+    """
+    Totais financeiros consolidados por dia (data local).
+
+    Mantido pelos sinais de ``apps.reports.signals`` sempre que hóspedes,
+    receitas avulsas, ajustes ou despesas são gravados ou removidos, e
+    reconstruído em lote pelo comando ``rebuild_financial_rollup``.
+    """
+    date = models.DateField(unique=True)
+    revenue_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    revenue_paid = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    revenue_pending = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    extra_income_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    expense_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    guest_charge_count = models.PositiveIntegerField(default=0)
+    revenue_entry_count = models.PositiveIntegerField(default=0)
+    expense_entry_count = models.PositiveIntegerField(default=0)
+    revenue_by_method = models.JSONField(default=dict, blank=True)
+    expense_by_category = models.JSONField(default=dict, blank=True)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['date']
+
+    def __str__(self):
+        return f"Consolidado {self.date} - Receita R$ {self.revenue_total} / Despesa R$ {self.expense_total}"
+
+
+class RoomNight(models.Model):
+    """
+    Uma noite vendida de um quarto (data local da noite).
+
+    Mantida pelos sinais de ``Reservation`` em ``apps.reports.signals``,
+    completada diariamente para estadias em aberto e reconstruída pelo
+    comando ``rebuild_room_nights`` (ver ``apps.reports.occupancy``).
+    """
+    date = models.DateField()
+    room = models.ForeignKey('reservations.Room', on_delete=models.CASCADE, related_name='noites')
+    reservation = models.ForeignKey('reservations.Reservation', on_delete=models.CASCADE, related_name='noites')
+
+    class Meta:
+        ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(fields=['reservation', 'date'], name='room_night_reserva_data_unica'),
+        ]
+        indexes = [
+            models.Index(fields=['date', 'room'], name='room_night_data_quarto_idx'),
+        ]
+
+    def __str__(self):
+        return f"Quarto {self.room_id} ocupado na noite de {self.date}"
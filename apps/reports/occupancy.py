@@ -0,0 +1,178 @@
+"""
+Histórico de ocupação por noite vendida (``RoomNight``).
+
+Cada reserva gera uma linha por noite, da data local de entrada até a véspera
+da data de saída (estadias que entram e saem no mesmo dia contam uma noite).
+Estadias em aberto recebem noites até o dia em que foram gravadas; as noites
+seguintes são gravadas no check-out ou por ``top_up_open_stays`` (comando
+``rebuild_room_nights --open-stays``, agendado uma vez por dia). Até lá, a
+leitura soma essas noites em memória (``unrecorded_nights``), sem gravar nada.
+Com isso, taxa de ocupação, diárias vendidas e tendências de qualquer período
+saem de um único ``GROUP BY`` indexado.
+"""
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from apps.reservations.models import Reservation, Room
+
+from .ledger import local_day_bounds
+from .models import RoomNight
+from .series import DailySeries
+
+BATCH_SIZE = 5000
+
+
+def stay_nights(reservation: Reservation, today: Optional[date] = None) -> List[date]:
+    """
+    Lista as noites (datas locais) ocupadas por uma reserva.
+
+    Args:
+        reservation (Reservation): Reserva com ``data_entrada`` preenchida.
+        today (date, optional): Limite para estadias em aberto (padrão: hoje).
+
+    Returns:
+        List[date]: Noites ocupadas, em ordem.
+    """
+    if reservation.data_entrada is None:
+        return []
+    first = timezone.localdate(reservation.data_entrada)
+    if reservation.data_saida is not None:
+        last = timezone.localdate(reservation.data_saida) - timedelta(days=1)
+    elif reservation.ativa:
+        last = today or timezone.localdate()
+    else:
+        last = first
+    last = max(last, first)
+    return [first + timedelta(days=offset) for offset in range((last - first).days + 1)]
+
+
+def _night_rows(reservation: Reservation, nights: Iterable[date]) -> List[RoomNight]:
+    return [RoomNight(date=night, room_id=reservation.room_id, reservation_id=reservation.id) for night in nights]
+
+
+def sync_reservation_nights(reservation: Reservation, today: Optional[date] = None) -> None:
+    """Ajusta as noites gravadas de uma reserva ao período atual da estadia."""
+    nights = stay_nights(reservation, today)
+    with transaction.atomic():
+        RoomNight.objects.filter(reservation_id=reservation.id).exclude(
+            date__in=nights,
+            room_id=reservation.room_id,
+        ).delete()
+        RoomNight.objects.bulk_create(_night_rows(reservation, nights), ignore_conflicts=True)
+
+
+def _open_stays_behind(today: date):
+    """Estadias em aberto sem noite gravada para ``today`` (``last_night``: última noite gravada)."""
+    return Reservation.objects.ativas().annotate(last_night=Max('noites__date')).filter(
+        Q(last_night__lt=today) | Q(last_night__isnull=True)
+    ).only('id', 'room_id', 'data_entrada', 'data_saida', 'ativa')
+
+
+def top_up_open_stays(today: Optional[date] = None) -> int:
+    """
+    Acrescenta as noites que faltam às estadias em aberto até ``today``.
+
+    Returns:
+        int: Quantidade de reservas completadas.
+    """
+    today = today or timezone.localdate()
+    updated = 0
+    for reservation in _open_stays_behind(today):
+        sync_reservation_nights(reservation, today)
+        updated += 1
+    return updated
+
+
+def unrecorded_nights(start_date: date, end_date: date, today: Optional[date] = None) -> List[Dict[str, Any]]:
+    """
+    Noites do período das estadias em aberto que ainda não foram gravadas.
+
+    Returns:
+        List[Dict[str, Any]]: Linhas ``{'date': noite, 'nights': 1}``, no formato
+        do ``GROUP BY`` de ``RoomNight``.
+    """
+    today = today or timezone.localdate()
+    return [
+        {'date': night, 'nights': 1}
+        for reservation in _open_stays_behind(today)
+        for night in stay_nights(reservation, today)
+        if start_date <= night <= end_date and (reservation.last_night is None or night > reservation.last_night)
+    ]
+
+
+def rebuild_room_nights(today: Optional[date] = None) -> int:
+    """
+    Recria todas as noites a partir de ``data_entrada``/``data_saida`` das reservas.
+
+    Returns:
+        int: Quantidade de noites gravadas.
+    """
+    today = today or timezone.localdate()
+    reservations = Reservation.objects.order_by('id').only('id', 'room_id', 'data_entrada', 'data_saida', 'ativa')
+    written = 0
+    with transaction.atomic():
+        RoomNight.objects.all().delete()
+        batch: List[RoomNight] = []
+        for reservation in reservations.iterator(chunk_size=BATCH_SIZE):
+            batch.extend(_night_rows(reservation, stay_nights(reservation, today)))
+            if len(batch) >= BATCH_SIZE:
+                RoomNight.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            RoomNight.objects.bulk_create(batch)
+            written += len(batch)
+    return written
+
+
+def occupancy_summary(start_date: date, end_date: date) -> Dict[str, Any]:
+    """
+    Calcula a ocupação do período a partir das noites vendidas.
+
+    Args:
+        start_date (date): Data inicial do período.
+        end_date (date): Data final do período.
+
+    Returns:
+        Dict[str, Any]: Total de quartos, diárias vendidas e disponíveis, taxa de
+        ocupação do período e série diária com noites, check-ins e taxa.
+    """
+    total_rooms = Room.objects.count()
+    nights_by_day = (
+        RoomNight.objects.filter(date__gte=start_date, date__lte=end_date)
+        .values('date')
+        .annotate(nights=Count('id'))
+        .order_by()
+    )
+    start, end = local_day_bounds(start_date, end_date)
+    checkins_by_day = (
+        Reservation.objects.filter(data_entrada__gte=start, data_entrada__lt=end)
+        .annotate(date=TruncDate('data_entrada'))
+        .values('date')
+        .annotate(checkins=Count('id'))
+        .order_by()
+    )
+
+    series = (
+        DailySeries(start_date, end_date)
+        .align('nights', nights_by_day, 'nights', places=0)
+        .align('nights', unrecorded_nights(start_date, end_date), 'nights', places=0)
+        .align('checkins', checkins_by_day, 'checkins', places=0)
+        .constant('capacity', total_rooms)
+        .ratio('rate', 'nights', 'capacity')
+    )
+    nights_sold = series.total('nights')
+    available = total_rooms * series.length
+
+    return {
+        'total_rooms': total_rooms,
+        'room_nights_sold': nights_sold,
+        'room_nights_available': available,
+        'occupancy_rate': round(nights_sold / available * 100, 2) if available else 0,
+        'daily': series.rows(),
+    }
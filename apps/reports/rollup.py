@@ -0,0 +1,93 @@
+"""
+Manutenção da tabela ``DailyFinancialRollup``.
+
+Cada dia consolidado é sempre recalculado a partir das linhas de origem
+(hóspedes, receitas avulsas, ajustes e despesas), o que mantém a tabela
+idempotente: reprocessar um dia nunca acumula erro.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Iterable
+
+from django.db import transaction
+
+from .cache import invalidate_range
+from .ledger import aggregate_ledger
+from .models import DailyFinancialRollup
+
+CENTS = Decimal('0.01')
+
+ROLLUP_FIELDS = [
+    'revenue_total',
+    'revenue_paid',
+    'revenue_pending',
+    'extra_income_total',
+    'expense_total',
+    'guest_charge_count',
+    'revenue_entry_count',
+    'expense_entry_count',
+    'revenue_by_method',
+    'expense_by_category',
+]
+
+
+def compute_rollups(start_date: date, end_date: date) -> Dict[date, Dict[str, Any]]:
+    """
+    Agrega as linhas de origem por dia local entre ``start_date`` e ``end_date``.
+
+    Returns:
+        Dict[date, Dict[str, Any]]: Totais por dia, apenas para dias com lançamentos.
+    """
+    return aggregate_ledger(start_date, end_date)['daily']
+
+
+def _serialize_breakdown(values: Dict[str, Decimal]) -> Dict[str, str]:
+    return {key: str(amount.quantize(CENTS)) for key, amount in sorted(values.items())}
+
+
+def rebuild_range(start_date: date, end_date: date) -> int:
+    """
+    Recalcula e grava os consolidados de todos os dias do intervalo.
+
+    Dias sem lançamentos têm a linha consolidada removida.
+
+    Returns:
+        int: Quantidade de dias com lançamentos gravados.
+    """
+    computed = compute_rollups(start_date, end_date)
+    rows = []
+    for day, values in computed.items():
+        values = dict(values)
+        values['revenue_by_method'] = _serialize_breakdown(values['revenue_by_method'])
+        values['expense_by_category'] = _serialize_breakdown(values['expense_by_category'])
+        rows.append(DailyFinancialRollup(date=day, **values))
+
+    with transaction.atomic():
+        DailyFinancialRollup.objects.filter(
+            date__gte=start_date,
+            date__lte=end_date,
+        ).exclude(date__in=list(computed)).delete()
+        if rows:
+            DailyFinancialRollup.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['date'],
+                update_fields=ROLLUP_FIELDS + ['atualizado_em'],
+            )
+        invalidate_range(start_date, end_date)
+    return len(rows)
+
+
+def refresh_days(days: Iterable[date]) -> None:
+    """Recalcula os consolidados dos dias informados (ignora ``None``)."""
+    for day in sorted({day for day in days if day is not None}):
+        rebuild_range(day, day)
+
+
+def iter_ranges(start_date: date, end_date: date, step_days: int):
+    """Divide ``[start_date, end_date]`` em blocos de até ``step_days`` dias."""
+    current = start_date
+    while current <= end_date:
+        block_end = min(current + timedelta(days=step_days - 1), end_date)
+        yield current, block_end
+        current = block_end + timedelta(days=1)
@@ -0,0 +1,114 @@
+"""
+Séries diárias densas para os relatórios.
+
+``DailySeries`` reserva um ``array`` por coluna com uma posição para cada dia
+do período. Agregados esparsos (uma linha por dia com lançamentos) são
+encaixados pelo deslocamento da data em relação ao início, em tempo linear,
+e as colunas derivadas (saldo, margem, acumulado) são calculadas coluna a
+coluna em uma única passada.
+
+Valores somáveis ficam em inteiros exatos (``array('q')``) com a quantidade de
+casas decimais da coluna: dinheiro em centavos (``places=2``, o padrão de
+``align``), contagens em unidades. Somas, saldos e acumulados nunca acumulam
+erro de ponto flutuante, e ``rows``/``total`` devolvem ``Decimal`` para
+colunas com casas decimais. Só as razões (``ratio``) são ``float``.
+"""
+from array import array
+from datetime import date, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from itertools import accumulate
+from typing import Any, Dict, Iterable, List, Optional
+
+
+def _to_units(value: Any, places: int) -> int:
+    """Converte ``value`` para inteiro na escala de ``places`` casas (centavos com 2)."""
+    return int(Decimal(str(value or 0)).scaleb(places).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+class DailySeries:
+    """Calendário denso de ``start_date`` a ``end_date`` com colunas numéricas."""
+
+    def __init__(self, start_date: date, end_date: date):
+        self.start_date = start_date
+        self.length = max((end_date - start_date).days + 1, 0)
+        self.columns: Dict[str, array] = {}
+        self.places: Dict[str, Optional[int]] = {}  # ``None``: coluna ``float`` (razões)
+        self.present = bytearray(self.length)
+
+    def _zeros(self) -> array:
+        return array('q', bytes(8 * self.length))
+
+    def dates(self) -> List[date]:
+        return [self.start_date + timedelta(days=offset) for offset in range(self.length)]
+
+    def align(self, name: str, rows: Iterable[Dict[str, Any]], value_key: str, date_key: str = 'date',
+              places: int = 2) -> 'DailySeries':
+        """Encaixa linhas esparsas ``{date_key: data, value_key: valor}`` na coluna ``name``."""
+        places = self.places.get(name, places)
+        column = self.columns.get(name) or self._zeros()
+        for row in rows:
+            offset = (row[date_key] - self.start_date).days
+            if 0 <= offset < self.length:
+                column[offset] += _to_units(row[value_key], places)
+                self.present[offset] = 1
+        self.columns[name] = column
+        self.places[name] = places
+        return self
+
+    def constant(self, name: str, value: Any, places: int = 0) -> 'DailySeries':
+        """Coluna com o mesmo valor em todos os dias (capacidade, metas)."""
+        self.columns[name] = array('q', [_to_units(value, places)]) * self.length
+        self.places[name] = places
+        return self
+
+    def subtract(self, name: str, minuend: str, subtrahend: str) -> 'DailySeries':
+        if self.places[minuend] != self.places[subtrahend]:
+            raise ValueError(f'Colunas com escalas diferentes: {minuend} e {subtrahend}.')
+        left, right = self.columns[minuend], self.columns[subtrahend]
+        self.columns[name] = array('q', map(int.__sub__, left, right))
+        self.places[name] = self.places[minuend]
+        return self
+
+    def ratio(self, name: str, numerator: str, denominator: str, scale: float = 100.0) -> 'DailySeries':
+        """Razão percentual; dias com denominador não positivo recebem zero."""
+        top, bottom = self.columns[numerator], self.columns[denominator]
+        factor = 10.0 ** (self.places[denominator] - self.places[numerator])
+        self.columns[name] = array('d', (
+            value / base * factor * scale if base > 0 else 0.0
+            for value, base in zip(top, bottom)
+        ))
+        self.places[name] = None
+        return self
+
+    def cumulative(self, name: str, source: str) -> 'DailySeries':
+        self.columns[name] = array(self.columns[source].typecode, accumulate(self.columns[source]))
+        self.places[name] = self.places[source]
+        return self
+
+    def _value(self, name: str, raw):
+        places = self.places[name]
+        if places is None or places == 0:
+            return raw
+        return Decimal(raw).scaleb(-places).quantize(Decimal(1).scaleb(-places))
+
+    def total(self, name: str):
+        return self._value(name, sum(self.columns[name]))
+
+    def rows(self, only_present: bool = False) -> List[Dict[str, Any]]:
+        """
+        Materializa a série como lista de dicionários ``{'date': ..., coluna: valor}``.
+
+        Args:
+            only_present (bool): Mantém apenas os dias que receberam alguma linha.
+        """
+        names = list(self.columns)
+        columns = [self.columns[name] for name in names]
+        result = []
+        for offset, day in enumerate(self.dates()):
+            if only_present and not self.present[offset]:
+                continue
+            row = {'date': day}
+            for name, column in zip(names, columns):
+                row[name] = self._value(name, column[offset])
+            result.append(row)
+        return result
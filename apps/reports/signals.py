@@ -0,0 +1,86 @@
+"""
+Sinais que mantêm as tabelas derivadas dos relatórios sincronizadas.
+
+``DailyFinancialRollup``: para cada gravação ou exclusão de lançamento, os
+dias afetados (data atual e, em edições, a data anterior do lançamento) são
+recalculados dentro de uma transação.
+
+Lançamentos gravados em lote (``ledger_bulk_created``: extratos bancários,
+lotes de ajustes) recalculam o intervalo de dias com lançamentos novos, em
+blocos de um mês.
+
+``RoomNight``: cada gravação de reserva (check-in, check-out, troca de
+quarto) ajusta as noites ocupadas da estadia.
+"""
+from datetime import date
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from apps.finance.models import Expense, ExtraIncome, LedgerAdjustment
+from apps.finance.signals import ledger_bulk_created
+from apps.reservations.models import Reservation, ReservationGuest
+
+from .occupancy import sync_reservation_nights
+from .rollup import iter_ranges, rebuild_range, refresh_days
+
+
+def ledger_day(instance):
+    """Retorna a data local em que o lançamento entra nos relatórios."""
+    if isinstance(instance, (Expense, ExtraIncome)):
+        day = instance.payment_date if isinstance(instance, Expense) else instance.received_date
+        # Formulários gravam a data como veio do POST ('AAAA-MM-DD'); o campo só vira ``date`` ao reler.
+        return date.fromisoformat(day) if isinstance(day, str) else day
+    if instance.criado_em is None:
+        return None
+    return timezone.localdate(instance.criado_em)
+
+
+@receiver(pre_save, sender=Expense)
+@receiver(pre_save, sender=ExtraIncome)
+def remember_previous_ledger_day(sender, instance, **kwargs):
+    instance._rollup_previous_day = None
+    if instance.pk is None:
+        return
+    previous = sender.objects.filter(pk=instance.pk).first()
+    if previous is not None:
+        instance._rollup_previous_day = ledger_day(previous)
+
+
+def _refresh_for(instance, *extra_days):
+    with transaction.atomic():
+        refresh_days([ledger_day(instance), *extra_days])
+
+
+@receiver(post_save, sender=ReservationGuest)
+@receiver(post_save, sender=ExtraIncome)
+@receiver(post_save, sender=LedgerAdjustment)
+@receiver(post_save, sender=Expense)
+def refresh_rollup_on_save(sender, instance, **kwargs):
+    _refresh_for(instance, getattr(instance, '_rollup_previous_day', None))
+
+
+@receiver(post_delete, sender=ReservationGuest)
+@receiver(post_delete, sender=ExtraIncome)
+@receiver(post_delete, sender=LedgerAdjustment)
+@receiver(post_delete, sender=Expense)
+def refresh_rollup_on_delete(sender, instance, **kwargs):
+    _refresh_for(instance)
+
+
+@receiver(ledger_bulk_created)
+def refresh_rollup_on_bulk_create(sender, dates, **kwargs):
+    if not dates:
+        return
+    with transaction.atomic():
+        for block_start, block_end in iter_ranges(min(dates), max(dates), 31):
+            rebuild_range(block_start, block_end)
+
+
+@receiver(post_save, sender=Reservation)
+def sync_room_nights_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    sync_reservation_nights(instance)
@@ -175,3 +175,509 @@ def test_calculate_revenue_data_basic():
     assert total_paid == pytest.approx(325.0)
     assert total_pending == pytest.approx(50.0)
     assert len(revenue_data) == 1
+
+
+@pytest.mark.django_db
+def test_rollup_follows_expense_updates_and_deletes():
+    """O consolidado diário acompanha mudanças de data e exclusões de despesas."""
+    from datetime import timedelta
+    from apps.finance.models import Expense
+    from apps.reports.models import DailyFinancialRollup
+
+    today = timezone.localdate()
+    yesterday = today - timedelta(days=1)
+    expense = Expense.objects.create(
+        description="Conta de luz",
+        amount=Decimal('80.00'),
+        category='utilities',
+        payment_date=today,
+        payment_method='PIX',
+    )
+
+    rollup = DailyFinancialRollup.objects.get(date=today)
+    assert rollup.expense_total == Decimal('80.00')
+    assert rollup.expense_by_category == {'utilities': '80.00'}
+
+    expense.payment_date = yesterday
+    expense.save()
+
+    assert not DailyFinancialRollup.objects.filter(date=today).exists()
+    assert DailyFinancialRollup.objects.get(date=yesterday).expense_total == Decimal('80.00')
+
+    expense.delete()
+    assert not DailyFinancialRollup.objects.exists()
+
+
+@pytest.mark.django_db
+def test_rollup_includes_entries_created_from_form_dates(client):
+    """Despesas e receitas criadas pelas views (data em texto, como no POST) entram no consolidado."""
+    from datetime import date
+    from apps.finance.models import Expense
+    from apps.reports.models import DailyFinancialRollup
+
+    client.force_login(User.objects.create_user(username='formulario', password='x'))
+    response = client.post(reverse('finance:create_expense'), {
+        'description': "Conta de água",
+        'amount': '45.00',
+        'category': 'utilities',
+        'payment_date': '2025-01-10',
+        'payment_method': 'PIX',
+    }, follow=True)
+    assert 'Erro ao registrar despesa' not in response.content.decode()
+    client.post(reverse('finance:create_extra_income'), {
+        'description': "Estacionamento",
+        'amount': '30.00',
+        'received_date': '2025-01-10',
+        'method': 'DINHEIRO',
+    })
+
+    assert Expense.objects.count() == 1
+    rollup = DailyFinancialRollup.objects.get(date=date(2025, 1, 10))
+    assert (rollup.expense_total, rollup.extra_income_total) == (Decimal('45.00'), Decimal('30.00'))
+
+
+@pytest.mark.django_db
+def test_rebuild_financial_rollup_command_restores_rows():
+    """O comando de reconstrução recria consolidados apagados ou desatualizados."""
+    from django.core.management import call_command
+    from apps.reports.models import DailyFinancialRollup
+
+    room = Room.objects.create(numero="102")
+    reservation = Reservation.objects.create(room=room)
+    ReservationGuest.objects.create(
+        reserva=reservation,
+        nome="Hóspede",
+        valor_devido=Decimal('120.00'),
+        pago=True,
+        metodo_pagamento=ReservationGuest.MetodoPagamento.PIX,
+    )
+    DailyFinancialRollup.objects.all().delete()
+
+    call_command('rebuild_financial_rollup', stdout=open(os.devnull, 'w'))
+
+    rollup = DailyFinancialRollup.objects.get(date=timezone.localdate())
+    assert rollup.revenue_paid == Decimal('120.00')
+    assert rollup.guest_charge_count == 1
+    assert rollup.revenue_by_method == {'PIX': '120.00'}
+
+
+@pytest.mark.django_db
+def test_backfill_migration_builds_rollups_for_existing_history():
+    """A migração de backfill consolida os lançamentos gravados antes da tabela existir."""
+    from datetime import timedelta
+    from importlib import import_module
+    from django.apps import apps
+    from django.core.management import call_command
+    from apps.finance.models import Expense
+    from apps.reports.models import DailyFinancialRollup
+    from apps.reports.rollup import ROLLUP_FIELDS
+
+    backfill = import_module('apps.reports.migrations.0005_backfill_daily_rollup')
+    today = timezone.localdate()
+    last_month = today - timedelta(days=30)
+    reservation = Reservation.objects.create(room=Room.objects.create(numero="205"))
+    ReservationGuest.objects.create(
+        reserva=reservation, nome="Pago", valor_devido=Decimal('150.00'),
+        pago=True, metodo_pagamento=ReservationGuest.MetodoPagamento.PIX,
+    )
+    ReservationGuest.objects.create(reserva=reservation, nome="Pendente", valor_devido=Decimal('90.00'))
+    ExtraIncome.objects.create(description="Evento", amount=Decimal('300.00'), received_date=last_month, method="PIX")
+    ExtraIncome.objects.create(description="Doação", amount=Decimal('20.00'), received_date=today)
+    LedgerAdjustment.objects.create(descricao="Frigobar", tipo=LedgerAdjustment.Tipo.CREDITO, valor=Decimal('15.00'))
+    LedgerAdjustment.objects.create(descricao="Correção", tipo=LedgerAdjustment.Tipo.DEBITO, valor=Decimal('5.00'))
+    Expense.objects.create(
+        description="Manutenção", amount=Decimal('30.00'), category='maintenance',
+        payment_date=last_month, payment_method='PIX',
+    )
+    call_command('rebuild_financial_rollup', stdout=open(os.devnull, 'w'))
+    expected = list(DailyFinancialRollup.objects.values('date', *ROLLUP_FIELDS))
+    DailyFinancialRollup.objects.all().delete()
+
+    backfill.reconstruir_consolidados(apps, None)
+
+    assert list(DailyFinancialRollup.objects.values('date', *ROLLUP_FIELDS)) == expected
+    assert DailyFinancialRollup.objects.get(date=last_month).extra_income_total == Decimal('300.00')
+
+
+@pytest.mark.django_db
+def test_backfill_migration_builds_room_nights_for_existing_stays():
+    """A migração de backfill grava as noites das reservas criadas antes da tabela existir."""
+    from importlib import import_module
+    from django.apps import apps
+    from apps.reports.models import RoomNight
+
+    from datetime import timedelta
+    from apps.reports.occupancy import rebuild_room_nights
+
+    backfill = import_module('apps.reports.migrations.0006_backfill_room_nights')
+    reservation = Reservation.objects.create(room=Room.objects.create(numero="204"))
+    now = timezone.now()
+    closed = Reservation.objects.create(room=Room.objects.create(numero="206"))
+    Reservation.objects.filter(pk=closed.pk).update(
+        ativa=False, data_entrada=now - timedelta(days=5), data_saida=now - timedelta(days=2),
+    )
+    rebuild_room_nights()
+    nights = RoomNight.objects.order_by('reservation_id', 'date').values_list('reservation_id', 'room_id', 'date')
+    expected = list(nights)
+    RoomNight.objects.all().delete()
+
+    backfill.reconstruir_noites(apps, None)
+
+    assert list(nights) == expected
+    assert len(expected) == 4
+    assert (reservation.id, reservation.room_id, timezone.localdate()) in expected
+
+
+@pytest.mark.django_db
+def test_aggregate_ledger_combines_all_sources():
+    """O motor do livro-caixa agrega todas as fontes em uma única consulta."""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from apps.finance.models import Expense
+    from apps.reports.ledger import aggregate_ledger
+
+    room = Room.objects.create(numero="103")
+    reservation = Reservation.objects.create(room=room)
+    ReservationGuest.objects.create(
+        reserva=reservation,
+        nome="Hóspede",
+        valor_devido=Decimal('100.00'),
+        pago=True,
+        metodo_pagamento=ReservationGuest.MetodoPagamento.DINHEIRO,
+    )
+    today = timezone.localdate()
+    ExtraIncome.objects.create(description="Evento", amount=Decimal('40.00'), received_date=today, method="PIX")
+    LedgerAdjustment.objects.create(descricao="Correção", tipo=LedgerAdjustment.Tipo.DEBITO, valor=Decimal('5.00'))
+    Expense.objects.create(
+        description="Manutenção",
+        amount=Decimal('30.00'),
+        category='maintenance',
+        payment_date=today,
+        payment_method='PIX',
+    )
+
+    with CaptureQueriesContext(connection) as queries:
+        result = aggregate_ledger(today, today)
+
+    assert len(queries) == 1
+    day = result['daily'][today]
+    assert day['revenue_total'] == Decimal('140.00')
+    assert day['expense_total'] == Decimal('35.00')
+    assert result['by_method'] == {'DINHEIRO': Decimal('100.00'), 'PIX': Decimal('40.00')}
+    assert result['by_category'] == {'maintenance': Decimal('30.00')}
+
+
+@pytest.mark.django_db
+def test_financial_report_query_count_is_fixed(client, django_assert_max_num_queries):
+    """O relatório financeiro não cresce em consultas conforme o número de lançamentos."""
+    room = Room.objects.create(numero="104")
+    reservation = Reservation.objects.create(room=room)
+    for index in range(5):
+        ReservationGuest.objects.create(
+            reserva=reservation,
+            nome=f"Hóspede {index}",
+            valor_devido=Decimal('50.00'),
+        )
+        ExtraIncome.objects.create(
+            description=f"Receita {index}",
+            amount=Decimal('10.00'),
+            received_date=timezone.localdate(),
+            method="PIX",
+        )
+
+    with django_assert_max_num_queries(3):
+        response = client.get(reverse('reports:financial_report'))
+    assert response.status_code == 200
+    assert b'Receita 4' in response.content
+
+    with django_assert_max_num_queries(3):
+        response = client.get(reverse('reports:financial_consolidated'))
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+def test_aggregate_ledger_groups_by_sao_paulo_local_date():
+    """Lançamentos feitos após 21h (horário de Brasília) pertencem ao dia local, não ao dia UTC."""
+    from datetime import datetime, timedelta, timezone as dt_timezone
+    from apps.reports.ledger import aggregate_ledger
+
+    room = Room.objects.create(numero="105")
+    reservation = Reservation.objects.create(room=room)
+    guest = ReservationGuest.objects.create(reserva=reservation, nome="Noturno", valor_devido=Decimal('70.00'))
+    utc_moment = datetime(2025, 3, 11, 1, 30, tzinfo=dt_timezone.utc)  # 10/03 22:30 em São Paulo
+    ReservationGuest.objects.filter(pk=guest.pk).update(criado_em=utc_moment)
+
+    local_day = utc_moment.date() - timedelta(days=1)
+    result = aggregate_ledger(local_day, utc_moment.date())
+
+    assert list(result['daily']) == [local_day]
+    assert result['daily'][local_day]['revenue_pending'] == Decimal('70.00')
+
+
+@pytest.mark.django_db
+def test_closed_days_are_served_from_cache_and_evicted_on_backdated_entry(django_assert_num_queries):
+    """Dias fechados vêm do cache; um lançamento retroativo invalida apenas o dia afetado."""
+    from datetime import timedelta
+    from apps.finance.models import Expense
+    from apps.reports.services import calculate_ledger_summary
+
+    today = timezone.localdate()
+    last_week = today - timedelta(days=7)
+    yesterday = today - timedelta(days=1)
+    ExtraIncome.objects.create(description="Evento", amount=Decimal('300.00'), received_date=last_week, method="PIX")
+
+    assert calculate_ledger_summary(last_week, yesterday)['total_revenue'] == pytest.approx(300.0)
+
+    with django_assert_num_queries(0):
+        calculate_ledger_summary(last_week, yesterday)
+
+    Expense.objects.create(
+        description="Nota retroativa",
+        amount=Decimal('45.00'),
+        category='supplies',
+        payment_date=last_week,
+        payment_method='PIX',
+    )
+
+    with django_assert_num_queries(1):
+        summary = calculate_ledger_summary(last_week, yesterday)
+    assert summary['total_expense'] == pytest.approx(45.0)
+
+    with django_assert_num_queries(1):
+        calculate_ledger_summary(last_week, today)
+
+
+@pytest.mark.django_db
+def test_closed_days_expire_after_reports_cache_timeout(settings, django_assert_num_queries):
+    """Sem Redis, as cópias dos outros processos não são invalidadas: os dias fechados expiram."""
+    from datetime import timedelta
+    from apps.reports.services import calculate_ledger_summary
+
+    settings.REPORTS_CACHE_TIMEOUT = 0
+    last_week = timezone.localdate() - timedelta(days=7)
+    ExtraIncome.objects.create(description="Evento", amount=Decimal('300.00'), received_date=last_week, method="PIX")
+    calculate_ledger_summary(last_week, last_week)
+
+    with django_assert_num_queries(1):
+        assert calculate_ledger_summary(last_week, last_week)['total_revenue'] == pytest.approx(300.0)
+
+
+def test_daily_series_aligns_sparse_rows_and_derives_columns():
+    """A série diária preenche dias vazios e calcula saldo, margem e acumulado."""
+    from datetime import date
+    from apps.reports.series import DailySeries
+
+    series = (
+        DailySeries(date(2025, 1, 1), date(2025, 1, 4))
+        .align('revenue', [{'date': date(2025, 1, 2), 'amount': Decimal('200')}], 'amount')
+        .align('expense', [
+            {'date': date(2025, 1, 2), 'amount': Decimal('50')},
+            {'date': date(2025, 1, 4), 'amount': Decimal('30')},
+            {'date': date(2025, 2, 1), 'amount': Decimal('999')},
+        ], 'amount')
+        .subtract('net', 'revenue', 'expense')
+        .ratio('margin', 'net', 'revenue')
+        .cumulative('balance', 'net')
+    )
+
+    rows = series.rows()
+    assert [row['date'].day for row in rows] == [1, 2, 3, 4]
+    assert [row['net'] for row in rows] == [Decimal('0.00'), Decimal('150.00'), Decimal('0.00'), Decimal('-30.00')]
+    assert rows[1]['margin'] == pytest.approx(75.0)
+    assert rows[3]['margin'] == 0.0
+    assert [row['balance'] for row in rows] == [0.0, 150.0, 150.0, 120.0]
+    assert [row['date'].day for row in series.rows(only_present=True)] == [2, 4]
+
+
+def test_daily_series_keeps_money_exact():
+    """Valores em centavos: somar muitos lançamentos fracionados não acumula erro de ponto flutuante."""
+    from datetime import date
+    from apps.reports.series import DailySeries
+
+    day = date(2025, 1, 1)
+    series = (
+        DailySeries(day, day)
+        .align('revenue', [{'date': day, 'amount': Decimal('0.10')}] * 1000, 'amount')
+        .align('revenue', [{'date': day, 'amount': 0.2}], 'amount')
+        .align('guests', [{'date': day, 'count': 3}], 'count', places=0)
+    )
+    assert series.total('revenue') == Decimal('100.20')
+    assert series.rows() == [{'date': day, 'revenue': Decimal('100.20'), 'guests': 3}]
+
+
+@pytest.mark.django_db
+def test_financial_report_csv_export_streams_entries_in_date_order(client):
+    """A exportação intercala as fontes por data e é transmitida em blocos."""
+    from datetime import timedelta
+    from apps.finance.models import Expense
+
+    today = timezone.localdate()
+    room = Room.objects.create(numero="105")
+    reservation = Reservation.objects.create(room=room)
+    ReservationGuest.objects.create(reserva=reservation, nome="Hóspede Hoje", valor_devido=Decimal('80.00'))
+    Expense.objects.create(
+        description="Limpeza; semanal",
+        amount=Decimal('25.50'),
+        category='supplies',
+        payment_date=today - timedelta(days=2),
+        payment_method='PIX',
+    )
+    ExtraIncome.objects.create(
+        description="Evento",
+        amount=Decimal('40.00'),
+        received_date=today - timedelta(days=1),
+        method="PIX",
+    )
+
+    response = client.get(reverse('reports:financial_report'), {
+        'start_date': (today - timedelta(days=5)).isoformat(),
+        'end_date': today.isoformat(),
+        'export': 'csv',
+    })
+
+    assert response.status_code == 200
+    assert response.streaming
+    assert response['Content-Disposition'].endswith('.csv"')
+    lines = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+    assert lines[0].startswith('Data;Tipo;Descrição')
+    assert [line.split(';')[1] for line in lines[1:]] == ['Despesa', 'Receita Avulsa', 'Reserva']
+    assert '"Limpeza; semanal"' in lines[1]
+    assert lines[3].endswith('Pendente;80.00')
+
+
+@pytest.mark.django_db(transaction=True)
+def test_report_job_is_enqueued_processed_by_worker_and_downloaded(client):
+    """O pedido entra na fila, o worker gera o arquivo e a interface acompanha até o download."""
+    from django.core.management import call_command
+    from apps.reports.jobs import claim_next_report
+
+    user = User.objects.create_user(username='jobs', password='password')
+    client.force_login(user)
+    today = timezone.localdate()
+    ExtraIncome.objects.create(description="Evento noturno", amount=Decimal('90.00'), received_date=today, method="PIX")
+
+    response = client.post(reverse('reports:job_request'), {
+        'kind': 'financial_report',
+        'start_date': today.isoformat(),
+        'end_date': today.isoformat(),
+        'format': 'csv',
+    })
+    assert response.status_code == 202
+    job = response.json()['report']
+    assert job['status'] == Report.Status.PENDENTE
+    assert job['download_url'] is None
+
+    call_command('run_report_worker', '--once', '--workers', '1', stdout=open(os.devnull, 'w'))
+
+    report = Report.objects.get(id=job['id'])
+    assert report.status == Report.Status.CONCLUIDO
+    assert report.attempts == 1
+    assert report.requested_by == user
+    assert claim_next_report() is None
+
+    status = client.get(job['status_url']).json()['report']
+    download = client.get(status['download_url'])
+    assert download.status_code == 200
+    assert 'Evento noturno' in b''.join(download.streaming_content).decode('utf-8-sig')
+    download.close()
+
+    report.file_path.delete(save=False)
+
+    invalid = client.post(reverse('reports:job_request'), {
+        'kind': 'financial_consolidated',
+        'start_date': today.isoformat(),
+        'end_date': today.isoformat(),
+        'format': 'xlsx',
+    })
+    assert invalid.status_code == 400
+
+
+@pytest.mark.django_db
+def test_checkins_report_pages_by_cursor_with_constant_queries(client, django_assert_num_queries):
+    """O relatório de check-ins pagina por cursor, em JSON ou fragmento HTMX, com consultas fixas."""
+    from datetime import timedelta
+
+    now = timezone.now()
+    room = Room.objects.create(numero="106")
+    for days_ago in range(5):
+        # Uma estadia em andamento por quarto: só a mais recente continua ativa.
+        reservation = Reservation.objects.create(room=room, ativa=days_ago == 0)
+        ReservationGuest.objects.create(reserva=reservation, nome=f"Hóspede {days_ago}", valor_devido=Decimal('10.00'))
+        Reservation.objects.filter(id=reservation.id).update(data_entrada=now - timedelta(days=days_ago))
+
+    url = reverse('reports:checkins')
+    with django_assert_num_queries(2):
+        first = client.get(url, {'format': 'json', 'page_size': 2}).json()
+    assert [item['hospedes'] for item in first['results']] == [["Hóspede 0"], ["Hóspede 1"]]
+
+    with django_assert_num_queries(2):
+        second = client.get(url, {'format': 'json', 'page_size': 2, 'cursor': first['next_cursor']}).json()
+    assert [item['hospedes'] for item in second['results']] == [["Hóspede 2"], ["Hóspede 3"]]
+
+    filtered = client.get(url, {
+        'format': 'json',
+        'start_date': timezone.localdate(now - timedelta(days=1)).isoformat(),
+        'end_date': timezone.localdate(now).isoformat(),
+    }).json()
+    assert len(filtered['results']) == 2
+    assert filtered['next_cursor'] is None
+
+    fragment = client.get(url, {'page_size': 4}, HTTP_HX_REQUEST='true')
+    assert b'<html' not in fragment.content
+    assert fragment.content.count(b'<tr') == 5
+    assert b'checkins-load-more' in fragment.content
+
+    assert client.get(url, {'cursor': 'invalido', 'format': 'json'}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_room_nights_track_stays_and_drive_occupancy_rate(client):
+    """Noites ocupadas são mantidas nos check-ins/check-outs, reconstruídas em lote e somadas por período."""
+    from datetime import timedelta
+    from django.core.management import call_command
+    from apps.reports.models import RoomNight
+    from apps.reports.occupancy import occupancy_summary
+
+    today = timezone.localdate()
+    now = timezone.now()
+    first_room = Room.objects.create(numero="201")
+    Room.objects.create(numero="202")
+
+    open_stay = Reservation.objects.create(room=first_room)
+    assert list(RoomNight.objects.values_list('date', flat=True)) == [today]
+
+    past_stay = Reservation.objects.create(room=first_room, ativa=False, data_saida=now - timedelta(days=7))
+    Reservation.objects.filter(id=past_stay.id).update(
+        data_entrada=now - timedelta(days=10),
+        data_saida=now - timedelta(days=7),
+        ativa=False,
+    )
+    call_command('rebuild_room_nights', stdout=open(os.devnull, 'w'))
+    assert RoomNight.objects.filter(reservation=past_stay).count() == 3
+
+    summary = occupancy_summary(today - timedelta(days=10), today - timedelta(days=1))
+    assert summary['room_nights_sold'] == 3
+    assert summary['room_nights_available'] == 20
+    assert summary['occupancy_rate'] == 15.0
+    assert summary['daily'][0]['rate'] == 50.0
+
+    Reservation.objects.filter(id=open_stay.id).update(data_entrada=now - timedelta(days=2))
+    open_stay.refresh_from_db()
+    open_stay.encerrar()
+    assert RoomNight.objects.filter(reservation=open_stay).count() == 2
+
+    response = client.get(reverse('reports:occupancy'))
+    assert response.status_code == 200
+    assert response.context['room_nights_sold'] == 5
+
+    # Estadia em aberto há dias: a leitura conta as noites ainda não gravadas sem escrever nada.
+    long_stay = Reservation.objects.create(room=Room.objects.create(numero="203"))
+    Reservation.objects.filter(id=long_stay.id).update(data_entrada=now - timedelta(days=2))
+    RoomNight.objects.filter(reservation=long_stay).delete()
+    summary = occupancy_summary(today - timedelta(days=2), today)
+    assert [row['nights'] for row in summary['daily']] == [2.0, 2.0, 1.0]
+    assert not RoomNight.objects.filter(reservation=long_stay).exists()
+
+    call_command('rebuild_room_nights', '--open-stays', stdout=open(os.devnull, 'w'))
+    assert RoomNight.objects.filter(reservation=long_stay).count() == 3
+    assert occupancy_summary(today - timedelta(days=2), today)['daily'] == summary['daily']
@@ -11,4 +11,7 @@ urlpatterns = [
     path('cash-flow/', views.cash_flow_report, name='cash_flow'),
     path('financial/', views.financial_report, name='financial_report'),
     path('financial-consolidated/', views.financial_consolidated_report, name='financial_consolidated'),
+    path('jobs/', views.request_report_job, name='job_request'),
+    path('jobs/<int:report_id>/', views.report_job_status, name='job_status'),
+    path('jobs/<int:report_id>/download/', views.download_report_job, name='job_download'),
 ]
\ No newline at end of file
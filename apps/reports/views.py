@@ -1,14 +1,254 @@
 from datetime import date, datetime, timedelta
 from decimal import Decimal
 
-from django.db.models import Count, Sum
-from django.http import HttpRequest, HttpResponse
-from django.shortcuts import render
-
-from apps.finance.models import Expense, ExtraIncome, LedgerAdjustment
+from django.contrib.auth.decorators import login_required
+from django.db.models import Count, Prefetch
+from django.http import FileResponse, Http404, HttpRequest, HttpResponse, HttpResponseBadRequest, JsonResponse
+from django.shortcuts import get_object_or_404, render
+from django.urls import reverse
+from django.utils import timezone
+from django.views.decorators.http import require_POST
+
+from apps.finance.models import Expense
 from apps.reservations.models import Reservation, ReservationGuest, Room
+from hotel_hms.pagination import InvalidCursor, keyset_paginate, parse_page_size
+
+from .exports import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, export_response
+from .ledger import (
+    KIND_CREDIT, KIND_DEBIT, KIND_EXPENSE, KIND_EXTRA_INCOME, KIND_GUEST,
+    iter_ledger_entries, ledger_entries, local_day_bounds,
+)
+from .jobs import REPORT_KINDS, enqueue_report
+from .models import Report
+from .occupancy import occupancy_summary
+from .series import DailySeries
+from .services import calculate_cash_flow_data, calculate_ledger_summary, calculate_revenue_data
+
+REVENUE_ENTRY_TYPES = {
+    KIND_GUEST: 'Reserva',
+    KIND_EXTRA_INCOME: 'Receita Avulsa',
+    KIND_CREDIT: 'Ajuste Financeiro',
+}
+EXPENSE_CATEGORY_NAMES = dict(Expense.CATEGORY_CHOICES)
+EXPORT_ENTRY_TYPES = {
+    **REVENUE_ENTRY_TYPES,
+    KIND_CREDIT: 'Ajuste Financeiro (crédito)',
+    KIND_DEBIT: 'Ajuste Financeiro (débito)',
+    KIND_EXPENSE: 'Despesa',
+}
+FINANCIAL_EXPORT_HEADER = ['Data', 'Tipo', 'Descrição', 'Quarto', 'Categoria', 'Método', 'Situação', 'Valor']
+
+
+def _format_revenue_entry(entry):
+    """Converte um lançamento de receita do livro-caixa para o formato dos templates."""
+    return {
+        'id': entry['id'],
+        'date': entry['date'],
+        'amount': float(entry['amount']),
+        'paid': entry['paid'],
+        'guest_name': entry['description'],
+        'room_number': entry['room_number'] or 'N/A',
+        'description': entry['description'],
+        'method': entry['method'],
+        'type': REVENUE_ENTRY_TYPES[entry['kind']],
+    }
+
+
+def _format_expense_entry(entry):
+    """Converte um lançamento de despesa do livro-caixa para o formato dos templates."""
+    return {
+        'id': entry['id'],
+        'payment_date': entry['date'],
+        'description': entry['description'],
+        'category': entry['category'],
+        'category_name': EXPENSE_CATEGORY_NAMES.get(entry['category'], entry['category']),
+        'amount': float(entry['amount']),
+        'payment_method': entry['method'],
+    }
+
+
+def _financial_export_rows(entries):
+    """Converte lançamentos do livro-caixa em linhas da exportação, sob demanda."""
+    for entry in entries:
+        yield [
+            entry['date'],
+            EXPORT_ENTRY_TYPES[entry['kind']],
+            entry['description'],
+            entry['room_number'],
+            EXPENSE_CATEGORY_NAMES.get(entry['category'], entry['category']),
+            entry['method'],
+            'Pago' if entry['paid'] else 'Pendente',
+            entry['amount'],
+        ]
+
+
+def financial_report_context(start_date: date, end_date: date) -> dict:
+    """
+    Monta o contexto do relatório financeiro detalhado.
+
+    Compartilhado pela view e pela geração em segundo plano (``apps.reports.jobs``).
+
+    Args:
+        start_date (date): Data inicial do período.
+        end_date (date): Data final do período.
+
+    Returns:
+        dict: Contexto do template ``reports/financial_report.html``.
+    """
+    summary = calculate_ledger_summary(start_date, end_date)
+    revenue_data = summary['revenue_data']
+    expense_data = summary['expense_data']
+    total_revenue = summary['total_revenue']
+    total_paid = summary['total_paid']
+    total_pending = summary['total_pending']
+    total_expense = summary['total_expense']
+    category_expenses = summary['category_totals']
+
+    net_profit = total_revenue - total_expense
+
+    profit_margin = (net_profit / total_revenue * 100) if total_revenue > 0 else 0
+    payment_percentage = (total_paid / total_revenue * 100) if total_revenue > 0 else 0
+    pending_percentage = (total_pending / total_revenue * 100) if total_revenue > 0 else 0
+
+    daily_data = (
+        DailySeries(start_date, end_date)
+        .align('revenue', revenue_data, 'total_amount')
+        .align('expense', expense_data, 'total_amount')
+        .rows()
+    )
+
+    # Lançamentos detalhados de todas as fontes em uma única consulta
+    entries = ledger_entries(
+        start_date,
+        end_date,
+        kinds=[KIND_GUEST, KIND_EXTRA_INCOME, KIND_CREDIT, KIND_EXPENSE],
+    )
+
+    formatted_revenue_entries = []
+    expense_entries = []
+    for entry in entries:
+        if entry['kind'] == KIND_EXPENSE:
+            expense_entries.append(_format_expense_entry(entry))
+        else:
+            formatted_revenue_entries.append(_format_revenue_entry(entry))
+    
+    return {
+        'start_date': start_date,
+        'end_date': end_date,
+        'total_revenue': float(total_revenue),  # Converter para float para o template
+        'total_expense': float(total_expense),
+        'total_paid': float(total_paid),
+        'total_pending': float(total_pending),
+        'net_profit': float(net_profit),
+        'profit_margin': profit_margin,
+        'payment_percentage': payment_percentage,
+        'pending_percentage': pending_percentage,
+        'daily_data': daily_data,
+        'revenue_entries': formatted_revenue_entries,
+        'expense_entries': expense_entries,
+        'category_expenses': category_expenses
+    }
+
+
+def financial_consolidated_context(start_date: date, end_date: date) -> dict:
+    """
+    Monta o contexto do relatório financeiro consolidado.
+
+    Args:
+        start_date (date): Data inicial do período.
+        end_date (date): Data final do período.
+
+    Returns:
+        dict: Contexto do template ``reports/financial_consolidated.html``.
+    """
+    summary = calculate_ledger_summary(start_date, end_date)
+    revenue_data = summary['revenue_data']
+    expense_data = summary['expense_data']
+    total_revenue = summary['total_revenue']
+    revenue_received = summary['total_paid']
+    revenue_pending = summary['total_pending']
+    total_expenses = summary['total_expense']
+    category_expenses = summary['category_totals']
+    extra_income_total = summary['extra_income_total']
+    
+    # Garantir que os valores sejam do mesmo tipo antes de operações
+    if isinstance(revenue_received, Decimal):
+        if not isinstance(total_expenses, Decimal):
+            total_expenses = Decimal(str(total_expenses))
+    else:
+        revenue_received = float(revenue_received)
+        total_expenses = float(total_expenses)
+    
+    # Calcular lucro líquido
+    net_profit = revenue_received - total_expenses  # Usamos apenas a receita efetivamente recebida
+    
+    # Converter para float para cálculos percentuais
+    total_revenue_float = float(total_revenue)
+    revenue_received_float = float(revenue_received)
+    revenue_pending_float = float(revenue_pending)
+    total_expenses_float = float(total_expenses)
+    net_profit_float = float(net_profit)
+    
+    # Calcular percentuais
+    percentage_received = (revenue_received_float / total_revenue_float * 100) if total_revenue_float > 0 else 0
+    percentage_pending = (revenue_pending_float / total_revenue_float * 100) if total_revenue_float > 0 else 0
+    profit_margin = (net_profit_float / revenue_received_float * 100) if revenue_received_float > 0 else 0
+    expense_to_revenue_ratio = (total_expenses_float / revenue_received_float * 100) if revenue_received_float > 0 else 0
+    
+    # Construir dataset completo com todos os dias no período (lucro usa apenas a receita recebida)
+    daily_data = (
+        DailySeries(start_date, end_date)
+        .align('revenue', revenue_data, 'total_amount')
+        .align('revenue_paid', revenue_data, 'paid_amount')
+        .align('revenue_pending', revenue_data, 'pending_amount')
+        .align('expense', expense_data, 'total_amount')
+        .subtract('profit', 'revenue_paid', 'expense')
+        .ratio('margin', 'profit', 'revenue_paid')
+        .rows()
+    )
+
+    ticket_count = summary['guest_charge_count']
+    avg_invoice_value = total_revenue_float / ticket_count if ticket_count > 0 else 0
+
+    # Últimos lançamentos de cada fonte, obtidos em uma única consulta
+    recent_entries = ledger_entries(
+        start_date,
+        end_date,
+        kinds=[KIND_GUEST, KIND_EXTRA_INCOME, KIND_EXPENSE],
+        per_kind_limit=10,
+    )
+    recent_revenues = []
+    recent_expenses = []
+    formatted_extra_incomes = []
+    for entry in recent_entries:
+        if entry['kind'] == KIND_GUEST:
+            recent_revenues.append(_format_revenue_entry(entry))
+        elif entry['kind'] == KIND_EXTRA_INCOME:
+            formatted_extra_incomes.append(_format_revenue_entry(entry))
+        else:
+            recent_expenses.append(_format_expense_entry(entry))
+    
+    return {
+        'start_date': start_date,
+        'end_date': end_date,
+        'total_revenue': float(total_revenue),
+        'revenue_received': float(revenue_received),
+        'revenue_pending': float(revenue_pending),
+        'total_expenses': float(total_expenses),
+        'net_profit': float(net_profit),
+        'profit_margin': profit_margin,
+        'percentage_received': percentage_received,
+        'percentage_pending': percentage_pending,
+        'expense_to_revenue_ratio': expense_to_revenue_ratio,
+        'avg_invoice_value': avg_invoice_value,
+        'daily_data': daily_data,
+        'recent_revenues': recent_revenues,
+        'recent_expenses': recent_expenses,
+        'category_expenses': category_expenses,
+        'extra_income_total': float(extra_income_total),
+        'recent_extra_incomes': formatted_extra_incomes
+    }
 
-from .services import calculate_cash_flow_data, calculate_expense_data, calculate_revenue_data
 
 def report_list(request: HttpRequest) -> HttpResponse:
     """
@@ -22,6 +262,8 @@ def report_list(request: HttpRequest) -> HttpResponse:
     """
     return render(request, 'reports/list.html', {
         'title': 'Reports',
+        'report_jobs': Report.objects.exclude(kind='').order_by('-generated_at')[:10],
+        'job_kinds': REPORT_KINDS,
         'reports': [
             {'name': 'Occupancy Report', 'url': 'reports:occupancy'},
             {'name': 'Revenue Report', 'url': 'reports:revenue'},
@@ -33,46 +275,52 @@ def report_list(request: HttpRequest) -> HttpResponse:
 
 def occupancy_report(request: HttpRequest) -> HttpResponse:
     """
-    Gera o relatório de ocupação do hotel.
+    Gera o relatório de ocupação do hotel para um período.
+
+    A taxa de ocupação e as diárias vendidas vêm do histórico de noites
+    (``RoomNight``), não do status atual dos quartos.
 
     Args:
-        request (HttpRequest): Requisição HTTP.
+        request (HttpRequest): Requisição HTTP com ``start_date``/``end_date`` opcionais.
 
     Returns:
         HttpResponse: Página com estatísticas de ocupação.
     """
-    # Cálculos básicos de ocupação
-    total_rooms = Room.objects.count()
-    occupied_rooms = Room.objects.filter(status=Room.Status.OCUPADO).count()
-    occupancy_rate = (occupied_rooms / total_rooms * 100) if total_rooms > 0 else 0
+    today = timezone.localdate()
+    start_date = today - timedelta(days=29)
+    end_date = today
+    if all(param in request.GET for param in ['start_date', 'end_date']):
+        try:
+            start_date = datetime.strptime(request.GET['start_date'], '%Y-%m-%d').date()
+            end_date = datetime.strptime(request.GET['end_date'], '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            pass
 
+    summary = occupancy_summary(start_date, end_date)
+    total_rooms = summary['total_rooms']
+
+    counts_by_status = dict(Room.objects.values_list('status').annotate(total=Count('id')).order_by())
     status_stats = []
     for value, label in Room.Status.choices:
-        count = Room.objects.filter(status=value).count()
+        count = counts_by_status.get(value, 0)
         status_stats.append({
             'status': label,
             'total': count,
             'percentage': round((count / total_rooms * 100), 2) if total_rooms else 0,
         })
+    occupied_rooms = counts_by_status.get(Room.Status.OCUPADO, 0)
 
-    # Tendência de ocupação dos últimos 7 dias
-    end_date = date.today()
-    start_date = end_date - timedelta(days=6)
-    occupancy_trend = []
-    
-    for single_date in (start_date + timedelta(n) for n in range(7)):
-        checkins = Reservation.objects.filter(data_entrada__date=single_date).count()
-        occupancy_trend.append({
-            'date': single_date,
-            'checkins': checkins
-        })
-    
     context = {
+        'start_date': start_date,
+        'end_date': end_date,
         'total_rooms': total_rooms,
         'occupied_rooms': occupied_rooms,
-        'occupancy_rate': round(occupancy_rate, 2),
+        'current_occupancy_rate': round(occupied_rooms / total_rooms * 100, 2) if total_rooms else 0,
+        'occupancy_rate': summary['occupancy_rate'],
+        'room_nights_sold': summary['room_nights_sold'],
+        'room_nights_available': summary['room_nights_available'],
         'status_stats': status_stats,
-        'occupancy_trend': occupancy_trend
+        'occupancy_trend': summary['daily'],
     }
     return render(request, 'reports/occupancy.html', context)
 
@@ -106,21 +354,83 @@ def revenue_report(request: HttpRequest) -> HttpResponse:
     }
     return render(request, 'reports/revenue.html', context)
 
+def _parse_optional_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _checkin_payload(reservation: Reservation) -> dict:
+    return {
+        'id': reservation.id,
+        'room_number': reservation.room.numero,
+        'data_entrada': reservation.data_entrada.isoformat(),
+        'data_saida': reservation.data_saida.isoformat() if reservation.data_saida else None,
+        'ativa': reservation.ativa,
+        'hospedes': [guest.nome for guest in reservation.hospedes.all()],
+    }
+
+
 def checkins_report(request: HttpRequest) -> HttpResponse:
     """
-    Gera o relatório de check-ins realizados.
+    Gera o relatório de check-ins realizados, paginado por cursor.
+
+    Aceita ``start_date``/``end_date`` (AAAA-MM-DD), ``cursor`` e ``page_size``.
+    Requisições HTMX recebem apenas as linhas da próxima página e ``format=json``
+    (ou ``Accept: application/json``) devolve a mesma página em JSON.
 
     Args:
         request (HttpRequest): Requisição HTTP.
 
     Returns:
-        HttpResponse: Página com lista de check-ins.
+        HttpResponse: Página, fragmento HTMX ou JSON com os check-ins.
     """
-    checkins = Reservation.objects.select_related('room').prefetch_related('hospedes').order_by('-data_entrada')
+    start_date = _parse_optional_date(request.GET.get('start_date'))
+    end_date = _parse_optional_date(request.GET.get('end_date'))
+    wants_json = request.GET.get('format') == 'json' or 'application/json' in request.headers.get('Accept', '')
+
+    checkins = Reservation.objects.select_related('room').prefetch_related(
+        Prefetch('hospedes', queryset=ReservationGuest.objects.only('id', 'reserva', 'nome').order_by('criado_em', 'id'))
+    )
+    if start_date:
+        checkins = checkins.filter(data_entrada__gte=local_day_bounds(start_date, start_date)[0])
+    if end_date:
+        checkins = checkins.filter(data_entrada__lt=local_day_bounds(end_date, end_date)[1])
+
+    try:
+        page = keyset_paginate(
+            checkins,
+            'data_entrada',
+            cursor=request.GET.get('cursor'),
+            page_size=parse_page_size(request.GET.get('page_size')),
+        )
+    except InvalidCursor as exc:
+        if wants_json:
+            return JsonResponse({'success': False, 'message': str(exc)}, status=400)
+        return HttpResponseBadRequest(str(exc))
+
+    next_url = None
+    if page.has_next:
+        query = request.GET.copy()
+        query['cursor'] = page.next_cursor
+        next_url = f'{request.path}?{query.urlencode()}'
+
+    if wants_json:
+        return JsonResponse({
+            'results': [_checkin_payload(reservation) for reservation in page.items],
+            'next_cursor': page.next_cursor,
+            'next': next_url,
+        })
 
     context = {
-        'checkins': checkins
+        'checkins': page.items,
+        'next_url': next_url,
+        'start_date': start_date,
+        'end_date': end_date,
     }
+    if request.headers.get('HX-Request'):
+        return render(request, 'reports/partials/checkin_rows.html', context)
     return render(request, 'reports/checkins.html', context)
 
 def cash_flow_report(request: HttpRequest) -> HttpResponse:
@@ -198,105 +508,18 @@ def financial_report(request: HttpRequest) -> HttpResponse:
         except (ValueError, TypeError):
             pass
 
-    revenue_data, total_revenue, total_paid, total_pending = calculate_revenue_data(start_date, end_date)
-    extra_income_entries = ExtraIncome.objects.filter(
-        received_date__gte=start_date,
-        received_date__lte=end_date
-    ).order_by('-received_date')
-    expense_data, total_expense, category_expenses = calculate_expense_data(start_date, end_date)
-
-    total_revenue = float(total_revenue)
-    total_expense = float(total_expense)
-    net_profit = total_revenue - total_expense
-
-    profit_margin = (net_profit / total_revenue * 100) if total_revenue > 0 else 0
-    payment_percentage = (total_paid / total_revenue * 100) if total_revenue > 0 else 0
-    pending_percentage = (total_pending / total_revenue * 100) if total_revenue > 0 else 0
-
-    daily_data = []
-    current_date = start_date
-    while current_date <= end_date:
-        date_str = current_date.strftime('%Y-%m-%d')
-        day_revenue = next((item for item in revenue_data if item['date'].strftime('%Y-%m-%d') == date_str), None)
-        day_expense = next((item for item in expense_data if item['date'].strftime('%Y-%m-%d') == date_str), None)
-
-        daily_data.append({
-            'date': current_date,
-            'revenue': float(day_revenue['total_amount']) if day_revenue else 0,
-            'expense': float(day_expense['total_amount']) if day_expense else 0
-        })
-        current_date += timedelta(days=1)
-
-    guest_entries = ReservationGuest.objects.filter(
-        criado_em__date__gte=start_date,
-        criado_em__date__lte=end_date
-    ).select_related('reserva__room').order_by('-criado_em')
-
-    formatted_revenue_entries = []
-    for guest in guest_entries:
-        formatted_revenue_entries.append({
-            'id': guest.id,
-            'date': guest.criado_em.date(),
-            'amount': float(guest.valor_devido),
-            'paid': guest.pago,
-            'guest_name': guest.nome,
-            'room_number': guest.reserva.room.numero if guest.reserva.room else 'N/A',
-            'type': 'Reserva',
-        })
-
-    for income in extra_income_entries:
-        formatted_revenue_entries.append({
-            'id': income.id,
-            'date': income.received_date,
-            'amount': float(income.amount),
-            'paid': True,
-            'description': income.description,
-            'method': income.method,
-            'type': 'Receita Avulsa'
-        })
-
-    credit_adjustments = LedgerAdjustment.objects.filter(
-        tipo=LedgerAdjustment.Tipo.CREDITO,
-        criado_em__date__gte=start_date,
-        criado_em__date__lte=end_date,
-    ).order_by('-criado_em')
-
-    for ajuste in credit_adjustments:
-        formatted_revenue_entries.append({
-            'id': ajuste.id,
-            'date': ajuste.criado_em.date(),
-            'amount': float(ajuste.valor),
-            'paid': True,
-            'description': ajuste.descricao,
-            'method': ajuste.metodo,
-            'type': 'Ajuste Financeiro'
-        })
-
-    formatted_revenue_entries.sort(key=lambda entry: entry['date'], reverse=True)
-
-    expense_entries = Expense.objects.filter(
-        payment_date__gte=start_date,
-        payment_date__lte=end_date
-    ).order_by('-payment_date')
-    
-    # Preparar o contexto
-    context = {
-        'start_date': start_date,
-        'end_date': end_date,
-        'total_revenue': float(total_revenue),  # Converter para float para o template
-        'total_expense': float(total_expense),
-        'total_paid': float(total_paid),
-        'total_pending': float(total_pending),
-        'net_profit': float(net_profit),
-        'profit_margin': profit_margin,
-        'payment_percentage': payment_percentage,
-        'pending_percentage': pending_percentage,
-        'daily_data': daily_data,
-        'revenue_entries': formatted_revenue_entries,
-        'expense_entries': expense_entries,
-        'category_expenses': category_expenses
-    }
-    
+    # Exportação: lançamentos lidos em blocos e transmitidos em ordem cronológica
+    export_format = request.GET.get('export')
+    if export_format in EXPORT_FORMATS:
+        entries = iter_ledger_entries(start_date, end_date, chunk_size=EXPORT_CHUNK_SIZE)
+        return export_response(
+            export_format,
+            f'relatorio_financeiro_{start_date:%Y%m%d}_{end_date:%Y%m%d}',
+            FINANCIAL_EXPORT_HEADER,
+            _financial_export_rows(entries),
+        )
+
+    context = financial_report_context(start_date, end_date)
     return render(request, 'reports/financial_report.html', context)
 
 def financial_consolidated_report(request: HttpRequest) -> HttpResponse:
@@ -323,150 +546,78 @@ def financial_consolidated_report(request: HttpRequest) -> HttpResponse:
             start_date = datetime.strptime(request.GET['start_date'], '%Y-%m-%d').date()
             end_date = datetime.strptime(request.GET['end_date'], '%Y-%m-%d').date()
         except (ValueError, TypeError):
-            pass    # Obter dados de receita usando o serviço existente (já inclui receitas avulsas)
-    revenue_data, total_revenue, revenue_received, revenue_pending = calculate_revenue_data(start_date, end_date)
-    
-    # Obter receitas avulsas para o período (para exibição na tabela)
-    extra_income_entries = ExtraIncome.objects.filter(
-        received_date__gte=start_date,
-        received_date__lte=end_date
-    )
-    extra_income_total = extra_income_entries.aggregate(total=Sum('amount'))['total'] or 0
-    
-    # Obter dados de despesa usando o serviço existente
-    expense_data, total_expenses, category_expenses = calculate_expense_data(start_date, end_date)
-    
-    # Garantir que os valores sejam do mesmo tipo antes de operações
-    if isinstance(revenue_received, Decimal):
-        if not isinstance(total_expenses, Decimal):
-            total_expenses = Decimal(str(total_expenses))
-    else:
-        revenue_received = float(revenue_received)
-        total_expenses = float(total_expenses)
-    
-    # Calcular lucro líquido
-    net_profit = revenue_received - total_expenses  # Usamos apenas a receita efetivamente recebida
-    
-    # Converter para float para cálculos percentuais
-    total_revenue_float = float(total_revenue)
-    revenue_received_float = float(revenue_received)
-    revenue_pending_float = float(revenue_pending)
-    total_expenses_float = float(total_expenses)
-    net_profit_float = float(net_profit)
-    
-    # Calcular percentuais
-    percentage_received = (revenue_received_float / total_revenue_float * 100) if total_revenue_float > 0 else 0
-    percentage_pending = (revenue_pending_float / total_revenue_float * 100) if total_revenue_float > 0 else 0
-    profit_margin = (net_profit_float / revenue_received_float * 100) if revenue_received_float > 0 else 0
-    expense_to_revenue_ratio = (total_expenses_float / revenue_received_float * 100) if revenue_received_float > 0 else 0
-    
-    # Construir dados diários para análise detalhada e gráficos
-    daily_data = []
-    date_range = (end_date - start_date).days + 1
-    
-    # Mapear dados de receita por data
-    revenue_by_date = {item['date'].strftime('%Y-%m-%d'): {
-        'total': float(item['total_amount'] or 0),
-        'paid': float(item['paid_amount'] or 0),
-        'pending': float(item['pending_amount'] or 0)
-    } for item in revenue_data}
-    
-    # Mapear dados de despesa por data
-    expense_by_date = {item['date'].strftime('%Y-%m-%d'): float(item['total_amount'] or 0) 
-                      for item in expense_data}
-    
-    # Construir dataset completo com todos os dias no período
-    for i in range(date_range):
-        current_date = start_date + timedelta(days=i)
-        date_str = current_date.strftime('%Y-%m-%d')
-        
-        # Obter dados de receita para este dia (ou zeros se não houver)
-        day_revenue = revenue_by_date.get(date_str, {'total': 0, 'paid': 0, 'pending': 0})
-        
-        # Obter dados de despesa para este dia (ou zero se não houver)
-        day_expense = expense_by_date.get(date_str, 0)
-        
-        # Calcular lucro do dia (usando apenas receita recebida)
-        day_profit = day_revenue['paid'] - day_expense
-        
-        # Calcular margem de lucro do dia
-        day_margin = (day_profit / day_revenue['paid'] * 100) if day_revenue['paid'] > 0 else 0
-        
-        daily_data.append({
-            'date': current_date,
-            'revenue': day_revenue['total'],
-            'revenue_paid': day_revenue['paid'],
-            'revenue_pending': day_revenue['pending'],
-            'expense': day_expense,
-            'profit': day_profit,
-            'margin': day_margin
-        })
-    
-    # Ordenar dados por data
-    daily_data.sort(key=lambda x: x['date'])
-
-    guest_charges = ReservationGuest.objects.filter(
-        criado_em__date__gte=start_date,
-        criado_em__date__lte=end_date
-    )
+            pass
 
-    ticket_count = guest_charges.count()
-    avg_invoice_value = total_revenue_float / ticket_count if ticket_count > 0 else 0
+    context = financial_consolidated_context(start_date, end_date)
 
-    recent_guest_entries = guest_charges.order_by('-criado_em')[:10]
-    recent_revenues = [{
-        'id': guest.id,
-        'date': guest.criado_em.date(),
-        'guest_name': guest.nome,
-        'amount': float(guest.valor_devido),
-        'paid': guest.pago,
-    } for guest in recent_guest_entries]
-    
-    # Obter despesas recentes para exibição na tabela
-    recent_expenses = Expense.objects.filter(
-        payment_date__gte=start_date,
-        payment_date__lte=end_date
-    ).order_by('-payment_date')[:10]  # Limitar a 10 despesas mais recentes
-      # Obter receitas avulsas recentes
-    recent_extra_incomes = ExtraIncome.objects.filter(
-        received_date__gte=start_date,
-        received_date__lte=end_date
-    ).order_by('-received_date')[:10]
-    
-    # Formatar receitas avulsas para exibição
-    formatted_extra_incomes = []
-    for income in recent_extra_incomes:
-        formatted_extra_incomes.append({
-            'id': income.id,
-            'date': income.received_date,
-            'description': income.description,
-            'amount': float(income.amount),
-            'method': income.method
-        })
-    
-    # Preparar o contexto para o template
-    context = {
-        'start_date': start_date,
-        'end_date': end_date,
-        'total_revenue': float(total_revenue),
-        'revenue_received': float(revenue_received),
-        'revenue_pending': float(revenue_pending),
-        'total_expenses': float(total_expenses),
-        'net_profit': float(net_profit),
-        'profit_margin': profit_margin,
-        'percentage_received': percentage_received,
-        'percentage_pending': percentage_pending,
-        'expense_to_revenue_ratio': expense_to_revenue_ratio,
-        'avg_invoice_value': avg_invoice_value,
-        'daily_data': daily_data,
-        'recent_revenues': recent_revenues,
-        'recent_expenses': recent_expenses,
-        'category_expenses': category_expenses,
-        'extra_income_total': float(extra_income_total),
-        'recent_extra_incomes': formatted_extra_incomes
-    }
-    
     if request.headers.get('HX-Request'):
         return render(request, 'reports/partials/financial_modal.html', context)
         
     return render(request, 'reports/financial_consolidated.html', context)
+
+
+def _report_job_payload(report: Report) -> dict:
+    payload = {
+        'id': report.id,
+        'name': report.name,
+        'status': report.status,
+        'status_display': report.get_status_display(),
+        'format': report.params.get('format'),
+        'requested_at': report.generated_at.isoformat(),
+        'finished_at': report.finished_at.isoformat() if report.finished_at else None,
+        'status_url': reverse('reports:job_status', args=[report.id]),
+        'download_url': None,
+        'error': None,
+    }
+    if report.status == Report.Status.CONCLUIDO and report.file_path:
+        payload['download_url'] = reverse('reports:job_download', args=[report.id])
+    if report.status == Report.Status.ERRO:
+        payload['error'] = 'Falha ao gerar o relatório. Tente novamente.'
+    return payload
+
+
+@login_required
+@require_POST
+def request_report_job(request: HttpRequest) -> JsonResponse:
+    """
+    Enfileira a geração de um relatório para o worker (``run_report_worker``).
+
+    Args:
+        request (HttpRequest): POST com ``kind``, ``start_date``, ``end_date`` e ``format``.
+
+    Returns:
+        JsonResponse: Pedido criado (status 202) com a URL de acompanhamento.
+    """
+    try:
+        start_date = datetime.strptime(request.POST.get('start_date', ''), '%Y-%m-%d').date()
+        end_date = datetime.strptime(request.POST.get('end_date', ''), '%Y-%m-%d').date()
+    except ValueError:
+        return JsonResponse({'success': False, 'message': 'Informe datas no formato AAAA-MM-DD.'}, status=400)
+
+    try:
+        report = enqueue_report(
+            request.POST.get('kind', ''),
+            start_date,
+            end_date,
+            export_format=request.POST.get('format') or 'html',
+            user=request.user,
+        )
+    except ValueError as exc:
+        return JsonResponse({'success': False, 'message': str(exc)}, status=400)
+    return JsonResponse({'success': True, 'report': _report_job_payload(report)}, status=202)
+
+
+@login_required
+def report_job_status(request: HttpRequest, report_id: int) -> JsonResponse:
+    """Retorna o andamento de um pedido de relatório, consultado periodicamente pela interface."""
+    report = get_object_or_404(Report, id=report_id)
+    return JsonResponse({'success': True, 'report': _report_job_payload(report)})
+
+
+@login_required
+def download_report_job(request: HttpRequest, report_id: int) -> FileResponse:
+    """Entrega o arquivo de um relatório concluído."""
+    report = get_object_or_404(Report, id=report_id, status=Report.Status.CONCLUIDO)
+    if not report.file_path:
+        raise Http404('Relatório sem arquivo.')
+    return FileResponse(report.file_path.open('rb'), as_attachment=True, filename=report.file_path.name.rsplit('/', 1)[-1])
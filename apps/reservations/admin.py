@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Reservation, ReservationGuest, Room
+from .models import FOLIO_FIELDS, PaymentEvent, Reservation, ReservationGuest, Room
 
 class ReservationGuestInline(admin.TabularInline):
     model = ReservationGuest
@@ -8,8 +8,10 @@ class ReservationGuestInline(admin.TabularInline):
 @admin.register(Reservation)
 class ReservationAdmin(admin.ModelAdmin):
     list_display = ('room', 'data_entrada', 'data_saida', 'ativa')
+    list_select_related = ('room',)
     list_filter = ('ativa', 'data_entrada', 'data_saida')
     search_fields = ('room__numero',)
+    readonly_fields = FOLIO_FIELDS
     inlines = [ReservationGuestInline]
 
 @admin.register(ReservationGuest)
@@ -17,6 +19,12 @@ class ReservationGuestAdmin(admin.ModelAdmin):
     list_display = ('nome', 'reserva', 'valor_devido', 'pago', 'metodo_pagamento')
     list_filter = ('pago', 'metodo_pagamento')
     search_fields = ('nome', 'reserva__room__numero')
+    list_select_related = ('reserva__room',)
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'reserva':
+            kwargs['queryset'] = Reservation.objects.select_related('room')
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
 
 @admin.register(Room)
@@ -24,3 +32,20 @@ class RoomAdmin(admin.ModelAdmin):
     list_display = ('numero', 'status')
     list_filter = ('status',)
     search_fields = ('numero',)
+
+
+@admin.register(PaymentEvent)
+class PaymentEventAdmin(admin.ModelAdmin):
+    list_display = ('pago_em', 'tipo', 'metodo', 'valor', 'hospede', 'reserva')
+    list_filter = ('tipo', 'metodo', 'pago_em')
+    search_fields = ('hospede__nome', 'reserva__room__numero')
+    list_select_related = ('hospede', 'reserva__room')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
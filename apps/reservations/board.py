@@ -0,0 +1,107 @@
+"""
+Quadro de quartos: leitura compacta e em cache do estado de cada quarto.
+
+Para cada quarto o quadro guarda número, status, reserva ativa, nome do
+primeiro hóspede, quantidade de hóspedes e valor pendente. Ele é montado em
+uma única consulta (a reserva ativa entra por ``FilteredRelation`` e os totais
+vêm das colunas mantidas em ``Reservation``) e fica no cache até que um
+``Room``, ``Reservation`` ou ``ReservationGuest`` seja gravado ou excluído
+(ver ``signals``), quando é descartado após o commit.
+
+O descarte só alcança os outros workers com um cache compartilhado: sem
+``REDIS_URL``, ``ROOM_BOARD_TIMEOUT`` é 0 e o quadro é montado a cada leitura.
+"""
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Iterable, List, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import FilteredRelation, OuterRef, Q, Subquery
+
+from .models import ReservationGuest, Room
+
+CACHE_ALIAS = 'default'
+BOARD_KEY = 'quadro:quartos'
+
+
+@dataclass(frozen=True)
+class BoardRoom:
+    id: int
+    numero: str
+    status: str
+    reservation_id: Optional[int]
+    guest_name: str
+    guest_count: int
+    pending_count: int
+    pending_total: Decimal
+
+    @property
+    def occupied(self) -> bool:
+        return self.reservation_id is not None
+
+    @property
+    def extra_guests(self) -> int:
+        return max(self.guest_count - 1, 0)
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def build_board(room_ids: Optional[Iterable[int]] = None) -> List[BoardRoom]:
+    """Monta o quadro direto do banco, em uma consulta (só dos quartos de ``room_ids``, se informados)."""
+    first_guest = ReservationGuest.objects.filter(reserva=OuterRef('ativa__id')).order_by('id').values('nome')[:1]
+    rooms = Room.objects.all() if room_ids is None else Room.objects.filter(id__in=list(room_ids))
+    rows = (
+        rooms.annotate(
+            ativa=FilteredRelation('reservas', condition=Q(reservas__ativa=True, reservas__data_saida__isnull=True)),
+            primeiro_hospede=Subquery(first_guest),
+        )
+        .order_by('numero', '-ativa__data_entrada')
+        .values_list(
+            'id', 'numero', 'status', 'ativa__id', 'primeiro_hospede',
+            'ativa__qtd_hospedes', 'ativa__qtd_pendentes', 'ativa__total_pendente',
+        )
+    )
+    board, seen = [], set()
+    for room_id, numero, status, reservation_id, guest_name, guests, pending, pending_total in rows:
+        if room_id in seen:  # mais de uma reserva ativa: vale a mais recente
+            continue
+        seen.add(room_id)
+        board.append(BoardRoom(
+            id=room_id,
+            numero=numero,
+            status=status,
+            reservation_id=reservation_id,
+            guest_name=guest_name or '',
+            guest_count=guests or 0,
+            pending_count=pending or 0,
+            pending_total=pending_total or Decimal('0'),
+        ))
+    return board
+
+
+def get_board() -> List[BoardRoom]:
+    """Retorna o quadro do cache, montando-o se necessário (sem cache com ``ROOM_BOARD_TIMEOUT`` 0)."""
+    if not settings.ROOM_BOARD_TIMEOUT:
+        return build_board()
+    board = _cache().get(BOARD_KEY)
+    if board is None:
+        board = build_board()
+        _cache().set(BOARD_KEY, board, timeout=settings.ROOM_BOARD_TIMEOUT)
+    return board
+
+
+def get_board_room(room_id: int) -> Optional[BoardRoom]:
+    """Linha do quadro de um quarto; um quarto ausente da cópia em cache é lido do banco."""
+    room = next((room for room in get_board() if room.id == room_id), None)
+    if room is None:
+        room = next(iter(build_board(room_ids=[room_id])), None)
+    return room
+
+
+def invalidate() -> None:
+    """Descarta o quadro após o commit da transação atual."""
+    transaction.on_commit(lambda: _cache().delete(BOARD_KEY))
@@ -0,0 +1,97 @@
+"""
+Envio das mudanças do quadro de quartos em tempo real (``hotel_hms.events``).
+
+Os sinais (``signals``) anotam os quartos alterados na transação corrente com
+o tipo da mudança; após o commit cada quarto é relido do banco uma única vez
+(``build_board`` filtrado) e publicado como evento ``quarto`` no canal
+``quadro``, com a linha do quadro e a ``acao``: ``checkin``, ``checkout``,
+``pagamento``, ``hospede`` ou ``status``. Quartos excluídos saem com
+``removido``.
+
+As anotações ficam no próprio callback de ``on_commit`` da transação, então
+uma transação desfeita as descarta junto. Sem assinantes no canal (deploy
+WSGI, ninguém com o quadro aberto) o commit não lê nem publica nada.
+"""
+from dataclasses import asdict
+from typing import Any, Dict
+
+from django.db import transaction
+
+from hotel_hms import events
+
+from .board import BoardRoom, build_board
+from .models import Reservation
+
+BOARD_CHANNEL = 'quadro'
+
+CHECKIN = 'checkin'
+CHECKOUT = 'checkout'
+PAGAMENTO = 'pagamento'
+HOSPEDE = 'hospede'
+STATUS = 'status'
+
+# Quando um quarto muda de mais de um jeito na mesma transação, vale a ação mais relevante.
+_PRIORITY = {CHECKIN: 4, CHECKOUT: 4, PAGAMENTO: 3, HOSPEDE: 2, STATUS: 1}
+
+
+def room_payload(room: BoardRoom) -> Dict[str, Any]:
+    """Linha do quadro no formato enviado aos clientes."""
+    return {**asdict(room), 'occupied': room.occupied, 'extra_guests': room.extra_guests}
+
+
+def _merge(target: Dict[int, str], key: int, acao: str) -> None:
+    current = target.get(key)
+    if current is None or _PRIORITY[acao] > _PRIORITY[current]:
+        target[key] = acao
+
+
+class _PendingRooms:
+    """Quartos (e reservas, cujo quarto é resolvido no envio) anotados em uma transação."""
+
+    def __init__(self):
+        self.rooms: Dict[int, str] = {}
+        self.reservations: Dict[int, str] = {}
+
+    def __call__(self) -> None:
+        flush(self)
+
+
+def _annotate(kind: str, key: int, acao: str) -> None:
+    """Anota no envio pendente da transação atual (criado no primeiro ``notify`` dela)."""
+    connection = transaction.get_connection()
+    pending = None
+    if connection.in_atomic_block:
+        pending = next((func for _, func, _ in connection.run_on_commit if isinstance(func, _PendingRooms)), None)
+    if pending is None:
+        pending = _PendingRooms()
+    _merge(getattr(pending, kind), key, acao)
+    # Um registro por chamada (o primeiro a rodar publica tudo e esvazia as anotações);
+    # fora de transação, ``on_commit`` roda na hora.
+    transaction.on_commit(pending)
+
+
+def notify(room_id: int, acao: str) -> None:
+    """Agenda a publicação do quarto para depois do commit da transação atual."""
+    _annotate('rooms', room_id, acao)
+
+
+def notify_reservation(reservation_id: int, acao: str) -> None:
+    """Como ``notify``, para quem só conhece a reserva: o quarto é lido no envio, se houver assinantes."""
+    _annotate('reservations', reservation_id, acao)
+
+
+def flush(pending: _PendingRooms) -> None:
+    """Publica os quartos anotados, relendo-os em uma consulta; sem assinantes, só descarta as anotações."""
+    rooms, reservations = pending.rooms, pending.reservations
+    pending.rooms, pending.reservations = {}, {}
+    if not (rooms or reservations) or not events.has_subscribers(BOARD_CHANNEL):
+        return
+    if reservations:
+        room_ids = Reservation.objects.filter(pk__in=list(reservations)).values_list('id', 'room_id')
+        for reservation_id, room_id in room_ids:
+            _merge(rooms, room_id, reservations[reservation_id])
+    board = {room.id: room for room in build_board(room_ids=rooms)}
+    for room_id, acao in rooms.items():
+        room = board.get(room_id)
+        data = room_payload(room) if room is not None else {'id': room_id, 'removido': True}
+        events.publish(BOARD_CHANNEL, 'quarto', {'acao': acao, **data})
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.reservations import board
+from apps.reservations.models import Reservation
+
+
+class Command(BaseCommand):
+    help = 'Confere os totais gravados nas reservas contra os hóspedes e, com --repair, corrige-os.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repair', action='store_true', help='Regrava os totais das reservas divergentes.')
+        parser.add_argument('--all', action='store_true', help='Com --repair, recalcula todas as reservas.')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Reservas recalculadas por UPDATE.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size deve ser maior que zero.')
+
+        if options['repair'] and options['all']:
+            ids = Reservation.objects.order_by('id').values_list('id', flat=True)
+        else:
+            ids = Reservation.objects.com_totais_divergentes().order_by('id').values_list('id', flat=True)
+        ids = list(ids)
+
+        if not options['repair']:
+            if not ids:
+                self.stdout.write(self.style.SUCCESS('Todos os totais das reservas conferem.'))
+                return
+            amostra = ', '.join(str(pk) for pk in ids[:20])
+            self.stdout.write(self.style.WARNING(
+                f'{len(ids)} reserva(s) com totais divergentes (ex.: {amostra}). Use --repair para corrigir.'
+            ))
+            return
+
+        updated = 0
+        batch_size = options['batch_size']
+        for offset in range(0, len(ids), batch_size):
+            updated += Reservation.objects.filter(id__in=ids[offset:offset + batch_size]).recalcular_totais()
+        board.invalidate()  # o UPDATE em lote não dispara os sinais do quadro
+        self.stdout.write(self.style.SUCCESS(f'{updated} reserva(s) recalculada(s).'))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 19:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reservationguest',
+            name='criado_em',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
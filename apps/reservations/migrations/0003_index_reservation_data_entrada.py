@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-18 19:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0002_index_guest_criado_em'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['data_entrada', 'id'], name='reserva_entrada_idx'),
+        ),
+    ]
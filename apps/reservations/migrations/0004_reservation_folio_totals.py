@@ -0,0 +1,63 @@
+# Generated by Django 5.2 on 2026-10-18 19:54
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def preencher_totais(apps, schema_editor):
+    Reservation = apps.get_model('reservations', 'Reservation')
+    ReservationGuest = apps.get_model('reservations', 'ReservationGuest')
+    hospedes = ReservationGuest.objects.filter(reserva=OuterRef('pk')).order_by().values('reserva')
+    zero = Value(Decimal('0'), output_field=models.DecimalField(max_digits=12, decimal_places=2))
+
+    def soma(**filtro):
+        return Coalesce(Subquery(hospedes.filter(**filtro).annotate(valor=Sum('valor_devido')).values('valor')), zero)
+
+    def conta(**filtro):
+        return Coalesce(Subquery(hospedes.filter(**filtro).annotate(valor=Count('id')).values('valor')), 0)
+
+    Reservation.objects.update(
+        total_devido=soma(),
+        total_pago=soma(pago=True),
+        total_pendente=soma(pago=False),
+        qtd_hospedes=conta(),
+        qtd_pendentes=conta(pago=False),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0003_index_reservation_data_entrada'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='qtd_hospedes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='qtd_pendentes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='total_devido',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='total_pago',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='total_pendente',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=12),
+        ),
+        migrations.RunPython(preencher_totais, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2 on 2026-10-18 19:56
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def registrar_pagamentos_existentes(apps, schema_editor):
+    """Cria um evento para cada hóspede já pago, datado pela última atualização do hóspede."""
+    ReservationGuest = apps.get_model('reservations', 'ReservationGuest')
+    PaymentEvent = apps.get_model('reservations', 'PaymentEvent')
+    pagos = ReservationGuest.objects.filter(pago=True).exclude(metodo_pagamento='PENDENTE').values_list(
+        'id', 'reserva_id', 'metodo_pagamento', 'valor_devido', 'atualizado_em',
+    )
+    lote = []
+    for hospede_id, reserva_id, metodo, valor, atualizado_em in pagos.iterator(chunk_size=5000):
+        lote.append(PaymentEvent(
+            hospede_id=hospede_id, reserva_id=reserva_id, tipo='pagamento',
+            metodo=metodo, valor=valor, pago_em=atualizado_em,
+        ))
+        if len(lote) >= 5000:
+            PaymentEvent.objects.bulk_create(lote)
+            lote = []
+    if lote:
+        PaymentEvent.objects.bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0004_reservation_folio_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('pagamento', 'Pagamento'), ('estorno', 'Estorno')], default='pagamento', max_length=10)),
+                ('metodo', models.CharField(choices=[('PIX', 'Pix'), ('DINHEIRO', 'Dinheiro'), ('PENDENTE', 'Pendente')], max_length=20)),
+                ('valor', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('pago_em', models.DateTimeField(default=django.utils.timezone.now)),
+                ('hospede', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='pagamentos', to='reservations.reservationguest')),
+                ('reserva', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='pagamentos', to='reservations.reservation')),
+            ],
+            options={
+                'ordering': ['-pago_em', '-id'],
+                'indexes': [models.Index(fields=['pago_em', 'metodo'], name='pagamento_data_metodo_idx')],
+            },
+        ),
+        migrations.RunPython(registrar_pagamentos_existentes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2 on 2026-10-18 20:29
+
+from django.db import migrations, models
+
+
+def encerrar_reservas_duplicadas(apps, schema_editor):
+    """Quartos com mais de uma reserva ativa ficam só com a mais recente; as outras são encerradas na entrada dela."""
+    Reservation = apps.get_model('reservations', 'Reservation')
+    ativas = Reservation.objects.filter(ativa=True, data_saida__isnull=True).order_by('room_id', '-data_entrada', '-id')
+    atual_por_quarto = {}
+    for reserva_id, room_id, data_entrada in ativas.values_list('id', 'room_id', 'data_entrada').iterator():
+        if room_id not in atual_por_quarto:
+            atual_por_quarto[room_id] = data_entrada
+            continue
+        Reservation.objects.filter(pk=reserva_id).update(ativa=False, data_saida=atual_por_quarto[room_id])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0005_payment_event'),
+    ]
+
+    operations = [
+        migrations.RunPython(encerrar_reservas_duplicadas, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='reservation',
+            constraint=models.UniqueConstraint(condition=models.Q(('ativa', True), ('data_saida__isnull', True)), fields=('room',), name='reserva_ativa_por_quarto'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2 on 2026-10-18 21:04
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0006_one_active_stay_per_room'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reservation',
+            name='qtd_hospedes',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='reservation',
+            name='qtd_pendentes',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='reservation',
+            name='total_devido',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), editable=False, max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='reservation',
+            name='total_pago',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), editable=False, max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='reservation',
+            name='total_pendente',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), editable=False, max_digits=12),
+        ),
+    ]
@@ -1,6 +1,14 @@
-from django.db import models
+import threading
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
+from django.dispatch import Signal
 from django.utils import timezone
 
+room_status_changed = Signal()  # argumentos: room_ids (quartos levados ao status), status
+
 
 class Room(models.Model):
     class Status(models.TextChoices):
@@ -23,18 +31,138 @@ class Room(models.Model):
         return f"Quarto {self.numero}"
 
     def ocupar(self):
-        self.status = Room.Status.OCUPADO
-        self.save(update_fields=['status', 'atualizado_em'])
+        request_room_status(self, Room.Status.OCUPADO)
 
     def liberar(self):
-        self.status = Room.Status.DISPONIVEL
-        self.save(update_fields=['status', 'atualizado_em'])
+        request_room_status(self, Room.Status.DISPONIVEL)
+
+
+# Máquina de estados do status do quarto: status de destino -> status de onde se pode chegar a ele.
+# Pedidos para o status em que o quarto já está não gravam nada.
+ROOM_TRANSITIONS = {
+    Room.Status.OCUPADO: (Room.Status.DISPONIVEL,),
+    Room.Status.DISPONIVEL: (Room.Status.OCUPADO,),
+}
+
+_transitions = threading.local()
+
+
+def _apply_room_status(rooms: dict, status: str) -> None:
+    """
+    Grava ``status`` nos quartos ``{id: instância ou None}`` que estão em um status de origem válido.
+
+    Só os quartos que de fato mudaram têm a instância atualizada e entram em ``room_status_changed``.
+    """
+    with transaction.atomic():
+        changed = list(
+            Room.objects.select_for_update()
+            .filter(id__in=list(rooms), status__in=ROOM_TRANSITIONS[status])
+            .values_list('id', flat=True)
+        )
+        if not changed:
+            return
+        Room.objects.filter(id__in=changed).update(status=status, atualizado_em=timezone.now())
+    for room_id in changed:
+        if rooms[room_id] is not None:
+            rooms[room_id].status = status
+    room_status_changed.send(sender=Room, room_ids=changed, status=status)
+
+
+def request_room_status(room: Room, status: str) -> None:
+    """
+    Pede a transição do quarto para ``status``.
+
+    Dentro de ``room_transitions`` o pedido é acumulado (o último pedido de
+    cada quarto vale) e gravado ao fim do bloco; fora dele, é gravado na hora.
+    Em ambos os casos só quartos em um status de origem de ``ROOM_TRANSITIONS``
+    são atualizados, com um ``UPDATE`` condicional.
+    """
+    pending = getattr(_transitions, 'pending', None)
+    if pending is None:
+        _apply_room_status({room.pk: room}, status)
+        return
+    pending[room.pk] = (room, status)
+
+
+@contextmanager
+def room_transitions():
+    """
+    Agrupa as mudanças de status de quarto do bloco em uma transação.
+
+    Ao fim do bloco cada quarto recebe no máximo um ``UPDATE`` (um por status
+    de destino para todos os quartos). Blocos aninhados usam o lote do mais externo.
+    """
+    if getattr(_transitions, 'pending', None) is not None:
+        yield
+        return
+    _transitions.pending = {}
+    try:
+        with transaction.atomic():
+            yield
+            pending, _transitions.pending = _transitions.pending, None
+            by_status = {}
+            for room_id, (room, status) in pending.items():
+                by_status.setdefault(status, {})[room_id] = room
+            for status, rooms in by_status.items():
+                _apply_room_status(rooms, status)
+    finally:
+        _transitions.pending = None
+
+
+FOLIO_FIELDS = ('total_devido', 'total_pago', 'total_pendente', 'qtd_hospedes', 'qtd_pendentes')
+
+
+def _zero_decimal():
+    return models.Value(Decimal('0'), output_field=models.DecimalField(max_digits=12, decimal_places=2))
 
 
 class ReservationQuerySet(models.QuerySet):
     def ativas(self):
         return self.filter(ativa=True, data_saida__isnull=True)
 
+    def com_totais_calculados(self):
+        """Anota ``calc_<campo>`` com os totais recalculados a partir dos hóspedes (para verificação)."""
+        zero = _zero_decimal()
+        return self.annotate(
+            calc_total_devido=Coalesce(models.Sum('hospedes__valor_devido'), zero),
+            calc_total_pago=Coalesce(models.Sum('hospedes__valor_devido', filter=models.Q(hospedes__pago=True)), zero),
+            calc_total_pendente=Coalesce(models.Sum('hospedes__valor_devido', filter=models.Q(hospedes__pago=False)), zero),
+            calc_qtd_hospedes=models.Count('hospedes'),
+            calc_qtd_pendentes=models.Count('hospedes', filter=models.Q(hospedes__pago=False)),
+        )
+
+    def com_totais_divergentes(self):
+        """Reservas cujos totais gravados não batem com os hóspedes."""
+        divergente = models.Q()
+        for field in FOLIO_FIELDS:
+            divergente |= ~models.Q(**{field: models.F(f'calc_{field}')})
+        return self.com_totais_calculados().filter(divergente)
+
+    def recalcular_totais(self) -> int:
+        """
+        Regrava os totais das reservas selecionadas em um único ``UPDATE``.
+
+        Returns:
+            int: Quantidade de reservas atualizadas.
+        """
+        hospedes = ReservationGuest.objects.filter(reserva=models.OuterRef('pk')).order_by().values('reserva')
+
+        def soma(**filtro):
+            valores = hospedes.filter(**filtro).annotate(valor=models.Sum('valor_devido')).values('valor')
+            return Coalesce(models.Subquery(valores), _zero_decimal())
+
+        def conta(**filtro):
+            valores = hospedes.filter(**filtro).annotate(valor=models.Count('id')).values('valor')
+            return Coalesce(models.Subquery(valores), 0)
+
+        return self.update(
+            total_devido=soma(),
+            total_pago=soma(pago=True),
+            total_pendente=soma(pago=False),
+            qtd_hospedes=conta(),
+            qtd_pendentes=conta(pago=False),
+        )
+
 
 class Reservation(models.Model):
     room = models.ForeignKey(Room, related_name='reservas', on_delete=models.CASCADE)
@@ -44,25 +172,75 @@ class Reservation(models.Model):
     criado_em = models.DateTimeField(auto_now_add=True)
     atualizado_em = models.DateTimeField(auto_now=True)
 
+    # Totais da conta mantidos por ReservationGuest.save()/delete(); conferidos
+    # e corrigidos em lote por ``manage.py verify_reservation_totals``. Não são
+    # editáveis: o ``save`` da reserva não os grava (ver ``FOLIO_FIELDS``).
+    total_devido = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0'), editable=False)
+    total_pago = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0'), editable=False)
+    total_pendente = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0'), editable=False)
+    qtd_hospedes = models.PositiveIntegerField(default=0, editable=False)
+    qtd_pendentes = models.PositiveIntegerField(default=0, editable=False)
+
     objects = ReservationQuerySet.as_manager()
 
+    # Se a estadia estava em andamento na última leitura ou gravação (ver ``save``).
+    _ocupando_gravado = False
+
     class Meta:
         ordering = ['-data_entrada']
+        indexes = [
+            models.Index(fields=['data_entrada', 'id'], name='reserva_entrada_idx'),
+        ]
+        constraints = [
+            # Uma estadia em andamento por quarto; o check-in trava o quarto antes de conferir (``stays``).
+            models.UniqueConstraint(
+                fields=['room'],
+                condition=models.Q(ativa=True, data_saida__isnull=True),
+                name='reserva_ativa_por_quarto',
+            ),
+        ]
 
     def __str__(self) -> str:
+        # Listas de reservas devem usar ``select_related('room')``; o detector de N+1 acusa as que não usam.
         return f"Reserva #{self.pk} - Quarto {self.room.numero}"
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        if self.ocupando:
-            self.room.ocupar()
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # Os totais só mudam por incrementos atômicos; uma cópia em memória
+            # desatualizada não pode sobrescrevê-los.
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in FOLIO_FIELDS
+            ]
+        with room_transitions():  # reserva e quarto gravados juntos
+            super().save(*args, **kwargs)
+            # Só mudanças reais da estadia (início ou encerramento) mexem no status do quarto.
+            if self.ocupando != self._ocupando_gravado:
+                room = self.room if self._meta.get_field('room').is_cached(self) else Room(pk=self.room_id)
+                request_room_status(room, Room.Status.OCUPADO if self.ocupando else Room.Status.DISPONIVEL)
+        self._ocupando_gravado = self.ocupando
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        loaded = instance.__dict__
+        if 'ativa' in loaded and 'data_saida' in loaded:
+            instance._ocupando_gravado = instance.ocupando
+        else:
+            # Desconhecido: o próximo save pede o status do quarto, e o UPDATE
+            # condicional de ``_apply_room_status`` ignora quarto que já está nele.
+            instance._ocupando_gravado = None
+        return instance
+
+    @property
+    def tem_pendencias(self) -> bool:
+        return self.qtd_pendentes > 0
 
     def encerrar(self, quando=None):
         quando = quando or timezone.now()
         self.data_saida = quando
         self.ativa = False
-        self.save(update_fields=['data_saida', 'ativa', 'atualizado_em'])
-        self.room.liberar()
+        self.save(update_fields=['data_saida', 'ativa', 'atualizado_em'])  # libera o quarto
 
     @property
     def ocupando(self) -> bool:
@@ -70,7 +248,10 @@ class Reservation(models.Model):
 
     @property
     def guest_name(self) -> str:
-        """Retorna o nome do primeiro hóspede ou string vazia."""
+        """Retorna o nome do primeiro hóspede ou string vazia (sem consulta se ``hospedes`` foi pré-carregado)."""
+        if 'hospedes' in getattr(self, '_prefetched_objects_cache', {}):
+            hospedes = self.hospedes.all()
+            return hospedes[0].nome if hospedes else ''
         primeiro = self.hospedes.first()
         return primeiro.nome if primeiro else ''
 
@@ -100,7 +281,7 @@ class ReservationGuest(models.Model):
         choices=MetodoPagamento.choices,
         default=MetodoPagamento.PENDENTE,
     )
-    criado_em = models.DateTimeField(auto_now_add=True)
+    criado_em = models.DateTimeField(auto_now_add=True, db_index=True)
     atualizado_em = models.DateTimeField(auto_now=True)
 
     class Meta:
@@ -109,7 +290,157 @@ class ReservationGuest(models.Model):
     def __str__(self) -> str:
         return f"{self.nome} - Reserva {self.reserva_id}"
 
+    def _contribuicao(self, valor, pago: bool, sinal: int = 1) -> dict:
+        valor = Decimal(valor or 0) * sinal
+        return {
+            'total_devido': valor,
+            'total_pago': valor if pago else Decimal('0'),
+            'total_pendente': Decimal('0') if pago else valor,
+            'qtd_hospedes': sinal,
+            'qtd_pendentes': 0 if pago else sinal,
+        }
+
+    def _aplicar_na_reserva(self, reserva_id: int, delta: dict):
+        """Soma ``delta`` aos totais da reserva com ``UPDATE ... SET campo = campo + x``."""
+        delta = {field: value for field, value in delta.items() if value}
+        if not delta:
+            return
+        Reservation.objects.filter(pk=reserva_id).update(
+            **{field: models.F(field) + value for field, value in delta.items()}
+        )
+        if self._meta.get_field('reserva').is_cached(self) and self.reserva.pk == reserva_id:
+            for field, value in delta.items():
+                setattr(self.reserva, field, getattr(self.reserva, field) + value)
+
+    def _estado_gravado(self):
+        if self.pk is None:
+            return None
+        return (
+            ReservationGuest.objects.select_for_update()
+            .filter(pk=self.pk)
+            .values('reserva_id', 'valor_devido', 'pago', 'metodo_pagamento')
+            .first()
+        )
+
+    def _estorno(self, anterior) -> 'PaymentEvent':
+        """Estorno do pagamento gravado em ``anterior`` (valor negativo, mesmo método)."""
+        return PaymentEvent(
+            hospede=self,
+            reserva_id=anterior['reserva_id'],
+            tipo=PaymentEvent.Tipo.ESTORNO,
+            metodo=anterior['metodo_pagamento'],
+            valor=-anterior['valor_devido'],
+        )
+
+    def _registrar_eventos(self, anterior):
+        """
+        Grava no livro de pagamentos as mudanças de situação do hóspede.
+
+        Um pagamento desfeito, ou refeito com outro método ou valor, gera um
+        estorno do lançamento anterior antes do novo pagamento.
+        """
+        pago_antes = anterior is not None and anterior['pago']
+        mudou = (
+            anterior is None
+            or pago_antes != self.pago
+            or anterior['metodo_pagamento'] != self.metodo_pagamento
+            or anterior['valor_devido'] != self.valor_devido
+        )
+        if not mudou:
+            return
+        eventos = []
+        if pago_antes:
+            eventos.append(self._estorno(anterior))
+        if self.pago:
+            eventos.append(PaymentEvent(
+                hospede=self,
+                reserva_id=self.reserva_id,
+                tipo=PaymentEvent.Tipo.PAGAMENTO,
+                metodo=self.metodo_pagamento,
+                valor=self.valor_devido,
+            ))
+        for evento in eventos:
+            evento.save()  # um a um, para disparar ``post_save`` (contadores do caixa)
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            anterior = self._estado_gravado()
+            super().save(*args, **kwargs)
+            novo = self._contribuicao(self.valor_devido, self.pago)
+            if anterior is None:
+                self._aplicar_na_reserva(self.reserva_id, novo)
+            else:
+                removido = self._contribuicao(anterior['valor_devido'], anterior['pago'], sinal=-1)
+                if anterior['reserva_id'] == self.reserva_id:
+                    self._aplicar_na_reserva(self.reserva_id, {field: novo[field] + removido[field] for field in novo})
+                else:
+                    self._aplicar_na_reserva(anterior['reserva_id'], removido)
+                    self._aplicar_na_reserva(self.reserva_id, novo)
+            self._registrar_eventos(anterior)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            anterior = self._estado_gravado()
+            if anterior is not None and anterior['pago']:
+                # O pagamento sai do caixa como estorno; o evento fica no livro sem o hóspede.
+                self._estorno(anterior).save()
+            result = super().delete(*args, **kwargs)
+            if anterior is not None:
+                self._aplicar_na_reserva(
+                    anterior['reserva_id'],
+                    self._contribuicao(anterior['valor_devido'], anterior['pago'], sinal=-1),
+                )
+        return result
+
     def registrar_pagamento(self, metodo: str):
         self.metodo_pagamento = metodo
         self.pago = metodo != ReservationGuest.MetodoPagamento.PENDENTE
         self.save(update_fields=['metodo_pagamento', 'pago', 'atualizado_em'])
+
+
+class PaymentEventQuerySet(models.QuerySet):
+    def no_intervalo(self, inicio, fim):
+        """Eventos com ``inicio <= pago_em < fim`` (limites com fuso, ver ``local_day_bounds``)."""
+        return self.filter(pago_em__gte=inicio, pago_em__lt=fim)
+
+    def totais_por_metodo(self) -> dict:
+        """Soma líquida (pagamentos menos estornos) por método, em uma consulta agrupada."""
+        linhas = self.order_by().values('metodo').annotate(total=models.Sum('valor'))
+        return {linha['metodo']: linha['total'] or Decimal('0') for linha in linhas}
+
+
+class PaymentEvent(models.Model):
+    """
+    Livro de pagamentos de hóspedes, somente inclusão.
+
+    Cada pagamento registrado gera um evento com o método, o valor e o
+    momento (``pago_em``); desfazer ou alterar um pagamento, ou excluir um
+    hóspede pago, gera um estorno com valor negativo. Totais por método e período saem de varreduras do
+    índice ``(pago_em, metodo)``, sem depender de ``atualizado_em`` do hóspede.
+    """
+
+    class Tipo(models.TextChoices):
+        PAGAMENTO = 'pagamento', 'Pagamento'
+        ESTORNO = 'estorno', 'Estorno'
+
+    hospede = models.ForeignKey(
+        ReservationGuest, related_name='pagamentos', on_delete=models.SET_NULL, null=True, blank=True,
+    )
+    reserva = models.ForeignKey(
+        Reservation, related_name='pagamentos', on_delete=models.SET_NULL, null=True, blank=True,
+    )
+    tipo = models.CharField(max_length=10, choices=Tipo.choices, default=Tipo.PAGAMENTO)
+    metodo = models.CharField(max_length=20, choices=ReservationGuest.MetodoPagamento.choices)
+    valor = models.DecimalField(max_digits=10, decimal_places=2)
+    pago_em = models.DateTimeField(default=timezone.now)
+
+    objects = PaymentEventQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-pago_em', '-id']
+        indexes = [
+            models.Index(fields=['pago_em', 'metodo'], name='pagamento_data_metodo_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.get_tipo_display()} {self.metodo} R$ {self.valor} - Hóspede {self.hospede_id}"
@@ -0,0 +1,67 @@
+"""
+Sinais que descartam o quadro de quartos (``board``) quando um quarto, uma
+reserva ou um hóspede é gravado ou excluído. Os totais da reserva mudam por
+``UPDATE`` direto quando um hóspede muda, então os sinais do hóspede também
+contam, assim como as transições de status gravadas em lote
+(``room_status_changed``, ver ``models.room_transitions``), que não passam por
+``Room.save``.
+
+Os mesmos sinais anotam o quarto afetado para o envio em tempo real
+(``live``), com o tipo da mudança.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import board, live
+from .models import Reservation, ReservationGuest, Room, room_status_changed
+
+
+@receiver(post_save, sender=Room)
+@receiver(post_save, sender=Reservation)
+@receiver(post_save, sender=ReservationGuest)
+@receiver(post_delete, sender=Room)
+@receiver(post_delete, sender=Reservation)
+@receiver(post_delete, sender=ReservationGuest)
+def invalidate_room_board(sender, **kwargs):
+    board.invalidate()
+
+
+@receiver(room_status_changed)
+def push_room_status_change(sender, room_ids, status, **kwargs):
+    board.invalidate()
+    for room_id in room_ids:
+        live.notify(room_id, live.STATUS)
+
+
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+def push_room_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        live.notify(instance.pk, live.STATUS)
+
+
+@receiver(post_save, sender=Reservation)
+@receiver(post_delete, sender=Reservation)
+def push_reservation_change(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        acao = live.CHECKIN
+    elif not instance.ocupando:
+        acao = live.CHECKOUT
+    else:
+        acao = live.STATUS
+    live.notify(instance.room_id, acao)
+
+
+@receiver(post_save, sender=ReservationGuest)
+@receiver(post_delete, sender=ReservationGuest)
+def push_guest_change(sender, instance, signal, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    # Hóspede existente regravado: mudança de pagamento (situação, método ou valor).
+    acao = live.PAGAMENTO if signal is post_save and not created else live.HOSPEDE
+    if ReservationGuest._meta.get_field('reserva').is_cached(instance):
+        live.notify(instance.reserva.room_id, acao)
+    else:
+        live.notify_reservation(instance.reserva_id, acao)
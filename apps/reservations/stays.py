@@ -0,0 +1,55 @@
+"""
+Abertura de estadias (check-in) à prova de concorrência.
+
+Dois tablets podem tentar o check-in no mesmo quarto ao mesmo tempo. O
+check-in trava a linha do quarto (``select_for_update``) antes de conferir se
+há estadia em andamento, então o segundo espera o primeiro terminar e encontra
+o quarto ocupado. A restrição ``reserva_ativa_por_quarto`` garante o mesmo no
+banco (inclusive no SQLite, que ignora o ``FOR UPDATE``): a violação vira
+``RoomUnavailableError``, nunca um erro 500.
+
+O status do quarto é mantido pela máquina de estados de ``models``
+(``room_transitions``): o check-in grava a reserva, o hóspede e um único
+``UPDATE`` no quarto, que já está travado.
+"""
+from decimal import Decimal
+
+from django.db import IntegrityError
+
+from .models import Reservation, ReservationGuest, Room, room_transitions
+
+
+class RoomUnavailableError(ValueError):
+    """O quarto já tem uma estadia em andamento."""
+
+
+def check_in(room: Room, guest_name: str, amount: Decimal) -> Reservation:
+    """
+    Abre uma estadia no quarto com o primeiro hóspede.
+
+    Args:
+        room (Room): Quarto do check-in.
+        guest_name (str): Nome do hóspede.
+        amount (Decimal): Valor devido pelo hóspede (pendente).
+
+    Returns:
+        Reservation: Reserva criada.
+
+    Raises:
+        RoomUnavailableError: Se o quarto já estiver ocupado.
+    """
+    try:
+        with room_transitions():
+            locked = Room.objects.select_for_update().get(pk=room.pk)
+            if Reservation.objects.ativas().filter(room=locked).exists():
+                raise RoomUnavailableError(f'O quarto {locked.numero} já está ocupado neste momento.')
+            reservation = Reservation.objects.create(room=locked)  # ocupa o quarto ao gravar
+            ReservationGuest.objects.create(
+                reserva=reservation,
+                nome=guest_name,
+                valor_devido=amount,
+                metodo_pagamento=ReservationGuest.MetodoPagamento.PENDENTE,
+            )
+    except IntegrityError:
+        raise RoomUnavailableError(f'O quarto {room.numero} já está ocupado neste momento.')
+    return reservation
@@ -7,6 +7,7 @@ app_name = 'reservations'
 
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),
+    path('board/stream/', views.room_board_stream, name='room_board_stream'),
     path('rooms/<int:room_id>/', views.room_detail, name='room_detail'),
     path('check-in/quick/', views.quick_check_in, name='quick_check_in'),
     path('checkout/<int:reservation_id>/', views.checkout, name='checkout'),
@@ -1,71 +1,36 @@
+import json
 from decimal import Decimal, InvalidOperation
 
+from asgiref.sync import sync_to_async
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.db import transaction
-from django.db.models import Prefetch, Sum
-from django.http import HttpRequest, HttpResponse, HttpResponseBadRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, HttpRequest, HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.utils import timezone
 from django.views.decorators.http import require_POST
 
-from .models import Reservation, ReservationGuest, Room
-
-
-def _total_due(reservation: Reservation) -> Decimal:
-    if not reservation:
-        return Decimal('0')
-    return (
-        reservation.hospedes.aggregate(total=Sum('valor_devido'))['total']
-        or Decimal('0')
-    )
-
-
-def _hydrate_rooms_with_reservations():
-    active_reservations = Reservation.objects.ativas().prefetch_related('hospedes')
-    rooms = list(
-        Room.objects.all().prefetch_related(
-            Prefetch('reservas', queryset=active_reservations, to_attr='reservas_ativas')
-        )
-    )
+from apps.finance.counters import CASH_CHANNEL, cash_payload, read_counters
+from hotel_hms import events
 
-    for room in rooms:
-        reservas = getattr(room, 'reservas_ativas', [])
-        room.active_reservation = reservas[0] if reservas else None
-
-    return rooms
+from .board import get_board, get_board_room
+from .live import BOARD_CHANNEL, room_payload
+from .models import Reservation, ReservationGuest, Room
+from .stays import RoomUnavailableError, check_in
 
 
 @login_required
 def dashboard(request: HttpRequest) -> HttpResponse:
-    rooms = _hydrate_rooms_with_reservations()
-    available_rooms = [room for room in rooms if room.active_reservation is None]
-
-    today = timezone.localdate()
-
-    pix_total = (
-        ReservationGuest.objects.filter(
-            pago=True,
-            metodo_pagamento=ReservationGuest.MetodoPagamento.PIX,
-            atualizado_em__date=today,
-        ).aggregate(total=Sum('valor_devido'))['total']
-        or Decimal('0')
-    )
-    cash_total = (
-        ReservationGuest.objects.filter(
-            pago=True,
-            metodo_pagamento=ReservationGuest.MetodoPagamento.DINHEIRO,
-            atualizado_em__date=today,
-        ).aggregate(total=Sum('valor_devido'))['total']
-        or Decimal('0')
-    )
+    """Quadro de quartos (cache de ``board``) com os recebimentos de hoje (contadores do caixa)."""
+    rooms = get_board()
+    available_rooms = [room for room in rooms if not room.occupied]
+    caixa = read_counters()
 
     context = {
         'rooms': rooms,
         'available_rooms': available_rooms,
         'totals': {
-            'pix': pix_total,
-            'dinheiro': cash_total,
+            'pix': caixa['pix'],
+            'dinheiro': caixa['dinheiro'],
         },
         'stats': {
             'ocupados': len(rooms) - len(available_rooms),
@@ -73,33 +38,72 @@ def dashboard(request: HttpRequest) -> HttpResponse:
             'total': len(rooms),
         },
         'default_rate': Decimal('120.00'),
+        'live_board': events.push_enabled(request),
     }
     return render(request, 'reservations/dashboard.html', context)
 
 
+BOARD_STREAM_PING_SECONDS = 15
+BOARD_STREAM_MAX_SECONDS = 300
+BOARD_STREAM_RETRY_MS = 3000
+
+
+def _sse(event: str, data) -> str:
+    return f'event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n'
+
+
+@login_required
+async def room_board_stream(request: HttpRequest) -> HttpResponse:
+    """
+    Envia as mudanças do quadro de quartos por Server-Sent Events (requer servidor ASGI).
+
+    A conexão assina os canais ``quadro`` e ``caixa`` (``hotel_hms.events``) e
+    recebe primeiro o estado completo (eventos ``quadro`` e ``caixa``); depois,
+    só os deltas publicados por ``apps.reservations.live`` (evento ``quarto``)
+    e os totais do caixa publicados pelos contadores (``caixa``). Sem
+    mensagens, um comentário a cada ``BOARD_STREAM_PING_SECONDS`` mantém a
+    conexão viva. Após ``BOARD_STREAM_MAX_SECONDS`` o fluxo termina e o
+    ``EventSource`` reconecta, recebendo o estado completo de novo.
+
+    Fora do ASGI responde 204, que faz o ``EventSource`` desistir sem reconectar.
+    """
+    if not events.push_enabled(request):
+        return HttpResponse(status=204)
+
+    async def stream():
+        yield f'retry: {BOARD_STREAM_RETRY_MS}\n\n'
+        async with events.subscribe(BOARD_CHANNEL, CASH_CHANNEL) as subscription:
+            # Assinado antes de ler o estado: nenhum delta se perde entre os dois.
+            rooms = await sync_to_async(get_board)()
+            yield _sse('quadro', [room_payload(room) for room in rooms])
+            yield _sse('caixa', await sync_to_async(cash_payload)())
+            async for message in events.listen(subscription, BOARD_STREAM_MAX_SECONDS, BOARD_STREAM_PING_SECONDS):
+                yield ': ping\n\n' if message is None else _sse(*message)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @login_required
 def room_detail(request: HttpRequest, room_id: int) -> HttpResponse:
-    room = get_object_or_404(
-        Room.objects.prefetch_related(
-            Prefetch(
-                'reservas',
-                queryset=Reservation.objects.ativas().prefetch_related('hospedes'),
-                to_attr='reservas_ativas',
-            )
-        ),
-        pk=room_id,
-    )
-    reservas = getattr(room, 'reservas_ativas', [])
-    reservation = reservas[0] if reservas else None
-    total_due = _total_due(reservation)
+    """Detalhes do quarto: a reserva ativa vem do quadro e só os hóspedes dela são lidos do banco."""
+    room = get_board_room(room_id)
+    if room is None:
+        raise Http404('Quarto não encontrado.')
+    reservation = None
+    if room.reservation_id is not None:
+        reservation = (
+            Reservation.objects.ativas().prefetch_related('hospedes').filter(pk=room.reservation_id).first()
+        )
+    total_due = reservation.total_devido if reservation else Decimal('0')
 
     context = {
         'room': room,
         'reservation': reservation,
         'total_due': total_due,
-        'available_rooms': list(
-            Room.objects.filter(status=Room.Status.DISPONIVEL).order_by('numero')
-        ),
+        'available_rooms': [option for option in get_board() if option.status == Room.Status.DISPONIVEL],
         'default_rate': Decimal('120.00'),
         'form_errors': None,
         'form_data': None,
@@ -110,6 +114,13 @@ def room_detail(request: HttpRequest, room_id: int) -> HttpResponse:
 @login_required
 @require_POST
 def quick_check_in(request: HttpRequest) -> HttpResponse:
+    """
+    Check-in rápido de um hóspede em um quarto livre (ver ``stays.check_in``).
+
+    Se o quarto já estiver ocupado, inclusive por um check-in simultâneo em
+    outro tablet, responde 409 para requisições HTMX e volta ao dashboard com
+    uma mensagem nas demais.
+    """
     room_id = request.POST.get('room_id')
     guest_name = request.POST.get('guest_name', '').strip()
     raw_value = request.POST.get('valor_devido', '0').replace(',', '.')
@@ -119,24 +130,18 @@ def quick_check_in(request: HttpRequest) -> HttpResponse:
 
     room = get_object_or_404(Room, pk=room_id)
 
-    if Reservation.objects.ativas().filter(room=room).exists():
-        messages.error(request, 'O quarto já está ocupado neste momento.')
-        return redirect('reservations:dashboard')
-
     try:
         amount = Decimal(raw_value)
     except (InvalidOperation, TypeError):
         amount = Decimal('0')
 
-    with transaction.atomic():
-        reservation = Reservation.objects.create(room=room)
-        ReservationGuest.objects.create(
-            reserva=reservation,
-            nome=guest_name,
-            valor_devido=amount,
-            metodo_pagamento=ReservationGuest.MetodoPagamento.PENDENTE,
-        )
-        room.ocupar()
+    try:
+        check_in(room, guest_name, amount)
+    except RoomUnavailableError as exc:
+        if request.headers.get('Hx-Request', '').lower() == 'true':
+            return HttpResponse(str(exc), status=409)
+        messages.error(request, str(exc))
+        return redirect('reservations:dashboard')
 
     return redirect('reservations:room_detail', room_id=room.id)
 
@@ -213,7 +218,7 @@ def add_guest(request: HttpRequest, reservation_id: int) -> HttpResponse:
     context = {
         'reservation': reservation,
         'room': reservation.room,
-        'total_due': _total_due(reservation),
+        'total_due': reservation.total_devido,
         'form_errors': errors if errors else None,
         'form_data': {
             'guest_name': name,
@@ -247,7 +252,7 @@ def checkout(request: HttpRequest, reservation_id: int) -> HttpResponse:
     )
     
     # Verifica se há pagamentos pendentes
-    pendentes = reservation.hospedes.filter(pago=False).count()
+    pendentes = reservation.qtd_pendentes
     
     if pendentes > 0:
         messages.warning(
@@ -255,7 +260,6 @@ def checkout(request: HttpRequest, reservation_id: int) -> HttpResponse:
             f'Atenção: Existem {pendentes} pagamento(s) pendente(s). Check-out realizado mesmo assim.'
         )
     
-    room_id = reservation.room_id
     reservation.encerrar()
     
     messages.success(request, 'Check-out realizado com sucesso! Quarto liberado.')
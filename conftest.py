@@ -14,3 +14,19 @@ django.setup()
 
 # Register pytest-django plugin
 pytest_plugins = ['pytest_django']
+
+
+@pytest.fixture(autouse=True)
+def _clear_caches():
+    """Evita que entradas de cache de um teste vazem para o próximo."""
+    from django.core.cache import caches
+
+    for cache in caches.all():
+        cache.clear()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def _strict_query_budget(settings):
+    """Views acima do orçamento de consultas (``QUERY_BUDGETS``) ou com N+1 falham o teste."""
+    settings.QUERY_BUDGET_STRICT = True
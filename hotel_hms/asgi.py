@@ -3,6 +3,11 @@ ASGI config for hotel_hms project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+O quadro de quartos em tempo real (``reservations:room_board_stream``) mantém
+uma conexão aberta por tablet; sirva-o por um servidor ASGI (uvicorn, daphne).
+Com mais de um worker, defina ``REDIS_URL`` para que os eventos publicados em
+um worker cheguem às conexões dos demais (``hotel_hms.events``).
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
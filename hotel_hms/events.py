@@ -0,0 +1,203 @@
+"""
+Canal de eventos para envio em tempo real (Server-Sent Events sob ASGI).
+
+``publish`` entrega uma mensagem a todos os assinantes de um canal;
+``subscribe`` (um ou mais canais) e ``listen`` são usados pelas views
+assíncronas que mantêm as conexões abertas. ``has_subscribers`` diz se vale
+a pena montar a mensagem.
+
+Dois backends, escolhidos por ``EVENTS_BROKER``:
+
+- ``local``: fila em memória do processo. Basta para um único worker ASGI
+  (instalação em um nó só, desenvolvimento e testes).
+- ``redis``: pub/sub do Redis (``REDIS_URL``), para vários workers ou
+  servidores; cada worker assina o canal e repassa aos seus clientes.
+
+As mensagens são texto JSON ``{"event": ..., "data": ...}``. Falhas ao
+publicar não interrompem quem gravou os dados: os clientes recebem o estado
+completo ao reconectar.
+
+As conexões abertas só são aceitas sob ASGI (``push_enabled``): no deploy com
+Gunicorn síncrono cada uma prenderia um worker até o timeout, então as telas
+continuam com a atualização normal.
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Set, Tuple
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+
+SUBSCRIBER_QUEUE_SIZE = 256
+REDIS_CHANNEL_PREFIX = 'eventos:'
+
+
+def push_enabled(request) -> bool:
+    """Se a requisição veio de um servidor ASGI, onde uma conexão aberta não ocupa um worker."""
+    return isinstance(request, ASGIRequest)
+
+
+def encode_message(event: str, data: Any) -> str:
+    return json.dumps({'event': event, 'data': data}, cls=DjangoJSONEncoder)
+
+
+def decode_message(message: str) -> Tuple[str, Any]:
+    payload = json.loads(message)
+    return payload['event'], payload['data']
+
+
+class Subscription:
+    """Mensagens recebidas por um assinante, lidas com ``await get()``."""
+
+    def __init__(self):
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def put_nowait(self, message: str) -> None:
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            pass  # cliente lento: perde deltas, mas recebe o estado completo ao reconectar
+
+    async def get(self) -> str:
+        return await self._queue.get()
+
+
+class LocalBroker:
+    """Distribui as mensagens entre as conexões do próprio processo."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, Set[Tuple[asyncio.AbstractEventLoop, Subscription]]] = defaultdict(set)
+
+    def has_subscribers(self, channel: str) -> bool:
+        with self._lock:
+            return bool(self._subscribers.get(channel))
+
+    def publish(self, channel: str, message: str) -> None:
+        # Chamado de código síncrono (threads das views); cada fila é alimentada no laço do assinante.
+        with self._lock:
+            subscribers = list(self._subscribers[channel])
+        for loop, subscription in subscribers:
+            try:
+                loop.call_soon_threadsafe(subscription.put_nowait, message)
+            except RuntimeError:  # laço já encerrado
+                pass
+
+    @asynccontextmanager
+    async def subscribe(self, *channels: str) -> AsyncIterator[Subscription]:
+        subscription = Subscription()
+        entry = (asyncio.get_running_loop(), subscription)
+        with self._lock:
+            for channel in channels:
+                self._subscribers[channel].add(entry)
+        try:
+            yield subscription
+        finally:
+            with self._lock:
+                for channel in channels:
+                    self._subscribers[channel].discard(entry)
+
+
+class RedisBroker:
+    """Publica no pub/sub do Redis; cada conexão aberta assina o canal no Redis."""
+
+    def __init__(self, url: str):
+        import redis
+
+        self._url = url
+        self._client = redis.Redis.from_url(url)
+        self._errors = (redis.RedisError,)
+
+    def has_subscribers(self, channel: str) -> bool:
+        # Conta as assinaturas de todos os workers (``PUBSUB NUMSUB``).
+        try:
+            ((_, count),) = self._client.pubsub_numsub(REDIS_CHANNEL_PREFIX + channel)
+        except self._errors:
+            return False
+        return count > 0
+
+    def publish(self, channel: str, message: str) -> None:
+        try:
+            self._client.publish(REDIS_CHANNEL_PREFIX + channel, message)
+        except self._errors:
+            pass
+
+    @asynccontextmanager
+    async def subscribe(self, *channels: str) -> AsyncIterator[Subscription]:
+        from redis import asyncio as aioredis
+
+        client = aioredis.Redis.from_url(self._url)
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(*(REDIS_CHANNEL_PREFIX + channel for channel in channels))
+        subscription = Subscription()
+
+        async def pump():
+            async for item in pubsub.listen():
+                if item.get('type') == 'message':
+                    data = item['data']
+                    subscription.put_nowait(data.decode('utf-8') if isinstance(data, bytes) else data)
+
+        task = asyncio.create_task(pump())
+        try:
+            yield subscription
+        finally:
+            task.cancel()
+            await pubsub.aclose()
+            await client.aclose()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Retorna o broker configurado em ``EVENTS_BROKER`` (criado uma vez por processo)."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                if settings.EVENTS_BROKER == 'redis':
+                    _broker = RedisBroker(settings.REDIS_URL)
+                else:
+                    _broker = LocalBroker()
+    return _broker
+
+
+def has_subscribers(channel: str) -> bool:
+    """Se alguma conexão aberta assina o canal (sem assinantes, não há por que montar a mensagem)."""
+    return get_broker().has_subscribers(channel)
+
+
+def publish(channel: str, event: str, data: Any) -> None:
+    """Publica ``data`` como evento ``event`` no canal."""
+    get_broker().publish(channel, encode_message(event, data))
+
+
+def subscribe(*channels: str, broker: Optional[Any] = None):
+    """Assina os canais: ``async with subscribe('quadro') as subscription: await subscription.get()``."""
+    return (broker or get_broker()).subscribe(*channels)
+
+
+async def listen(subscription: Subscription, seconds: float, ping_seconds: float) -> AsyncIterator[Optional[Tuple[str, Any]]]:
+    """
+    Repassa as mensagens da assinatura como ``(event, data)`` por ``seconds`` segundos.
+
+    Sem mensagens por ``ping_seconds``, produz ``None`` (a view envia um
+    comentário para manter a conexão viva).
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + seconds
+    while True:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return
+        try:
+            message = await asyncio.wait_for(subscription.get(), timeout=min(ping_seconds, remaining))
+        except asyncio.TimeoutError:
+            yield None
+            continue
+        yield decode_message(message)
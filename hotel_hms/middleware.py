@@ -1,6 +1,12 @@
+import logging
 import os
+from django.conf import settings
 from django.http import HttpResponse
 
+from .queries import QueryBudgetExceeded, QueryRecorder, budget_for, describe
+
+query_logger = logging.getLogger('hotel_hms.queries')
+
 
 class MaintenanceModeMiddleware:
     """Retorna 503 quando MAINTENANCE_MODE=True, exceto para rotas liberadas."""
@@ -19,3 +25,33 @@ class MaintenanceModeMiddleware:
         if maintenance_on and not request.path.startswith(allow_prefixes):
             return HttpResponse('Serviço em manutenção', status=503)
         return self.get_response(request)
+
+
+class QueryBudgetMiddleware:
+    """
+    Conta as consultas de cada requisição e acusa views acima do orçamento ou com N+1.
+
+    Ver ``hotel_hms.queries``. Respostas em streaming só contam as consultas
+    feitas até a resposta ser devolvida.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.QUERY_BUDGET_ENABLED:
+            return self.get_response(request)
+        recorder = QueryRecorder(repeat_threshold=settings.QUERY_REPEAT_THRESHOLD)
+        with recorder.record():
+            response = self.get_response(request)
+
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else None
+        budget = budget_for(view_name)
+        if (budget is None or recorder.total <= budget) and not recorder.stacks:
+            return response
+        report = describe(view_name, recorder, budget)
+        if settings.QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(report)
+        query_logger.warning('Consultas acima do esperado em %s', report)
+        return response
@@ -0,0 +1,98 @@
+"""
+Paginação por cursor (keyset) para listagens longas.
+
+Em vez de ``OFFSET``, cada página filtra a partir da última linha entregue
+(``campo < valor OR (campo = valor AND id < último_id)``), usando o índice de
+ordenação. O custo de qualquer página é o mesmo da primeira, por mais que o
+histórico cresça.
+"""
+import base64
+import json
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+from django.db.models import Q, QuerySet
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    """Cursor malformado ou de outra listagem."""
+
+
+@dataclass
+class KeysetPage:
+    items: List[Any]
+    next_cursor: Optional[str]
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+
+def encode_cursor(value: Any, pk: int) -> str:
+    """Serializa a posição ``(valor do campo de ordenação, id)`` como texto opaco para URLs."""
+    raw = json.dumps([value.isoformat() if hasattr(value, 'isoformat') else str(value), pk])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(queryset: QuerySet, field: str, cursor: str):
+    """
+    Converte o cursor de volta em ``(valor, id)`` com os tipos do campo do modelo.
+
+    Raises:
+        InvalidCursor: Se o cursor não puder ser interpretado.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value, pk = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        value = queryset.model._meta.get_field(field).to_python(value)
+        return value, int(pk)
+    except Exception as exc:
+        raise InvalidCursor('Cursor inválido.') from exc
+
+
+def parse_page_size(value: Optional[str], default: int = DEFAULT_PAGE_SIZE) -> int:
+    """Lê ``page_size`` da query string, limitado a ``MAX_PAGE_SIZE``."""
+    try:
+        size = int(value) if value else default
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def keyset_paginate(queryset: QuerySet, field: str, cursor: Optional[str] = None,
+                    page_size: int = DEFAULT_PAGE_SIZE, descending: bool = True) -> KeysetPage:
+    """
+    Retorna uma página de ``queryset`` ordenada por ``(field, id)``.
+
+    Args:
+        queryset (QuerySet): Consulta já filtrada.
+        field (str): Campo de ordenação (idealmente indexado junto com ``id``).
+        cursor (str, optional): Cursor devolvido pela página anterior.
+        page_size (int): Quantidade de itens por página.
+        descending (bool): Ordem decrescente (mais recentes primeiro).
+
+    Returns:
+        KeysetPage: Itens da página e o cursor da próxima, se houver.
+
+    Raises:
+        InvalidCursor: Se ``cursor`` for inválido.
+    """
+    if cursor:
+        value, pk = decode_cursor(queryset, field, cursor)
+        op = 'lt' if descending else 'gt'
+        queryset = queryset.filter(Q(**{f'{field}__{op}': value}) | Q(**{field: value, f'pk__{op}': pk}))
+
+    prefix = '-' if descending else ''
+    rows = list(queryset.order_by(f'{prefix}{field}', f'{prefix}pk')[:page_size + 1])
+    items = rows[:page_size]
+    next_cursor = None
+    if len(rows) > page_size:
+        last = items[-1]
+        if isinstance(last, dict):
+            next_cursor = encode_cursor(last[field], last['id'])
+        else:
+            next_cursor = encode_cursor(getattr(last, field), last.pk)
+    return KeysetPage(items=items, next_cursor=next_cursor)
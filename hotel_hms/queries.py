@@ -0,0 +1,111 @@
+"""
+Orçamento de consultas por view e detector de N+1.
+
+``QueryRecorder`` registra, via ``connection.execute_wrapper``, as consultas
+de uma requisição agrupadas por formato (o SQL com os parâmetros ainda como
+``%s`` e listas ``IN`` recolhidas). Quando um mesmo formato se repete
+``QUERY_REPEAT_THRESHOLD`` vezes, a pilha de chamadas do código do projeto que
+disparou a repetição é guardada: é ali que falta um ``select_related`` ou
+``prefetch_related``.
+
+``QueryBudgetMiddleware`` (``hotel_hms.middleware``) compara o total com
+``QUERY_BUDGETS`` (por nome de URL, ``namespace:nome``) ou
+``QUERY_BUDGET_DEFAULT``. Em produção os excessos vão para o log
+``hotel_hms.queries``; com ``QUERY_BUDGET_STRICT`` (ligado nos testes pelo
+``conftest.py``) a requisição falha com ``QueryBudgetExceeded``.
+"""
+import re
+import traceback
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db import connections
+
+PROJECT_ROOT = str(Path(__file__).resolve().parent.parent)
+_OWN_FILES = {str(Path(__file__).resolve()), str(Path(__file__).resolve().with_name('middleware.py'))}
+STACK_LIMIT = 8
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_TRANSACTION_CONTROL = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+
+class QueryBudgetExceeded(AssertionError):
+    """View acima do orçamento de consultas ou com consultas repetidas (modo estrito)."""
+
+
+def query_shape(sql: str) -> str:
+    """Formato da consulta: o SQL parametrizado, com listas ``IN`` de qualquer tamanho iguais."""
+    return _IN_LIST.sub('IN (...)', sql)
+
+
+def _project_stack() -> List[str]:
+    """Quadros da pilha atual que pertencem ao projeto (sem Django, bibliotecas e este módulo)."""
+    frames = [
+        frame for frame in traceback.extract_stack()[:-2]
+        if frame.filename.startswith(PROJECT_ROOT)
+        and '/site-packages/' not in frame.filename
+        and frame.filename not in _OWN_FILES
+    ]
+    return [f'{frame.filename[len(PROJECT_ROOT) + 1:]}:{frame.lineno} in {frame.name}' for frame in frames[-STACK_LIMIT:]]
+
+
+@dataclass
+class RepeatedQuery:
+    sql: str
+    count: int
+    stack: List[str]
+
+
+@dataclass
+class QueryRecorder:
+    repeat_threshold: int
+    total: int = 0
+    shapes: Dict[str, int] = field(default_factory=dict)
+    stacks: Dict[str, List[str]] = field(default_factory=dict)
+
+    def __call__(self, execute, sql, params, many, context):
+        if not sql.startswith(_TRANSACTION_CONTROL):
+            self.total += 1
+            shape = query_shape(sql)
+            count = self.shapes[shape] = self.shapes.get(shape, 0) + 1
+            if count == self.repeat_threshold:
+                self.stacks[shape] = _project_stack()
+        return execute(sql, params, many, context)
+
+    def repeated(self) -> List[RepeatedQuery]:
+        """Formatos que atingiram o limite de repetições, do mais repetido ao menos."""
+        return sorted(
+            (RepeatedQuery(shape, self.shapes[shape], stack) for shape, stack in self.stacks.items()),
+            key=lambda query: -query.count,
+        )
+
+    def record(self) -> ExitStack:
+        """Instala o registro em todas as conexões configuradas."""
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(self))
+        return stack
+
+
+def budget_for(view_name: Optional[str]) -> Optional[int]:
+    """
+    Orçamento da view: o de ``QUERY_BUDGETS`` ou, sem entrada, ``QUERY_BUDGET_DEFAULT``.
+
+    Uma entrada ``None`` tira o limite da view; as consultas repetidas (N+1)
+    continuam sendo acusadas.
+    """
+    if view_name in settings.QUERY_BUDGETS:
+        return settings.QUERY_BUDGETS[view_name]
+    return settings.QUERY_BUDGET_DEFAULT
+
+
+def describe(view_name: Optional[str], recorder: QueryRecorder, budget: Optional[int]) -> str:
+    """Relatório de uma requisição fora do orçamento, com a pilha das consultas repetidas."""
+    lines = [f'{view_name or "?"}: {recorder.total} consultas (orçamento: {budget if budget is not None else "-"})']
+    for query in recorder.repeated():
+        lines.append(f'  {query.count}x {query.sql[:200]}')
+        lines.extend(f'      {frame}' for frame in query.stack)
+    return '\n'.join(lines)
@@ -52,6 +52,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'hotel_hms.middleware.MaintenanceModeMiddleware',
+    'hotel_hms.middleware.QueryBudgetMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
@@ -99,6 +100,78 @@ else:
         }
     }
 
+# Cache
+# Sem REDIS_URL, usa memória local do processo (instalação em um único nó e testes).
+# Com REDIS_URL, os workers do gunicorn compartilham o mesmo cache no Redis.
+REDIS_URL = os.environ.get('REDIS_URL')
+
+# Consolidados de dias fechados (apps.reports.cache). Com Redis a invalidação
+# alcança todos os workers e as entradas não expiram; sem Redis um lançamento
+# retroativo só limpa a cópia do processo que o gravou, então as dos demais
+# expiram em segundos.
+REPORTS_CACHE_TIMEOUT = None if REDIS_URL else int(os.environ.get('REPORTS_CACHE_TIMEOUT', 60))
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        },
+        'reports': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'reports',
+            'TIMEOUT': REPORTS_CACHE_TIMEOUT,
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'reports': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'reports',
+            'TIMEOUT': REPORTS_CACHE_TIMEOUT,
+            'OPTIONS': {'MAX_ENTRIES': 20000},
+        },
+    }
+
+# Contadores do caixa do dia (apps.finance.counters). Com Redis ficam válidos até
+# o fim do dia seguinte; sem Redis cada processo tem a sua cópia, que expira em
+# segundos e é recalculada do banco.
+CASH_COUNTERS_TIMEOUT = int(os.environ.get('CASH_COUNTERS_TIMEOUT', 2 * 24 * 3600 if REDIS_URL else 30))
+
+# Quadro de quartos (apps.reservations.board): descartado a cada alteração de
+# quarto, reserva ou hóspede. O descarte precisa valer para todos os workers,
+# então sem Redis o quadro não fica em cache (0) e é montado a cada leitura.
+ROOM_BOARD_TIMEOUT = int(os.environ.get('ROOM_BOARD_TIMEOUT', 3600 if REDIS_URL else 0))
+
+# Eventos em tempo real (hotel_hms.events): 'local' entrega só às conexões do
+# próprio processo (um worker ASGI); 'redis' usa o pub/sub do REDIS_URL e
+# atende vários workers.
+EVENTS_BROKER = os.environ.get('EVENTS_BROKER', 'redis' if REDIS_URL else 'local')
+
+# Orçamento de consultas por view (hotel_hms.queries): requisições acima do
+# orçamento, ou com o mesmo formato de consulta repetido QUERY_REPEAT_THRESHOLD
+# vezes (N+1), vão para o log 'hotel_hms.queries'; no modo estrito (testes)
+# a requisição falha. Os orçamentos incluem sessão e usuário; uma view com
+# orçamento None não tem limite, mas ainda é acusada por consultas repetidas.
+QUERY_BUDGET_ENABLED = os.environ.get('QUERY_BUDGET_ENABLED', 'True').lower() == 'true'
+QUERY_BUDGET_STRICT = os.environ.get('QUERY_BUDGET_STRICT', 'False').lower() == 'true'
+QUERY_REPEAT_THRESHOLD = int(os.environ.get('QUERY_REPEAT_THRESHOLD', 5))
+QUERY_BUDGET_DEFAULT = 25
+QUERY_BUDGETS = {
+    # Quadro e caixa vêm do cache; o orçamento cobre a primeira leitura, com o cache vazio.
+    'home': 7,
+    'reservations:dashboard': 7,
+    'reservations:room_detail': 5,
+    'finance:expense_list': 4,
+    'finance:list_adjustments': 3,
+    # Cada trecho aberto entre meses fechados custa duas consultas (closing.period_totals).
+    'finance:financeiro': 12,
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -132,6 +205,9 @@ STATIC_ROOT = os.environ.get('STATIC_ROOT', BASE_DIR / 'hotel_static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'hotel_media'
 
+# Comprovantes de despesas: tamanho máximo do envio, em bytes
+RECEIPT_MAX_UPLOAD_SIZE = int(os.environ.get('RECEIPT_MAX_UPLOAD_SIZE', 20 * 1024 * 1024))
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -0,0 +1,48 @@
+"""
+Respostas JSON transmitidas em blocos.
+
+``iter_json`` codifica um objeto cuja lista principal é consumida de forma
+preguiçosa: os itens são serializados em lotes e enviados ao cliente à medida
+que ficam prontos, sem montar o documento inteiro em memória.
+"""
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+ITEMS_PER_CHUNK = 100
+
+
+def iter_json(key: str, items: Iterable[Any], extra: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+    """
+    Gera o texto de ``{key: [...items], **extra}`` em blocos.
+
+    Args:
+        key (str): Nome da lista principal.
+        items (Iterable[Any]): Itens da lista, consumidos sob demanda.
+        extra (Dict[str, Any], optional): Demais chaves do objeto, escritas após a lista.
+
+    Returns:
+        Iterator[str]: Blocos de texto JSON.
+    """
+    encode = DjangoJSONEncoder().encode
+    buffer = [f'{{{encode(key)}: [']
+    first = True
+    for item in items:
+        buffer.append(encode(item) if first else ', ' + encode(item))
+        first = False
+        if len(buffer) >= ITEMS_PER_CHUNK:
+            yield ''.join(buffer)
+            buffer = []
+    buffer.append(']')
+    for name, value in (extra or {}).items():
+        buffer.append(f', {encode(name)}: {encode(value)}')
+    buffer.append('}')
+    yield ''.join(buffer)
+
+
+def streaming_json_response(key: str, items: Iterable[Any], extra: Optional[Dict[str, Any]] = None,
+                            status: int = 200) -> StreamingHttpResponse:
+    """Monta a resposta ``application/json`` transmitida a partir de ``iter_json``."""
+    return StreamingHttpResponse(iter_json(key, items, extra), content_type='application/json', status=status)
+
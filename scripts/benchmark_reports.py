@@ -0,0 +1,126 @@
+"""
+Benchmark dos relatórios financeiros para volumes crescentes de cobranças.
+
+Cria um banco de testes isolado, gera N cobranças de hóspedes distribuídas
+em uma janela fixa de dias e mede, para cada volume:
+
+- a reconstrução dos consolidados (agregação no banco, sem carregar linhas);
+- a leitura do relatório de fluxo de caixa sobre a janela inteira.
+
+Uso:
+    python scripts/benchmark_reports.py --sizes 10000 100000 1000000 --days 365
+"""
+import argparse
+import json
+import time
+import tracemalloc
+from datetime import datetime, time as dt_time, timedelta
+from decimal import Decimal
+
+from generate_dataset import explicit_timestamps
+
+from django.db import connection
+from django.utils import timezone
+
+from apps.reports.models import DailyFinancialRollup
+from apps.reports.rollup import rebuild_range
+from apps.reports.services import calculate_cash_flow_data
+from apps.reservations.models import Reservation, ReservationGuest, Room
+
+BATCH_SIZE = 5000
+
+
+def _measure(func, *args):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def _reset():
+    DailyFinancialRollup.objects.all().delete()
+    ReservationGuest.objects.all().delete()
+    Reservation.objects.all().delete()
+    Room.objects.all().delete()
+
+
+def _generate_charges(total, start_date, days):
+    room = Room.objects.create(numero='BENCH')
+    reservation = Reservation.objects.create(room=room)
+    tz = timezone.get_current_timezone()
+    methods = [choice for choice, _ in ReservationGuest.MetodoPagamento.choices]
+
+    with explicit_timestamps((ReservationGuest, 'criado_em')):
+        for offset in range(0, total, BATCH_SIZE):
+            batch = []
+            for index in range(offset, min(offset + BATCH_SIZE, total)):
+                day = start_date + timedelta(days=index % days)
+                moment = timezone.make_aware(
+                    datetime.combine(day, dt_time(hour=index % 24, minute=index % 60)),
+                    tz,
+                )
+                method = methods[index % len(methods)]
+                batch.append(ReservationGuest(
+                    reserva=reservation,
+                    nome=f'Hóspede {index}',
+                    valor_devido=Decimal('100.00') + index % 50,
+                    pago=method != ReservationGuest.MetodoPagamento.PENDENTE,
+                    metodo_pagamento=method,
+                    criado_em=moment,
+                ))
+            ReservationGuest.objects.bulk_create(batch)
+
+
+def run(sizes, days):
+    end_date = timezone.localdate()
+    start_date = end_date - timedelta(days=days - 1)
+    results = []
+
+    for size in sizes:
+        _reset()
+        _generate_charges(size, start_date, days)
+
+        _, rebuild_seconds, rebuild_peak = _measure(rebuild_range, start_date, end_date)
+        report, report_seconds, report_peak = _measure(calculate_cash_flow_data, start_date, end_date)
+
+        results.append({
+            'charges': size,
+            'days': days,
+            'rebuild_seconds': round(rebuild_seconds, 4),
+            'rebuild_peak_kib': round(rebuild_peak / 1024, 1),
+            'report_seconds': round(report_seconds, 4),
+            'report_peak_kib': round(report_peak / 1024, 1),
+            'report_days': len(report['daily_flow']),
+        })
+        print(
+            f"{size:>10} cobranças | reconstrução {rebuild_seconds:8.3f}s {rebuild_peak / 1024:9.1f} KiB"
+            f" | relatório {report_seconds:8.4f}s {report_peak / 1024:9.1f} KiB"
+        )
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--output', help='Grava os resultados em JSON neste arquivo.')
+    args = parser.parse_args()
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        results = run(args.sizes, args.days)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            json.dump({'vendor': connection.vendor, 'results': results}, handle, indent=2)
+
+
+if __name__ == '__main__':
+    main()
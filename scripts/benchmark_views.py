@@ -0,0 +1,241 @@
+"""
+Benchmark de todas as views de relatórios, financeiro e reservas.
+
+Cria um banco de testes isolado, gera um dataset sintético com
+``generate_dataset`` e, para cada rota GET de ``apps.reports``,
+``apps.finance`` e ``apps.reservations`` (mais alguns cenários com períodos
+longos e exportações), mede:
+
+- tempo de resposta (mediana e mínimo de ``--repeat`` execuções);
+- quantidade de consultas SQL;
+- pico de memória alocada (``tracemalloc``);
+- tamanho da resposta.
+
+Os resultados vão para um arquivo JSON que pode ser comparado com uma
+execução anterior via ``--compare``.
+
+Uso:
+    python scripts/benchmark_views.py --rooms 200 --years 2 --guests 200000 --output atual.json
+    python scripts/benchmark_views.py --rooms 200 --years 2 --guests 200000 --compare atual.json
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import timedelta
+
+from generate_dataset import BASE_DIR, add_dataset_arguments, generate, spec_from_args
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+
+from apps.finance import urls as finance_urls
+from apps.finance.models import Expense, LedgerAdjustment
+from apps.reports import urls as reports_urls
+from apps.reports.models import Report
+from apps.reservations import urls as reservations_urls
+from apps.reservations.models import Reservation, ReservationGuest, Room
+
+URL_MODULES = [
+    ('reports', reports_urls),
+    ('finance', finance_urls),
+    ('reservations', reservations_urls),
+]
+
+
+def _sample_kwargs():
+    """Ids reais para rotas com parâmetros, escolhidos de forma determinística."""
+    reservation = Reservation.objects.ativas().order_by('id').first() or Reservation.objects.order_by('id').first()
+    guest = ReservationGuest.objects.filter(reserva=reservation).order_by('id').first() if reservation else None
+    report = Report.objects.order_by('id').first()
+    return {
+        'room_id': reservation.room_id if reservation else Room.objects.values_list('id', flat=True).first(),
+        'reservation_id': reservation.id if reservation else None,
+        'guest_id': guest.id if guest else None,
+        'adjustment_id': LedgerAdjustment.objects.values_list('id', flat=True).order_by('id').first(),
+        'expense_id': Expense.objects.values_list('id', flat=True).order_by('id').first(),
+        'report_id': report.id if report else None,
+    }
+
+
+def discover_cases(today, start_date):
+    """Monta os cenários: uma chamada GET por rota, mais períodos longos e exportações."""
+    samples = _sample_kwargs()
+    cases = []
+    for namespace, module in URL_MODULES:
+        for pattern in module.urlpatterns:
+            if not isinstance(pattern, URLPattern) or not pattern.name:
+                continue
+            params = list(pattern.pattern.converters)
+            kwargs = {name: samples.get(name) for name in params}
+            name = f'{namespace}:{pattern.name}'
+            if any(value is None for value in kwargs.values()):
+                cases.append({'name': name, 'skip': 'sem dados para os parâmetros da rota'})
+                continue
+            cases.append({'name': name, 'url': reverse(name, kwargs=kwargs), 'query': {}})
+
+    full_range = {'start_date': start_date.isoformat(), 'end_date': today.isoformat()}
+    year_range = {'start_date': (today - timedelta(days=364)).isoformat(), 'end_date': today.isoformat()}
+    for name, query, label in [
+        ('reports:financial_report', year_range, '12 meses'),
+        ('reports:financial_consolidated', year_range, '12 meses'),
+        ('reports:cash_flow', year_range, '12 meses'),
+        ('reports:revenue', year_range, '12 meses'),
+        ('reports:occupancy', full_range, 'histórico completo'),
+        ('reports:checkins', {'format': 'json'}, 'JSON'),
+        ('reports:financial_report', {**year_range, 'export': 'csv'}, 'exportação CSV 12 meses'),
+        ('finance:expense_list', {'export': 'csv'}, 'exportação CSV completa'),
+        ('finance:financeiro', {'data_inicio': year_range['start_date'], 'data_fim': today.isoformat()}, '12 meses'),
+    ]:
+        cases.append({'name': f'{name} ({label})', 'url': reverse(name), 'query': query})
+    return cases
+
+
+def _consume(response):
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+def _request(client, case):
+    """Faz a requisição e consome a resposta; devolve status, duração, tamanho e nº de consultas."""
+    queries = []
+
+    def count(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count):
+        started = time.perf_counter()
+        response = client.get(case['url'], case['query'])
+        size = _consume(response)
+        elapsed = time.perf_counter() - started
+    return response.status_code, elapsed, size, len(queries)
+
+
+def run_case(client, case, repeat):
+    """
+    Executa um cenário: aquecimento, ``repeat`` execuções cronometradas e uma
+    execução separada sob ``tracemalloc`` (que distorceria os tempos).
+    """
+    status = _request(client, case)[0]  # aquecimento: templates, consolidados e conexão
+    if status == 405:
+        return {'name': case['name'], 'url': case['url'], 'status': status, 'skip': 'somente POST'}
+
+    timings = []
+    for _ in range(repeat):
+        status, elapsed, size, queries = _request(client, case)
+        timings.append(elapsed)
+
+    tracemalloc.start()
+    _request(client, case)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'name': case['name'],
+        'url': case['url'],
+        'query': case['query'],
+        'status': status,
+        'median_ms': round(statistics.median(timings) * 1000, 2),
+        'min_ms': round(min(timings) * 1000, 2),
+        'queries': queries,
+        'peak_kib': round(peak / 1024, 1),
+        'bytes': size,
+    }
+
+
+def compare(current, baseline_path, max_slowdown):
+    with open(baseline_path, encoding='utf-8') as handle:
+        baseline = {item['name']: item for item in json.load(handle)['results'] if 'median_ms' in item}
+
+    regressions = []
+    print(f"\n{'view':60} {'ms antes':>10} {'ms agora':>10} {'x':>6} {'SQL':>9}")
+    for item in current:
+        before = baseline.get(item['name'])
+        if before is None or 'median_ms' not in item:
+            continue
+        ratio = item['median_ms'] / before['median_ms'] if before['median_ms'] else 0
+        queries = f"{before['queries']}→{item['queries']}"
+        print(f"{item['name'][:60]:60} {before['median_ms']:10.1f} {item['median_ms']:10.1f} {ratio:6.2f} {queries:>9}")
+        if max_slowdown and ratio > max_slowdown:
+            regressions.append(item['name'])
+    return regressions
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_dataset_arguments(parser)
+    parser.add_argument('--repeat', type=int, default=3, help='Execuções medidas por cenário (após o aquecimento).')
+    parser.add_argument('--only', help='Executa apenas cenários cujo nome contenha este texto.')
+    parser.add_argument('--output', help='Grava os resultados em JSON neste arquivo.')
+    parser.add_argument('--compare', help='JSON de uma execução anterior para comparação.')
+    parser.add_argument('--max-slowdown', type=float,
+                        help='Com --compare, termina com erro se alguma view ficar mais lenta que este fator.')
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        spec = generate(spec_from_args(args), log=lambda message: print(f'  {message}'))
+        user = get_user_model().objects.create_superuser('benchmark', 'benchmark@example.com', 'benchmark')
+        client = Client()
+        client.force_login(user)
+
+        today = timezone.localdate()
+        cases = discover_cases(today, today - timedelta(days=spec.days - 1))
+        if args.only:
+            cases = [case for case in cases if args.only in case['name']]
+
+        results = []
+        for case in cases:
+            if 'skip' in case:
+                result = {'name': case['name'], 'skip': case['skip']}
+            else:
+                result = run_case(client, case, max(args.repeat, 1))
+            results.append(result)
+            if 'skip' in result:
+                print(f"{result['name'][:60]:60} ignorada ({result['skip']})")
+            else:
+                print(
+                    f"{result['name'][:60]:60} {result['median_ms']:9.1f} ms {result['queries']:5} SQL"
+                    f" {result['peak_kib']:10.1f} KiB  HTTP {result['status']}"
+                )
+        vendor = connection.vendor
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            json.dump({
+                'vendor': vendor,
+                'revision': _git_revision(),
+                'dataset': {**{key: value for key, value in vars(spec).items() if key not in ('counts', 'end_date')},
+                            'counts': spec.counts},
+                'results': results,
+            }, handle, indent=2, ensure_ascii=False)
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.max_slowdown)
+        if regressions:
+            print(f'\n{len(regressions)} view(s) acima do limite de {args.max_slowdown}x: {", ".join(regressions)}')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,367 @@
+"""
+Gerador determinístico de dados sintéticos em escala de produção.
+
+Cria quartos, anos de reservas com hóspedes, despesas, receitas avulsas e
+ajustes financeiros usando ``bulk_create`` em lotes, e ao final reconstrói as
+tabelas derivadas (consolidados financeiros e noites ocupadas), que não são
+alimentadas pelos sinais durante inserções em lote.
+
+A mesma combinação de parâmetros (incluindo ``--seed`` e ``--end-date``)
+sempre gera exatamente os mesmos dados.
+
+Uso:
+    python scripts/generate_dataset.py --rooms 1000 --years 3 --guests 2000000 \\
+        --expenses 200000 --adjustments 100000 --extra-incomes 50000 --reset
+
+Atenção: grava na base configurada em ``DJANGO_SETTINGS_MODULE``; ``--reset``
+apaga reservas, hóspedes e lançamentos existentes.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from array import array
+from contextlib import ExitStack, contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime, time as dt_time, timedelta
+from decimal import Decimal
+from typing import Optional
+
+import django
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hotel_hms.settings')
+django.setup()
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.finance.models import Expense, ExtraIncome, LedgerAdjustment
+from apps.reports.models import DailyFinancialRollup, RoomNight
+from apps.reports.occupancy import rebuild_room_nights
+from apps.reports.rollup import iter_ranges, rebuild_range
+from apps.reservations.models import PaymentEvent, Reservation, ReservationGuest, Room
+
+AVERAGE_GUESTS_PER_STAY = 1.75
+EXPENSE_METHODS = ['PIX', 'Dinheiro', 'Cartão', 'Transferência', 'Boleto']
+EXTRA_INCOME_METHODS = ['PIX', 'Dinheiro', 'Cartão', 'Transferência']
+FIRST_NAMES = ['Ana', 'Bruno', 'Carla', 'Daniel', 'Eduarda', 'Felipe', 'Gabriela', 'Heitor', 'Isabela', 'João',
+               'Larissa', 'Marcos', 'Natália', 'Otávio', 'Paula', 'Rafael', 'Sofia', 'Tiago', 'Vanessa', 'Yuri']
+LAST_NAMES = ['Silva', 'Souza', 'Oliveira', 'Santos', 'Lima', 'Pereira', 'Costa', 'Almeida', 'Ferreira', 'Rocha']
+
+
+@dataclass
+class DatasetSpec:
+    rooms: int = 50
+    years: float = 1.0
+    guests: int = 20_000
+    expenses: int = 5_000
+    adjustments: int = 2_000
+    extra_incomes: int = 1_000
+    seed: int = 42
+    end_date: Optional[date] = None
+    batch_size: int = 5_000
+    counts: dict = field(default_factory=dict)
+
+    @property
+    def days(self) -> int:
+        return max(int(self.years * 365), 1)
+
+
+@contextmanager
+def explicit_timestamps(*model_fields):
+    """Permite gravar campos ``auto_now_add`` com valores históricos durante a geração."""
+    with ExitStack() as stack:
+        for model, field_name in model_fields:
+            model_field = model._meta.get_field(field_name)
+            previous = model_field.auto_now_add
+            model_field.auto_now_add = False
+            stack.callback(setattr, model_field, 'auto_now_add', previous)
+        yield
+
+
+def _moment(day: date, hour: int, minute: int) -> datetime:
+    return timezone.make_aware(datetime.combine(day, dt_time(hour=hour, minute=minute)))
+
+
+def _money(rng: random.Random, low: int, high: int) -> Decimal:
+    return Decimal(rng.randrange(low * 100, high * 100)) / 100
+
+
+def reset_data():
+    RoomNight.objects.all().delete()
+    PaymentEvent.objects.all().delete()
+    DailyFinancialRollup.objects.all().delete()
+    ReservationGuest.objects.all().delete()
+    LedgerAdjustment.objects.all().delete()
+    Expense.objects.all().delete()
+    ExtraIncome.objects.all().delete()
+    Reservation.objects.all().delete()
+    Room.objects.all().delete()
+
+
+def _create_rooms(spec: DatasetSpec):
+    rooms = [Room(numero=f'{index + 1:05d}') for index in range(spec.rooms)]
+    return Room.objects.bulk_create(rooms, batch_size=spec.batch_size)
+
+
+def _flush_stays(rng, spec, stays, guest_batch, counters):
+    """Grava um lote de reservas e, com os ``id`` retornados, os hóspedes de cada uma."""
+    created = Reservation.objects.bulk_create([stay['reservation'] for stay in stays], batch_size=spec.batch_size)
+    for reservation, stay in zip(created, stays):
+        counters['reservation_ids'].append(reservation.id)
+        for guest_index in range(stay['guests']):
+            paid = rng.random() < (0.5 if stay['open'] else 0.88)
+            method = rng.choice([ReservationGuest.MetodoPagamento.PIX, ReservationGuest.MetodoPagamento.DINHEIRO])
+            guest_batch.append(ReservationGuest(
+                reserva_id=reservation.id,
+                nome=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                valor_devido=stay['rate'] * stay['nights'],
+                pago=paid,
+                metodo_pagamento=method if paid else ReservationGuest.MetodoPagamento.PENDENTE,
+                criado_em=reservation.data_entrada + timedelta(minutes=5 * guest_index),
+            ))
+            if len(guest_batch) >= spec.batch_size:
+                ReservationGuest.objects.bulk_create(guest_batch)
+                counters['guests'] += len(guest_batch)
+                guest_batch.clear()
+    stays.clear()
+
+
+def _create_stays(rng: random.Random, spec: DatasetSpec, rooms, start_date: date, end_date: date):
+    """
+    Distribui as reservas em sequência por quarto, ao longo de toda a janela.
+
+    Cada quarto recebe um número igual de estadias; a janela do quarto é
+    dividida em segmentos e cada estadia ocupa parte do seu segmento. A última
+    estadia de alguns quartos fica em aberto (hóspedes ainda no hotel).
+    """
+    total_stays = max(int(spec.guests / AVERAGE_GUESTS_PER_STAY), 1)
+    counters = {'reservation_ids': array('q'), 'guests': 0, 'open_rooms': []}
+    stays, guest_batch = [], []
+    stay_index = 0
+
+    for room_position, room in enumerate(rooms):
+        room_stays = total_stays // len(rooms) + (1 if room_position < total_stays % len(rooms) else 0)
+        if room_stays == 0:
+            continue
+        segment = spec.days / room_stays
+        rate = Decimal(rng.randrange(120, 400))
+        for index in range(room_stays):
+            segment_start = int(index * segment)
+            max_nights = max(int(segment * 0.9), 1)
+            nights = rng.randint(1, min(max_nights, 14))
+            entrada_day = start_date + timedelta(days=segment_start)
+            entrada = _moment(entrada_day, rng.randint(12, 22), rng.randrange(60))
+            is_last = index == room_stays - 1
+            saida_day = entrada_day + timedelta(days=nights)
+            open_stay = is_last and saida_day >= end_date and rng.random() < 0.6
+            if saida_day > end_date:
+                saida_day = end_date
+                nights = max((saida_day - entrada_day).days, 1)
+            guests = (
+                spec.guests * (stay_index + 1) // total_stays
+                - spec.guests * stay_index // total_stays
+            )
+            stay_index += 1
+
+            if open_stay:
+                counters['open_rooms'].append(room.id)
+            stays.append({
+                'reservation': Reservation(
+                    room_id=room.id,
+                    data_entrada=entrada,
+                    criado_em=entrada,
+                    data_saida=None if open_stay else _moment(saida_day, rng.randint(9, 12), rng.randrange(60)),
+                    ativa=open_stay,
+                ),
+                'guests': max(guests, 1 if spec.guests else 0),
+                'nights': nights,
+                'rate': rate,
+                'open': open_stay,
+            })
+            if len(stays) >= spec.batch_size:
+                _flush_stays(rng, spec, stays, guest_batch, counters)
+
+    if stays:
+        _flush_stays(rng, spec, stays, guest_batch, counters)
+    if guest_batch:
+        ReservationGuest.objects.bulk_create(guest_batch)
+        counters['guests'] += len(guest_batch)
+
+    # ``bulk_create`` não passa por ReservationGuest.save(): totais da conta e
+    # livro de pagamentos são gravados em lote.
+    ids = counters['reservation_ids']
+    for offset in range(0, len(ids), spec.batch_size):
+        batch_ids = list(ids[offset:offset + spec.batch_size])
+        Reservation.objects.filter(id__in=batch_ids).recalcular_totais()
+        paid = ReservationGuest.objects.filter(reserva_id__in=batch_ids, pago=True).values_list(
+            'id', 'reserva_id', 'metodo_pagamento', 'valor_devido', 'criado_em',
+        )
+        PaymentEvent.objects.bulk_create([
+            PaymentEvent(hospede_id=guest_id, reserva_id=reserva_id, metodo=method, valor=amount, pago_em=created)
+            for guest_id, reserva_id, method, amount, created in paid.iterator(chunk_size=spec.batch_size)
+        ], batch_size=spec.batch_size)
+
+    Room.objects.filter(id__in=counters['open_rooms']).update(status=Room.Status.OCUPADO)
+    return counters
+
+
+def _bulk(model, rows, spec):
+    batch = []
+    total = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= spec.batch_size:
+            model.objects.bulk_create(batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_create(batch)
+        total += len(batch)
+    return total
+
+
+def _expenses(rng, spec, start_date):
+    categories = [code for code, _ in Expense.CATEGORY_CHOICES]
+    for index in range(spec.expenses):
+        category = rng.choice(categories)
+        yield Expense(
+            description=f'Despesa {category} #{index + 1}',
+            amount=_money(rng, 20, 3000),
+            category=category,
+            payment_date=start_date + timedelta(days=rng.randrange(spec.days)),
+            payment_method=rng.choice(EXPENSE_METHODS),
+            notes='' if rng.random() < 0.7 else 'Gerado pelo dataset sintético',
+        )
+
+
+def _extra_incomes(rng, spec, start_date):
+    for index in range(spec.extra_incomes):
+        yield ExtraIncome(
+            description=f'Receita avulsa #{index + 1}',
+            amount=_money(rng, 30, 1500),
+            received_date=start_date + timedelta(days=rng.randrange(spec.days)),
+            method=rng.choice(EXTRA_INCOME_METHODS),
+        )
+
+
+def _adjustments(rng, spec, start_date, reservation_ids):
+    for index in range(spec.adjustments):
+        tipo = LedgerAdjustment.Tipo.CREDITO if rng.random() < 0.7 else LedgerAdjustment.Tipo.DEBITO
+        reservation_id = None
+        if reservation_ids and rng.random() < 0.8:
+            reservation_id = reservation_ids[rng.randrange(len(reservation_ids))]
+        day = start_date + timedelta(days=rng.randrange(spec.days))
+        yield LedgerAdjustment(
+            reservation_id=reservation_id,
+            descricao=f'Ajuste #{index + 1}',
+            tipo=tipo,
+            valor=_money(rng, 5, 400),
+            metodo=rng.choice(EXTRA_INCOME_METHODS),
+            criado_em=_moment(day, rng.randint(7, 23), rng.randrange(60)),
+        )
+
+
+def rebuild_derived_tables(start_date: date, end_date: date) -> dict:
+    """Reconstrói consolidados financeiros e noites ocupadas após inserções em lote."""
+    rollup_days = 0
+    for block_start, block_end in iter_ranges(start_date, end_date, 31):
+        rollup_days += rebuild_range(block_start, block_end)
+    return {'rollup_days': rollup_days, 'room_nights': rebuild_room_nights()}
+
+
+def generate(spec: DatasetSpec, log=print) -> DatasetSpec:
+    """
+    Gera o conjunto de dados descrito por ``spec`` na base atual.
+
+    Returns:
+        DatasetSpec: O próprio ``spec``, com ``counts`` preenchido.
+    """
+    rng = random.Random(spec.seed)
+    end_date = spec.end_date or timezone.localdate()
+    start_date = end_date - timedelta(days=spec.days - 1)
+    started = time.perf_counter()
+
+    with transaction.atomic(), explicit_timestamps(
+        (Reservation, 'data_entrada'),
+        (Reservation, 'criado_em'),
+        (ReservationGuest, 'criado_em'),
+        (LedgerAdjustment, 'criado_em'),
+    ):
+        rooms = _create_rooms(spec)
+        log(f'{len(rooms)} quarto(s) criados.')
+        counters = _create_stays(rng, spec, rooms, start_date, end_date)
+        log(f"{len(counters['reservation_ids'])} reserva(s) e {counters['guests']} hóspede(s) criados.")
+        expenses = _bulk(Expense, _expenses(rng, spec, start_date), spec)
+        extra_incomes = _bulk(ExtraIncome, _extra_incomes(rng, spec, start_date), spec)
+        adjustments = _bulk(LedgerAdjustment, _adjustments(rng, spec, start_date, counters['reservation_ids']), spec)
+        log(f'{expenses} despesa(s), {extra_incomes} receita(s) avulsa(s) e {adjustments} ajuste(s) criados.')
+
+    derived = rebuild_derived_tables(start_date, end_date)
+    log(f"Consolidados: {derived['rollup_days']} dia(s); noites ocupadas: {derived['room_nights']}.")
+
+    spec.counts = {
+        'rooms': len(rooms),
+        'reservations': len(counters['reservation_ids']),
+        'guests': counters['guests'],
+        'expenses': expenses,
+        'extra_incomes': extra_incomes,
+        'adjustments': adjustments,
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'seconds': round(time.perf_counter() - started, 2),
+        **derived,
+    }
+    return spec
+
+
+def spec_from_args(args) -> DatasetSpec:
+    return DatasetSpec(
+        rooms=args.rooms,
+        years=args.years,
+        guests=args.guests,
+        expenses=args.expenses,
+        adjustments=args.adjustments,
+        extra_incomes=args.extra_incomes,
+        seed=args.seed,
+        end_date=date.fromisoformat(args.end_date) if args.end_date else None,
+        batch_size=args.batch_size,
+    )
+
+
+def add_dataset_arguments(parser):
+    defaults = DatasetSpec()
+    parser.add_argument('--rooms', type=int, default=defaults.rooms)
+    parser.add_argument('--years', type=float, default=defaults.years)
+    parser.add_argument('--guests', type=int, default=defaults.guests)
+    parser.add_argument('--expenses', type=int, default=defaults.expenses)
+    parser.add_argument('--adjustments', type=int, default=defaults.adjustments)
+    parser.add_argument('--extra-incomes', type=int, default=defaults.extra_incomes)
+    parser.add_argument('--seed', type=int, default=defaults.seed)
+    parser.add_argument('--end-date', help='Último dia do histórico (AAAA-MM-DD). Padrão: hoje.')
+    parser.add_argument('--batch-size', type=int, default=defaults.batch_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_dataset_arguments(parser)
+    parser.add_argument('--reset', action='store_true', help='Apaga reservas e lançamentos existentes antes de gerar.')
+    args = parser.parse_args()
+
+    if args.rooms < 1:
+        parser.error('--rooms deve ser maior que zero.')
+    if args.reset:
+        print('🧹 Limpando registros antigos...')
+        reset_data()
+    spec = generate(spec_from_args(args))
+    print('✅ Dataset gerado:', {key: value for key, value in asdict(spec).items() if key != 'counts'})
+    print('   Totais:', spec.counts)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,6 +4,7 @@ import pytest
 from decimal import Decimal
 
 from django.core.exceptions import ValidationError
+from django.db import connection
 from django.urls import reverse
 
 from apps.checkin_checkout.models import CheckIn, CheckOut
@@ -93,3 +94,375 @@ class TestReservationPaymentFlow:
         guest.refresh_from_db()
         assert guest.pago is False
         assert guest.metodo_pagamento == ReservationGuest.MetodoPagamento.PENDENTE
+
+
+@pytest.mark.django_db
+class TestReservationFolioTotals:
+    """Garante que os totais gravados na reserva acompanham os hóspedes."""
+
+    def test_totals_follow_guest_changes_and_repair_command(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        reservation = Reservation.objects.create(room=Room.objects.create(numero="951"))
+        ana = ReservationGuest.objects.create(reserva=reservation, nome="Ana", valor_devido=Decimal('100.00'))
+        bruno = ReservationGuest.objects.create(reserva=reservation, nome="Bruno", valor_devido=Decimal('50.00'))
+        ana.registrar_pagamento(ReservationGuest.MetodoPagamento.PIX)
+        bruno.delete()
+
+        reservation.refresh_from_db()
+        assert reservation.total_devido == Decimal('100.00')
+        assert reservation.total_pago == Decimal('100.00')
+        assert reservation.total_pendente == Decimal('0.00')
+        assert (reservation.qtd_hospedes, reservation.qtd_pendentes) == (1, 0)
+
+        Reservation.objects.filter(pk=reservation.pk).update(total_devido=Decimal('1.00'), qtd_pendentes=3)
+        out = StringIO()
+        call_command('verify_reservation_totals', stdout=out)
+        assert '1 reserva(s) com totais divergentes' in out.getvalue()
+
+        call_command('verify_reservation_totals', '--repair', stdout=StringIO())
+        reservation.refresh_from_db()
+        assert reservation.total_devido == Decimal('100.00')
+        assert reservation.qtd_pendentes == 0
+        assert not Reservation.objects.com_totais_divergentes().exists()
+
+    def test_admin_shows_totals_read_only(self, admin_client):
+        reservation = Reservation.objects.create(room=Room.objects.create(numero="952"))
+        ReservationGuest.objects.create(reserva=reservation, nome="Ana", valor_devido=Decimal('80.00'))
+
+        response = admin_client.get(reverse('admin:reservations_reservation_change', args=[reservation.pk]))
+
+        assert response.status_code == 200
+        assert not set(response.context['adminform'].form.fields) & {
+            'total_devido', 'total_pago', 'total_pendente', 'qtd_hospedes', 'qtd_pendentes',
+        }
+        assert 'total_devido' in response.context['adminform'].readonly_fields
+
+
+@pytest.mark.django_db
+class TestRoomBoard:
+    """Garante que o quadro de quartos é lido do cache e descartado nas alterações."""
+
+    def test_dashboard_renders_cached_board_until_a_change(self, client, settings, django_assert_num_queries,
+                                                            django_capture_on_commit_callbacks):
+        from django.contrib.auth.models import User
+
+        from apps.reservations.board import get_board
+
+        settings.ROOM_BOARD_TIMEOUT = 3600  # cache compartilhado (Redis)
+        client.force_login(User.objects.create_user(username='quadro', password='x'))
+        Room.objects.create(numero="101")
+        ocupado = Room.objects.create(numero="102")
+        with django_capture_on_commit_callbacks(execute=True):
+            reservation = Reservation.objects.create(room=ocupado)
+            ReservationGuest.objects.create(reserva=reservation, nome="Ana", valor_devido=Decimal('100.00'))
+            ReservationGuest.objects.create(reserva=reservation, nome="Bruno", valor_devido=Decimal('60.00'))
+
+        with django_assert_num_queries(1):
+            board = get_board()
+        assert [(room.numero, room.occupied) for room in board] == [("101", False), ("102", True)]
+        entry = board[1]
+        assert (entry.reservation_id, entry.guest_name, entry.guest_count) == (reservation.id, "Ana", 2)
+        assert entry.pending_total == Decimal('160.00')
+
+        client.get(reverse('reservations:dashboard'))
+        with django_assert_num_queries(2):  # sessão e usuário; quadro e caixa vêm do cache
+            response = client.get(reverse('reservations:dashboard'))
+        assert response.context['stats'] == {'ocupados': 1, 'livres': 1, 'total': 2}
+        assert 'Pendente: R$ <span data-field="pending_total">160,00</span>' in response.content.decode()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            reservation.hospedes.get(nome="Ana").registrar_pagamento(ReservationGuest.MetodoPagamento.PIX)
+        assert get_board()[1].pending_total == Decimal('60.00')
+
+        response = client.get(reverse('reservations:room_detail', args=[ocupado.id]))
+        assert response.context['reservation'] == reservation
+        assert [room.numero for room in response.context['available_rooms']] == ["101"]
+        assert client.get(reverse('reservations:room_detail', args=[9999])).status_code == 404
+
+    def test_new_room_is_found_without_a_shared_cache(self, client, settings):
+        from django.contrib.auth.models import User
+
+        from apps.reservations.board import get_board
+
+        client.force_login(User.objects.create_user(username='quadro', password='x'))
+        settings.ROOM_BOARD_TIMEOUT = 0  # padrão sem REDIS_URL: o quadro não fica em cache
+        get_board()
+        Room.objects.create(numero="103")
+        assert [room.numero for room in get_board()] == ["103"]
+
+        # Cópia em cache de outro worker, gravada antes do quarto novo (sem descarte para este processo).
+        settings.ROOM_BOARD_TIMEOUT = 3600
+        get_board()
+        novo = Room.objects.bulk_create([Room(numero="104")])[0]
+
+        response = client.get(reverse('reservations:room_detail', args=[novo.id]))
+        assert response.status_code == 200
+        assert response.context['room'].numero == "104"
+
+
+@pytest.mark.django_db
+class TestRoomBoardPush:
+    """Garante que as mudanças do quadro chegam aos assinantes como deltas."""
+
+    def test_checkin_payment_and_checkout_are_published_once_per_room(self, django_capture_on_commit_callbacks):
+        import asyncio
+
+        from django.db import transaction
+
+        from hotel_hms import events
+
+        from apps.finance.counters import CASH_CHANNEL
+        from apps.reservations.live import BOARD_CHANNEL
+
+        room = Room.objects.create(numero="501")
+        loop = asyncio.new_event_loop()
+        subscription_cm = events.subscribe(BOARD_CHANNEL, CASH_CHANNEL)
+        subscription = loop.run_until_complete(subscription_cm.__aenter__())
+
+        def received():
+            messages = []
+            while True:
+                try:
+                    message = loop.run_until_complete(asyncio.wait_for(subscription.get(), timeout=0.2))
+                except asyncio.TimeoutError:
+                    return messages
+                messages.append(events.decode_message(message))
+
+        try:
+            with django_capture_on_commit_callbacks(execute=True):
+                reservation = Reservation.objects.create(room=room)
+                ReservationGuest.objects.create(reserva=reservation, nome="Ana", valor_devido=Decimal('80.00'))
+            (event, data), = received()
+            assert event == 'quarto'
+            assert (data['id'], data['acao'], data['occupied']) == (room.id, 'checkin', True)
+            assert (data['guest_name'], data['pending_total']) == ("Ana", '80.00')
+
+            with django_capture_on_commit_callbacks(execute=True):
+                reservation.hospedes.get().registrar_pagamento(ReservationGuest.MetodoPagamento.PIX)
+            published = dict(received())
+            assert published['quarto']['acao'] == 'pagamento'
+            assert published['quarto']['pending_count'] == 0
+            assert published['caixa']['pix'] == 80.0
+
+            with django_capture_on_commit_callbacks(execute=True):
+                reservation.encerrar()
+            (event, data), = received()
+            assert (data['acao'], data['occupied'], data['status']) == ('checkout', False, Room.Status.DISPONIVEL)
+
+            with django_capture_on_commit_callbacks(execute=True):
+                with pytest.raises(RuntimeError), transaction.atomic():
+                    ReservationGuest.objects.create(reserva=reservation, nome="Desfeito", valor_devido=Decimal('1.00'))
+                    raise RuntimeError
+            assert received() == []
+        finally:
+            loop.run_until_complete(subscription_cm.__aexit__(None, None, None))
+            loop.close()
+
+    def test_nothing_is_read_or_published_without_subscribers(self, django_capture_on_commit_callbacks):
+        from django.test.utils import CaptureQueriesContext
+
+        from apps.reservations.stays import check_in
+
+        room = Room.objects.create(numero="502")
+        with django_capture_on_commit_callbacks() as callbacks:
+            reservation = check_in(room, "Ana", Decimal('80.00'))
+            guest = ReservationGuest.objects.get(reserva=reservation)  # sem a reserva em cache
+            guest.registrar_pagamento(ReservationGuest.MetodoPagamento.PIX)
+
+        with CaptureQueriesContext(connection) as context:
+            for callback in callbacks:
+                callback()
+        assert not [q['sql'] for q in context.captured_queries if 'reservations_' in q['sql']]
+
+    def test_stream_is_not_opened_under_wsgi(self, client):
+        from django.contrib.auth.models import User
+
+        client.force_login(User.objects.create_user(username='wsgi', password='x'))
+        response = client.get(reverse('reservations:dashboard'))
+        assert response.context['live_board'] is False
+        assert 'EventSource' not in response.content.decode()
+        assert client.get(reverse('reservations:room_board_stream')).status_code == 204
+
+
+@pytest.mark.django_db
+class TestQueryBudget:
+    """Garante que views acima do orçamento e consultas repetidas (N+1) são acusadas."""
+
+    def test_repeated_queries_are_traced_and_budget_is_enforced(self, client, settings, caplog):
+        from django.contrib.auth.models import User
+
+        from hotel_hms.queries import QueryBudgetExceeded, QueryRecorder, budget_for
+
+        for numero in ("101", "102", "103", "104", "105"):
+            reservation = Reservation.objects.create(room=Room.objects.create(numero=numero))
+            ReservationGuest.objects.create(reserva=reservation, nome=f"Hóspede {numero}", valor_devido=Decimal('50.00'))
+
+        recorder = QueryRecorder(repeat_threshold=5)
+        with recorder.record():
+            names = [reservation.guest_name for reservation in Reservation.objects.all()]
+        (repeated,) = recorder.repeated()
+        assert repeated.count == 5
+        assert any('tests/test_system_integration.py' in frame for frame in repeated.stack)
+
+        recorder = QueryRecorder(repeat_threshold=5)
+        with recorder.record():
+            prefetched = [reservation.guest_name for reservation in Reservation.objects.prefetch_related('hospedes')]
+        assert prefetched == names
+        assert (recorder.total, recorder.repeated()) == (2, [])
+
+        client.force_login(User.objects.create_user(username='orcamento', password='x'))
+        settings.QUERY_BUDGETS = {**settings.QUERY_BUDGETS, 'finance:list_adjustments': 1}
+        with pytest.raises(QueryBudgetExceeded, match='finance:list_adjustments: 3 consultas'):
+            client.get(reverse('finance:list_adjustments'))
+
+        # ``None`` tira o limite da view; views sem entrada usam o padrão.
+        settings.QUERY_BUDGETS = {**settings.QUERY_BUDGETS, 'finance:list_adjustments': None}
+        settings.QUERY_BUDGET_DEFAULT = 1
+        assert (budget_for('finance:list_adjustments'), budget_for('sem:entrada')) == (None, 1)
+        assert client.get(reverse('finance:list_adjustments')).status_code == 200
+
+        settings.QUERY_BUDGETS = {**settings.QUERY_BUDGETS, 'finance:list_adjustments': 1}
+        settings.QUERY_BUDGET_STRICT = False
+        with caplog.at_level('WARNING', logger='hotel_hms.queries'):
+            assert client.get(reverse('finance:list_adjustments')).status_code == 200
+        assert 'finance:list_adjustments' in caplog.text
+
+
+@pytest.mark.django_db
+class TestConcurrentCheckIn:
+    """Garante uma única estadia em andamento por quarto, mesmo com check-ins simultâneos."""
+
+    def test_second_check_in_is_a_conflict(self, client):
+        from django.contrib.auth.models import User
+        from django.db import IntegrityError, transaction
+
+        client.force_login(User.objects.create_user(username='checkin', password='x'))
+        room = Room.objects.create(numero="301")
+        url = reverse('reservations:quick_check_in')
+
+        response = client.post(url, {'room_id': room.id, 'guest_name': "Ana", 'valor_devido': '90,00'})
+        assert response.status_code == 302
+        response = client.post(url, {'room_id': room.id, 'guest_name': "Bruno"}, HTTP_HX_REQUEST='true')
+        assert response.status_code == 409
+        assert 'já está ocupado' in response.content.decode()
+        response = client.post(url, {'room_id': room.id, 'guest_name': "Bruno"}, follow=True)
+        assert 'já está ocupado' in response.content.decode()
+        assert Reservation.objects.ativas().get(room=room).guest_name == "Ana"
+
+        with pytest.raises(IntegrityError), transaction.atomic():
+            Reservation.objects.create(room=room)
+
+
+@pytest.mark.django_db
+class TestRoomStatusTransitions:
+    """Garante que o status do quarto só é gravado nas transições reais, uma vez por quarto."""
+
+    def test_room_row_is_written_once_per_transition(self):
+        from django.test.utils import CaptureQueriesContext
+
+        from apps.reservations.models import room_status_changed, room_transitions
+        from apps.reservations.stays import check_in
+
+        room = Room.objects.create(numero="401")
+
+        def room_updates(context):
+            return [q['sql'] for q in context.captured_queries
+                    if q['sql'].startswith('UPDATE "reservations_room"')]
+
+        with CaptureQueriesContext(connection) as context:
+            reservation = check_in(room, "Ana", Decimal('100.00'))
+        assert len(room_updates(context)) == 1
+        room.refresh_from_db()
+        assert room.status == Room.Status.OCUPADO
+
+        reservation = Reservation.objects.get(pk=reservation.pk)
+        with CaptureQueriesContext(connection) as context:
+            reservation.save()  # alteração sem mudar a estadia
+        assert room_updates(context) == []
+
+        with CaptureQueriesContext(connection) as context, room_transitions():
+            room.ocupar()
+            room.liberar()
+            CheckIn.objects.create(reservation=Reservation.objects.create(
+                room=Room.objects.create(numero="402"), ativa=False,
+            ))
+        assert len(room_updates(context)) == 2  # um UPDATE por status de destino, um quarto cada
+        assert list(Room.objects.values_list('numero', 'status')) == [
+            ("401", Room.Status.DISPONIVEL), ("402", Room.Status.OCUPADO),
+        ]
+
+        reservation.hospedes.get().registrar_pagamento(ReservationGuest.MetodoPagamento.PIX)
+        changes = []
+
+        def record(sender, room_ids, status, **kwargs):
+            changes.append((room_ids, status))
+
+        room_status_changed.connect(record)
+        try:
+            with CaptureQueriesContext(connection) as context:
+                CheckOut.objects.create(reservation=reservation)
+            stale = Room.objects.get(pk=room.pk)
+            stale.status = Room.Status.OCUPADO  # cópia desatualizada: o banco já diz 'disponivel'
+            stale.liberar()
+        finally:
+            room_status_changed.disconnect(record)
+        # Encerrar a estadia pede a liberação, mas o quarto já não está em 'ocupado':
+        # nada é gravado, a instância não muda e o sinal não é enviado.
+        assert room_updates(context) == []
+        assert changes == []
+        assert stale.status == Room.Status.OCUPADO
+        room.refresh_from_db()
+        assert room.status == Room.Status.DISPONIVEL
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.skipif(
+    connection.vendor != 'postgresql',
+    reason='SELECT ... FOR UPDATE só bloqueia no PostgreSQL',
+)
+def test_concurrent_check_ins_under_contention():
+    """Vários tablets disputando os mesmos quartos: um check-in por quarto, o resto em conflito."""
+    import random
+    import threading
+    import time
+
+    from apps.reservations.stays import RoomUnavailableError, check_in
+
+    rooms = [Room.objects.create(numero=f"9{index:02d}") for index in range(10)]
+    workers, start = 16, threading.Barrier(16)
+    outcomes, lock = [], threading.Lock()
+
+    def tablet(seed):
+        order = rooms[:]
+        random.Random(seed).shuffle(order)
+        start.wait()
+        try:
+            for room in order:
+                try:
+                    check_in(room, f"Tablet {seed}", Decimal('100.00'))
+                    result = 'ok'
+                except RoomUnavailableError:
+                    result = 'conflito'
+                with lock:
+                    outcomes.append((room.id, result))
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=tablet, args=(seed,)) for seed in range(workers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    assert len(outcomes) == workers * len(rooms)
+    assert sorted(room_id for room_id, result in outcomes if result == 'ok') == sorted(room.id for room in rooms)
+    for room in rooms:
+        assert Reservation.objects.ativas().filter(room=room).count() == 1
+        room.refresh_from_db()
+        assert room.status == Room.Status.OCUPADO
+    assert len(outcomes) / elapsed > 20  # check-ins (ou conflitos) por segundo